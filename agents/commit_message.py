@@ -5,8 +5,6 @@ import subprocess  # Added
 import sys
 import time
 
-import pyperclip
-
 
 class CommitMessage:
     def __init__(self, folder, chatmodel="Mistral"):
@@ -82,6 +80,7 @@ And here is the "git diff" output:
 
         import navwins_agent as nw
         import pyautogui
+        import pyperclip
 
         manager = nw.get_window_manager()
 
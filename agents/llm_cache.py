@@ -0,0 +1,175 @@
+# Usage:
+#   from llm_cache import CachedModel
+#   model = CachedModel(load_model(...), "HfApiModel", "Qwen/Qwen2.5-Coder-32B-Instruct")
+#   model = CachedModel(None, "HfApiModel", "Qwen/Qwen2.5-Coder-32B-Instruct", replay=True)  # no model calls
+#
+# Disk cache of smolagents model responses. Each call is keyed by a hash of the model type
+# and ID, the messages, and the generation parameters (stop sequences, grammar, tools and
+# extra kwargs). Re-running the same agent prompt then skips the model for every step that
+# repeats. In replay mode a call that is not cached raises CacheMiss instead of reaching the
+# model, so runs are repeatable and need no network or weights.
+
+import dataclasses
+import enum
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+# The agent scripts run from agents/; the eviction helper is shared with the app
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import disk_lru
+
+LLM_CACHE_DIR = Path(os.getenv("AIGENTFLOW_LLM_CACHE_DIR", os.path.join(".aigentflow", "cache", "llm")))
+MAX_BYTES = int(os.getenv("AIGENTFLOW_LLM_CACHE_MB", "256")) * 1024 * 1024
+
+
+class CacheMiss(LookupError):
+    """A replayed run asked for a response that was never recorded."""
+
+
+def _jsonable(value):
+    """json.dumps fallback that gives every value in a call a stable form."""
+    if isinstance(value, enum.Enum):
+        return value.value
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return dataclasses.asdict(value)
+    if hasattr(value, "tobytes"):
+        # Images (PIL, numpy) join the key by content, not by their repr
+        return hashlib.blake2b(value.tobytes(), digest_size=16).hexdigest()
+    if hasattr(value, "name") and hasattr(value, "inputs"):
+        # smolagents Tool: what the model sees is its schema
+        return {
+            "name": value.name,
+            "description": getattr(value, "description", None),
+            "inputs": value.inputs,
+            "output_type": getattr(value, "output_type", None),
+        }
+    return str(value)
+
+
+def cache_key(model_type, model_id, messages, **params):
+    payload = json.dumps(
+        {"model_type": model_type, "model_id": model_id, "messages": messages, "params": params},
+        sort_keys=True,
+        default=_jsonable,
+    )
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=20).hexdigest()
+
+
+def entry_path(key, directory=LLM_CACHE_DIR):
+    return Path(directory) / key[:2] / f"{key}.json"
+
+
+def get(key, directory=LLM_CACHE_DIR):
+    path = entry_path(key, directory)
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            entry = json.load(file)
+    except (OSError, ValueError):
+        return None
+    # mtime doubles as the last-access time for LRU eviction
+    os.utime(path)
+    return entry
+
+
+def put(key, entry, directory=LLM_CACHE_DIR, max_bytes=MAX_BYTES):
+    path = entry_path(key, directory)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        json.dump(entry, file, default=_jsonable)
+    os.replace(tmp_path, path)
+    disk_lru.added(directory, path.stat().st_size, max_bytes, "*/*.json")
+
+
+def evict(directory=LLM_CACHE_DIR, max_bytes=MAX_BYTES):
+    """Drop least recently used entries until the cache fits in `max_bytes`."""
+    return disk_lru.evict(directory, max_bytes, "*/*.json")
+
+
+class CachedModel:
+    """
+    Wraps a smolagents Model: responses are served from the disk cache when the same call
+    was made before, and recorded otherwise. Any other attribute is the wrapped model's.
+    With `replay=True` the model may be None and a call that was never recorded raises
+    CacheMiss.
+    """
+
+    def __init__(self, model, model_type, model_id, replay=False, directory=LLM_CACHE_DIR, max_bytes=MAX_BYTES):
+        self.model = model
+        self.model_type = model_type
+        self.model_id = model_id
+        self.replay = replay
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.last_input_token_count = None
+        self.last_output_token_count = None
+
+    def __getattr__(self, name):
+        # Only reached for attributes not set in __init__
+        if self.__dict__.get("model") is None:
+            raise AttributeError(name)
+        return getattr(self.model, name)
+
+    def __call__(self, messages, stop_sequences=None, grammar=None, tools_to_call_from=None, **kwargs):
+        return self._complete("__call__", messages, stop_sequences, grammar, tools_to_call_from, kwargs)
+
+    def generate(self, messages, stop_sequences=None, grammar=None, tools_to_call_from=None, **kwargs):
+        # Newer smolagents versions call generate() instead of the model itself
+        return self._complete("generate", messages, stop_sequences, grammar, tools_to_call_from, kwargs)
+
+    def get_token_counts(self):
+        return {"input_token_count": self.last_input_token_count, "output_token_count": self.last_output_token_count}
+
+    def _complete(self, method, messages, stop_sequences, grammar, tools_to_call_from, kwargs):
+        from smolagents.models import ChatMessage
+
+        key = cache_key(
+            self.model_type,
+            self.model_id,
+            messages,
+            stop_sequences=stop_sequences,
+            grammar=grammar,
+            tools=tools_to_call_from,
+            kwargs=kwargs,
+        )
+        entry = get(key, self.directory)
+        if entry is not None:
+            self.hits += 1
+            self.last_input_token_count = entry.get("input_token_count")
+            self.last_output_token_count = entry.get("output_token_count")
+            return ChatMessage.from_dict(entry["message"])
+        self.misses += 1
+        if self.replay or self.model is None:
+            raise CacheMiss(f"No cached {self.model_type} {self.model_id} response for this call (key {key}); run once without --replay to record it")
+
+        message = getattr(self.model, method)(
+            messages, stop_sequences=stop_sequences, grammar=grammar, tools_to_call_from=tools_to_call_from, **kwargs
+        )
+        self.last_input_token_count = getattr(self.model, "last_input_token_count", None)
+        self.last_output_token_count = getattr(self.model, "last_output_token_count", None)
+        put(
+            key,
+            {
+                "created_at": time.time(),
+                "model_type": self.model_type,
+                "model_id": self.model_id,
+                "input_token_count": self.last_input_token_count,
+                "output_token_count": self.last_output_token_count,
+                # The raw provider response is neither needed by the agent nor always serialisable
+                "message": json.loads(message.model_dump_json()),
+            },
+            self.directory,
+            self.max_bytes,
+        )
+        return message
+
+    def report(self, file=sys.stderr):
+        print(f"LLM cache: {self.hits} hits, {self.misses} misses ({self.directory})", file=file)
@@ -0,0 +1,387 @@
+# Usage:
+#   python agents/model_server.py --model-id HuggingFaceTB/SmolLM2-135M-Instruct   # load once, keep serving
+#   python agents/smolagents_cli.py "your prompt here" --model-type ModelServerModel
+#   python agents/smolagents_cli.py "your prompt here" --model-type ModelServerModel --api-base 127.0.0.1:8765
+#
+# Keeps a transformers model loaded in one long-lived process and serves generations over
+# a local socket: a Unix socket at .aigentflow/model_server.sock, or 127.0.0.1:8765 where
+# Unix sockets are not available (AIGENTFLOW_MODEL_SERVER overrides either). Requests that
+# arrive while the model is busy, or within --batch-wait-ms of each other, are padded into
+# one generate() call. Each row keeps its own stop sequences and token limit.
+#
+# The protocol is one JSON object per line in each direction:
+#   {"op": "generate", "messages": [...], "stop_sequences": [...], "max_new_tokens": 512, "tools": [...]}
+#   {"op": "info"}
+
+import argparse
+import json
+import os
+import queue
+import socket
+import socketserver
+import sys
+import threading
+import time
+
+DEFAULT_MODEL_ID = "HuggingFaceTB/SmolLM2-135M-Instruct"
+DEFAULT_MAX_NEW_TOKENS = 2048
+DEFAULT_MAX_BATCH_SIZE = 8
+DEFAULT_BATCH_WAIT_MS = 10
+UNIX_SOCKETS = hasattr(socketserver, "UnixStreamServer")
+DEFAULT_ADDRESS = os.getenv(
+    "AIGENTFLOW_MODEL_SERVER",
+    os.path.join(".aigentflow", "model_server.sock") if UNIX_SOCKETS else "127.0.0.1:8765",
+)
+
+
+class ModelServerError(RuntimeError):
+    """The server could not be reached, or failed to generate."""
+
+
+def parse_address(address):
+    """"host:port" is TCP; anything else is a Unix socket path."""
+    host, sep, port = address.rpartition(":")
+    if sep and port.isdigit():
+        return socket.AF_INET, (host or "127.0.0.1", int(port))
+    if not UNIX_SOCKETS:
+        raise ValueError(f"Unix sockets are not available here; use host:port instead of {address!r}")
+    return socket.AF_UNIX, address
+
+
+class _Request:
+    __slots__ = ("payload", "done", "result")
+
+    def __init__(self, payload):
+        self.payload = payload
+        self.done = threading.Event()
+        self.result = None
+
+
+class Batcher:
+    """
+    Runs `generate_batch(payloads) -> results` on one worker thread. The worker waits for
+    a first request, gathers whatever else arrives within `max_wait` seconds (up to
+    `max_batch_size`), and answers all of them from a single call.
+    """
+
+    def __init__(self, generate_batch, max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_wait=DEFAULT_BATCH_WAIT_MS / 1000):
+        self.generate_batch = generate_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.batches = 0
+        self.requests = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="model-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, payload):
+        """Block until the batch holding `payload` has been generated; return its result."""
+        request = _Request(payload)
+        self._queue.put(request)
+        request.done.wait()
+        return request.result
+
+    def _gather(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            try:
+                # Requests queued while the previous batch ran are taken without waiting
+                batch.append(self._queue.get(timeout=max(0.0, deadline - time.monotonic())))
+            except queue.Empty:
+                break
+        return batch
+
+    def _generate(self, payloads):
+        try:
+            return self.generate_batch(payloads)
+        except Exception as e:
+            if len(payloads) == 1:
+                return [{"error": f"{type(e).__name__}: {e}"}]
+            # One bad request must not fail the rest of its batch: retry them one by one
+            return [self._generate([payload])[0] for payload in payloads]
+
+    def _run(self):
+        while True:
+            batch = self._gather()
+            results = self._generate([request.payload for request in batch])
+            self.batches += 1
+            self.requests += len(batch)
+            for request, result in zip(batch, results):
+                request.result = result
+                request.done.set()
+
+
+class TransformersBackend:
+    """A causal LM and its tokenizer, generating for a batch of chat requests at once."""
+
+    def __init__(self, model_id=DEFAULT_MODEL_ID, device_map=None, torch_dtype=None, max_new_tokens=DEFAULT_MAX_NEW_TOKENS):
+        import torch
+        from transformers import AutoModelForCausalLM, AutoTokenizer
+
+        self.torch = torch
+        self.model_id = model_id
+        self.max_new_tokens = max_new_tokens
+        if device_map is None:
+            device_map = "cuda" if torch.cuda.is_available() else "cpu"
+        self.model = AutoModelForCausalLM.from_pretrained(model_id, device_map=device_map, torch_dtype=torch_dtype)
+        self.model.eval()
+        self.tokenizer = AutoTokenizer.from_pretrained(model_id)
+        # Rows of a batch end together on the right, so prompts are padded on the left
+        self.tokenizer.padding_side = "left"
+        if self.tokenizer.pad_token is None:
+            self.tokenizer.pad_token = self.tokenizer.eos_token
+
+    def _stopping_criteria(self, prompt_length, limits, stop_sequences):
+        from transformers import StoppingCriteria, StoppingCriteriaList
+
+        torch = self.torch
+        tokenizer = self.tokenizer
+        # A token decodes to at least one character, so this many tokens cover any stop string
+        tail_tokens = max((len(stop) for stops in stop_sequences for stop in stops), default=0) + 2
+
+        class StopPerRow(StoppingCriteria):
+            def __call__(self, input_ids, scores, **kwargs):
+                generated = input_ids[:, prompt_length:]
+                done = []
+                for row, limit, stops in zip(generated, limits, stop_sequences):
+                    if len(row) >= limit:
+                        done.append(True)
+                    elif stops:
+                        tail = tokenizer.decode(row[-tail_tokens:], skip_special_tokens=True)
+                        done.append(any(stop in tail for stop in stops))
+                    else:
+                        done.append(False)
+                return torch.tensor(done, dtype=torch.bool, device=input_ids.device)
+
+        return StoppingCriteriaList([StopPerRow()])
+
+    def generate_batch(self, payloads):
+        prompts = [
+            self.tokenizer.apply_chat_template(payload["messages"], tools=payload.get("tools"), add_generation_prompt=True, tokenize=False)
+            for payload in payloads
+        ]
+        inputs = self.tokenizer(prompts, return_tensors="pt", padding=True, add_special_tokens=False).to(self.model.device)
+        prompt_length = inputs["input_ids"].shape[1]
+        limits = [min(payload.get("max_new_tokens") or self.max_new_tokens, self.max_new_tokens) for payload in payloads]
+        stop_sequences = [payload.get("stop_sequences") or [] for payload in payloads]
+        with self.torch.inference_mode():
+            output = self.model.generate(
+                **inputs,
+                max_new_tokens=max(limits),
+                do_sample=False,
+                pad_token_id=self.tokenizer.pad_token_id,
+                stopping_criteria=self._stopping_criteria(prompt_length, limits, stop_sequences),
+            )
+
+        results = []
+        special = set(self.tokenizer.all_special_ids)
+        for row, limit, stops, attention in zip(output, limits, stop_sequences, inputs["attention_mask"]):
+            tokens = [token for token in row[prompt_length:prompt_length + limit].tolist() if token not in special]
+            text = self.tokenizer.decode(tokens, skip_special_tokens=True)
+            # Rows that finished early keep generating until the whole batch stops; cut them at their stop
+            cut = min((text.find(stop) for stop in stops if stop in text), default=-1)
+            if cut >= 0:
+                text = text[:cut]
+            results.append({"content": text, "input_token_count": int(attention.sum()), "output_token_count": len(tokens)})
+        return results
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            try:
+                payload = json.loads(line)
+            except ValueError as e:
+                response = {"error": f"invalid request: {e}"}
+            else:
+                if payload.get("op") == "info":
+                    response = {"model_id": self.server.model_id, "batches": self.server.batcher.batches, "requests": self.server.batcher.requests}
+                elif payload.get("op", "generate") == "generate":
+                    response = self.server.batcher.submit(payload)
+                else:
+                    response = {"error": f"unknown op {payload.get('op')!r}"}
+            self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+            self.wfile.flush()
+
+
+class _TCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+if UNIX_SOCKETS:
+
+    class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+
+
+def _remove_stale_socket(path):
+    """Remove a socket file left by a server that is gone; refuse to start next to a live one."""
+    if not os.path.exists(path):
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except OSError:
+        os.unlink(path)
+    else:
+        raise ModelServerError(f"A model server is already listening on {path}")
+    finally:
+        probe.close()
+
+
+def make_server(backend, address=DEFAULT_ADDRESS, max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_wait=DEFAULT_BATCH_WAIT_MS / 1000):
+    """A server answering from `backend` (anything with model_id and generate_batch); call serve_forever()."""
+    family, addr = parse_address(address)
+    if family == socket.AF_INET:
+        server = _TCPServer(addr, _Handler)
+    else:
+        os.makedirs(os.path.dirname(os.path.abspath(addr)), exist_ok=True)
+        _remove_stale_socket(addr)
+        server = _UnixServer(addr, _Handler)
+        os.chmod(addr, 0o600)
+    server.model_id = backend.model_id
+    server.batcher = Batcher(backend.generate_batch, max_batch_size, max_wait)
+    return server
+
+
+class ModelServerModel:
+    """
+    smolagents model that sends each call to a running model server, so nothing is loaded
+    in the agent process. One connection is kept per instance and reopened if it drops.
+    """
+
+    def __init__(self, address=None, model_id=None, max_new_tokens=None, timeout=None):
+        self.address = address or DEFAULT_ADDRESS
+        self.max_new_tokens = max_new_tokens
+        self.timeout = timeout
+        self.kwargs = {}
+        self.last_input_token_count = None
+        self.last_output_token_count = None
+        self._socket = None
+        self._file = None
+        # The server's model is the one that answers, whatever the caller asked for
+        self.model_id = self._request({"op": "info"})["model_id"]
+        if model_id and model_id != self.model_id:
+            print(f"Model server at {self.address} serves {self.model_id}, not {model_id}", file=sys.stderr)
+
+    def _connect(self):
+        family, addr = parse_address(self.address)
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(addr)
+        except OSError as e:
+            sock.close()
+            raise ModelServerError(f"No model server at {self.address} ({e}); start one with: python agents/model_server.py") from None
+        self._socket = sock
+        self._file = sock.makefile("rwb")
+
+    def _close(self):
+        if self._socket is not None:
+            self._file.close()
+            self._socket.close()
+            self._socket = self._file = None
+
+    def _request(self, payload):
+        data = json.dumps(payload, default=str).encode("utf-8") + b"\n"
+        for attempt in range(2):
+            if self._socket is None:
+                self._connect()
+            try:
+                self._file.write(data)
+                self._file.flush()
+                line = self._file.readline()
+            except OSError:
+                line = b""
+            if line:
+                break
+            # The server restarted or closed an idle connection: retry once on a fresh one
+            self._close()
+        else:
+            raise ModelServerError(f"Model server at {self.address} closed the connection")
+        response = json.loads(line)
+        if "error" in response:
+            raise ModelServerError(response["error"])
+        return response
+
+    def close(self):
+        self._close()
+
+    def __call__(self, messages, stop_sequences=None, grammar=None, tools_to_call_from=None, **kwargs):
+        from smolagents.models import (
+            ChatMessage,
+            ChatMessageToolCall,
+            ChatMessageToolCallDefinition,
+            get_clean_message_list,
+            get_tool_json_schema,
+            tool_role_conversions,
+        )
+
+        response = self._request(
+            {
+                "op": "generate",
+                "messages": get_clean_message_list(messages, role_conversions=tool_role_conversions, flatten_messages_as_text=True),
+                "stop_sequences": stop_sequences,
+                "max_new_tokens": kwargs.get("max_new_tokens") or kwargs.get("max_tokens") or self.max_new_tokens,
+                "tools": [get_tool_json_schema(tool) for tool in tools_to_call_from] if tools_to_call_from else None,
+            }
+        )
+        self.last_input_token_count = response["input_token_count"]
+        self.last_output_token_count = response["output_token_count"]
+        output = response["content"]
+        if not tools_to_call_from:
+            return ChatMessage(role="assistant", content=output)
+
+        # Same parsing as TransformersModel: the first JSON blob after "Action:" is the call
+        if "Action:" in output:
+            output = output.split("Action:", 1)[1].strip()
+        try:
+            tool_call = json.loads(output[output.index("{") : output.rindex("}") + 1])
+        except ValueError as e:
+            raise ValueError(f"No valid JSON tool call in model output: {output!r}") from e
+        return ChatMessage(
+            role="assistant",
+            content="",
+            tool_calls=[
+                ChatMessageToolCall(
+                    id=f"call_{time.monotonic_ns()}",
+                    type="function",
+                    function=ChatMessageToolCallDefinition(name=tool_call.get("name"), arguments=tool_call.get("arguments")),
+                )
+            ],
+        )
+
+    def get_token_counts(self):
+        return {"input_token_count": self.last_input_token_count, "output_token_count": self.last_output_token_count}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Keep a transformers model loaded and serve it to agents over a local socket")
+    parser.add_argument("--model-id", default=DEFAULT_MODEL_ID, help=f"Model to load (default: {DEFAULT_MODEL_ID}, small enough for CPU)")
+    parser.add_argument("--address", default=DEFAULT_ADDRESS, help=f"Unix socket path or host:port (default: {DEFAULT_ADDRESS})")
+    parser.add_argument("--device-map", help="Passed to from_pretrained (default: cuda if available, else cpu)")
+    parser.add_argument("--torch-dtype", help="Passed to from_pretrained, e.g. bfloat16")
+    parser.add_argument("--max-new-tokens", type=int, default=DEFAULT_MAX_NEW_TOKENS, help="Upper bound on tokens generated per request")
+    parser.add_argument("--max-batch-size", type=int, default=DEFAULT_MAX_BATCH_SIZE, help="Requests generated together at most")
+    parser.add_argument("--batch-wait-ms", type=float, default=DEFAULT_BATCH_WAIT_MS, help="How long a request waits for others to batch with")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    backend = TransformersBackend(args.model_id, args.device_map, args.torch_dtype, args.max_new_tokens)
+    print(f"Loaded {args.model_id} on {backend.model.device} in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+    server = make_server(backend, args.address, args.max_batch_size, args.batch_wait_ms / 1000)
+    print(f"Serving on {args.address}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if parse_address(args.address)[0] != socket.AF_INET and os.path.exists(args.address):
+            os.unlink(args.address)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,8 +3,6 @@ import sys
 from abc import ABC, abstractmethod
 import logging
 
-import pyautogui
-
 # Configure console to use UTF-8 encoding
 if platform.system() == "Windows":
     import os
@@ -114,6 +112,8 @@ def safe_print_title(index, title):
         print(f"- [{index}]: Error reading window title ({str(e)})")
 
 def go_down_and_click(window, down_num=20, pixel_from_bottom=100):
+    import pyautogui
+
     try:
         window.activate()
     except:
@@ -130,6 +130,7 @@ def go_down_and_click(window, down_num=20, pixel_from_bottom=100):
 if __name__ == "__main__":
     
     import sys
+    import pyautogui
     DEBUG = False
     print(f"syst.argv: {sys.argv}")
     if len(sys.argv) > 1:
@@ -1,9 +1,7 @@
-import pyperclip
 import sys
 import io
 import time
 import argparse
-import pyautogui
 
 import navwins_agent as nw
 
@@ -11,6 +9,9 @@ DEBUG =True
 
 
 def paste_text_in_window(prompt, window):
+    import pyautogui
+    import pyperclip
+
     time.sleep(0.3)
     nw.go_down_and_click(window)
     
@@ -81,6 +82,8 @@ def run(prompt, chatmodel="Mistral"):
     if DEBUG: print(f"Window activated: {success}")
     
     if success:
+        import pyautogui
+
         # Give window time to focus
         output = paste_text_in_window(prompt, window)
         print(output)
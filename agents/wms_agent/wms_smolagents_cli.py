@@ -16,11 +16,18 @@
 # limitations under the License.
 import argparse
 import os
+import sys
+from typing import TYPE_CHECKING
 
-from dotenv import load_dotenv
+# llm_cache and model_server live in agents/, one level up
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from smolagents import CodeAgent, HfApiModel, LiteLLMModel, Model, OpenAIServerModel, Tool, TransformersModel
-from smolagents.default_tools import TOOL_MAPPING
+# dotenv and smolagents are imported where they are used, so `--help` and importing this
+# module stay cheap
+if TYPE_CHECKING:
+    from smolagents import Model
+
+DEFAULT_MODEL_ID = "Qwen/Qwen2.5-Coder-32B-Instruct"
 
 leopard_prompt = """Please tell me the layers available in this service endpoint: https://www.ign.es/wmts/pnoa-ma?"""
 
@@ -45,13 +52,13 @@ def parse_arguments(description):
         "--model-type",
         type=str,
         default="HfApiModel",
-        help="The model type to use (e.g., HfApiModel, OpenAIServerModel, LiteLLMModel, TransformersModel)",
+        help="The model type to use (e.g., HfApiModel, OpenAIServerModel, LiteLLMModel, TransformersModel, ModelServerModel)",
     )
     parser.add_argument(
         "--model-id",
         type=str,
-        default="Qwen/Qwen2.5-Coder-32B-Instruct",
-        help="The model ID to use for the specified model type",
+        default=None,
+        help=f"The model ID to use for the specified model type (default: {DEFAULT_MODEL_ID}; a ModelServerModel uses the server's model)",
     )
     parser.add_argument(
         "--imports",
@@ -82,10 +89,23 @@ def parse_arguments(description):
         type=str,
         help="The API key for the model",
     )
+    group = parser.add_argument_group("cache options", "Model responses cached in .aigentflow/cache/llm/")
+    group.add_argument(
+        "--cache",
+        action="store_true",
+        help="Reuse the recorded response when a model call repeats, and record new ones",
+    )
+    group.add_argument(
+        "--replay",
+        action="store_true",
+        help="Serve every model call from the cache and fail on a miss (no model is loaded)",
+    )
     return parser.parse_args()
 
 
-def load_model(model_type: str, model_id: str, api_base: str | None, api_key: str | None) -> Model:
+def load_model(model_type: str, model_id: str, api_base: str | None, api_key: str | None) -> "Model":
+    from smolagents import HfApiModel, LiteLLMModel, OpenAIServerModel, TransformersModel
+
     if model_type == "OpenAIServerModel":
         return OpenAIServerModel(
             api_key=api_key or os.getenv("FIREWORKS_API_KEY"),
@@ -100,6 +120,11 @@ def load_model(model_type: str, model_id: str, api_base: str | None, api_key: st
         )
     elif model_type == "TransformersModel":
         return TransformersModel(model_id=model_id, device_map="auto", flatten_messages_as_text=False)
+    elif model_type == "ModelServerModel":
+        # Talks to a running agents/model_server.py; --api-base overrides its socket address
+        from model_server import ModelServerModel
+
+        return ModelServerModel(address=api_base, model_id=model_id)
     elif model_type == "HfApiModel":
         return HfApiModel(
             token=api_key or os.getenv("HF_API_KEY"),
@@ -110,11 +135,31 @@ def load_model(model_type: str, model_id: str, api_base: str | None, api_key: st
 
 
 def main():
+    from dotenv import load_dotenv
+    from smolagents import CodeAgent, Tool
+    from smolagents.default_tools import TOOL_MAPPING
+
+    from llm_cache import CachedModel
+
     load_dotenv()
 
     args = parse_arguments(description="Run a CodeAgent with all specified parameters")
 
-    model = load_model(args.model_type, args.model_id, args.api_base, args.api_key)
+    model_id = args.model_id
+    if model_id is None and args.model_type != "ModelServerModel":
+        model_id = DEFAULT_MODEL_ID
+    if args.replay:
+        if model_id is None:
+            # A replay contacts no server, so it assumes the server runs its default model
+            import model_server
+
+            model_id = model_server.DEFAULT_MODEL_ID
+        model = CachedModel(None, args.model_type, model_id, replay=True)
+    else:
+        model = load_model(args.model_type, model_id, args.api_base, args.api_key)
+        if args.cache:
+            # Key on the model that answers: a model server reports the one it serves
+            model = CachedModel(model, args.model_type, getattr(model, "model_id", model_id))
 
     available_tools = []
     for tool_name in args.tools:
@@ -128,8 +173,15 @@ def main():
 
     print(f"Running agent with these tools: {args.tools}")
     agent = CodeAgent(tools=available_tools, model=model, additional_authorized_imports=args.imports)
-
-    agent.run(args.prompt)
+    # The system prompt lists these in set order, which changes between processes; sorted,
+    # the same run sends the same messages and the LLM cache can recognise it
+    agent.authorized_imports = sorted(agent.authorized_imports)
+
+    try:
+        agent.run(args.prompt)
+    finally:
+        if isinstance(model, CachedModel):
+            model.report()
 
 
 if __name__ == "__main__":
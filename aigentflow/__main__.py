@@ -0,0 +1,5 @@
+import sys
+
+from aigentflow.cli import main
+
+sys.exit(main())
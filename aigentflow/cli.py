@@ -0,0 +1,241 @@
+# Usage:
+#   aigentflow list [actions|prompts]
+#   aigentflow run "Random num" --var max_number=10
+#   aigentflow render "Translate to english" --var message="hola mundo"
+#   aigentflow render-batch "Translate to english" messages.csv -o prompts.jsonl
+#   aigentflow pipeline "Translate and run"
+#   aigentflow validate [actions|prompts]
+#
+# Headless entry point: shares the storage, template and runner code with the
+# Streamlit app but never imports Streamlit, so it can be called from scripts and hotkeys.
+
+import argparse
+import json
+import os
+import sys
+
+# modules/ and utils/ live next to this package when running from a checkout
+_PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _PROJECT_ROOT not in sys.path:
+    sys.path.append(_PROJECT_ROOT)
+
+
+def parse_vars(pairs):
+    values = {}
+    for pair in pairs:
+        name, sep, value = pair.partition("=")
+        if not sep:
+            raise SystemExit(f"aigentflow: --var expects name=value, got {pair!r}")
+        values[name] = value
+    return values
+
+
+def variable_values(obj, overrides):
+    """
+    The object's variable defaults, overridden by the values given on the command line,
+    coerced to the variables' types (exits with status 2 listing every bad value).
+    """
+    from modules.schema import SchemaError, compile_variables
+
+    try:
+        schema = compile_variables(obj.get("variables", []))
+        values = schema.defaults()
+        values.update(overrides)
+        return schema.coerce(values)
+    except SchemaError as e:
+        for error in e.errors:
+            print(f"aigentflow: {error}", file=sys.stderr)
+        raise SystemExit(2)
+
+
+def find(kind, name):
+    from modules.storage import get_backend
+
+    obj = get_backend().get(kind, name)
+    if obj is None:
+        print(f"aigentflow: no {kind[:-1]} named {name!r}", file=sys.stderr)
+        raise SystemExit(2)
+    return obj
+
+
+def cmd_list(args):
+    from modules.storage import get_backend
+
+    kinds = [args.kind] if args.kind else ["actions", "prompts", "pipelines"]
+    listing = {kind: [obj["name"] for obj in get_backend().load(kind)] for kind in kinds}
+    if args.json:
+        print(json.dumps(listing, indent=2))
+        return 0
+    for kind, names in listing.items():
+        if len(kinds) > 1:
+            print(f"{kind}:")
+        for name in names:
+            print(f"  {name}" if len(kinds) > 1 else name)
+    return 0
+
+
+def cmd_render(args):
+    from modules.template import compile_template
+
+    prompt = find("prompts", args.name)
+    values = variable_values(prompt, parse_vars(args.var))
+    template = compile_template(prompt["content"])
+    unknown = template.unknown(values)
+    if unknown:
+        print(f"aigentflow: no value for {', '.join(unknown)}", file=sys.stderr)
+    print(template.render(values))
+    return 0
+
+
+def cmd_render_batch(args):
+    from modules.prompt_batch import render_to_file
+
+    prompt = find("prompts", args.name)
+    defaults = variable_values(prompt, parse_vars(args.var))
+    source = sys.stdin.buffer if args.input == "-" else args.input
+    try:
+        rows = render_to_file(
+            prompt["content"],
+            source,
+            args.output,
+            defaults,
+            fmt=args.input_format or ("csv" if args.input == "-" else None),
+            output_format=args.format,
+            chunk_rows=args.chunk_rows,
+            keep_columns=args.keep_columns,
+        )
+    except (OSError, ValueError) as e:
+        print(f"aigentflow: {e}", file=sys.stderr)
+        return 2
+    print(f"Rendered {rows} prompts", file=sys.stderr)
+    return 0
+
+
+def cmd_run(args):
+    from modules.runner import OutputCapture, run_action
+
+    class EchoCapture(OutputCapture):
+        def __init__(self, stream):
+            super().__init__()
+            self.stream = stream
+
+        def _append(self, text):
+            super()._append(text)
+            if text and not args.json:
+                self.stream.write(text)
+                self.stream.flush()
+
+    action = find("actions", args.name)
+    values = variable_values(action, parse_vars(args.var))
+    result = run_action(
+        action["name"],
+        action["content"],
+        values,
+        stdout=EchoCapture(sys.stdout),
+        stderr=EchoCapture(sys.stderr),
+        cache=None if args.no_cache else action.get("cache"),
+        limits=action.get("limits"),
+        shell=action.get("shell", True),
+    )
+    if args.json:
+        print(json.dumps(result, default=str, indent=2))
+    elif result.get("cached"):
+        sys.stdout.write(result["stdout"])
+        sys.stderr.write(result["stderr"])
+    return result["returncode"]
+
+
+def cmd_pipeline(args):
+    from modules.pipeline import FINISHED, run_pipeline
+
+    pipeline = find("pipelines", args.name)
+    try:
+        run = run_pipeline(pipeline, args.concurrency)
+    except ValueError as e:
+        print(f"aigentflow: invalid pipeline {args.name!r}: {e}", file=sys.stderr)
+        return 2
+    if args.json:
+        print(json.dumps({"nodes": [run.results[node_id] for node_id in run.order], "outputs": run.sink_outputs()}, default=str, indent=2))
+    else:
+        for node_id in run.order:
+            result = run.results[node_id]
+            detail = f"{result['duration']:.3f}s" if "duration" in result else result.get("error", "")
+            print(f"{node_id:<20} {result['status']:<9} {detail}", file=sys.stderr)
+        for output in run.sink_outputs().values():
+            print(output)
+    return 0 if all(result["status"] == FINISHED for result in run.results.values()) else 1
+
+
+def cmd_validate(args):
+    from modules.schema import validate_store
+
+    invalid = 0
+    for kind in [args.kind] if args.kind else ["actions", "prompts"]:
+        report = validate_store(kind)
+        invalid += len(report.errors)
+        for label, problems in report.errors.items():
+            for problem in problems:
+                print(f"{label}: {problem}")
+        print(f"{kind}: {len(report.valid)} valid, {len(report.errors)} invalid", file=sys.stderr)
+    return 1 if invalid else 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="aigentflow", description="Run AIgentFlow actions and prompts without the UI")
+    parser.add_argument(
+        "-C",
+        "--project-dir",
+        default=os.getenv("AIGENTFLOW_HOME"),
+        help="Directory containing .aigentflow/ (default: $AIGENTFLOW_HOME or the current directory)",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    list_parser = subparsers.add_parser("list", help="List actions, prompts and pipelines")
+    list_parser.add_argument("kind", nargs="?", choices=["actions", "prompts", "pipelines"])
+    list_parser.add_argument("--json", action="store_true", help="Print JSON")
+    list_parser.set_defaults(func=cmd_list)
+
+    run_parser = subparsers.add_parser("run", help="Run an action and exit with its return code")
+    run_parser.add_argument("name", help="Action name")
+    run_parser.add_argument("--var", action="append", default=[], metavar="NAME=VALUE", help="Variable value (repeatable)")
+    run_parser.add_argument("--json", action="store_true", help="Print the result record as JSON instead of the output")
+    run_parser.add_argument("--no-cache", action="store_true", help="Ignore the action's result cache")
+    run_parser.set_defaults(func=cmd_run)
+
+    render_parser = subparsers.add_parser("render", help="Print a prompt with its variables filled in")
+    render_parser.add_argument("name", help="Prompt name")
+    render_parser.add_argument("--var", action="append", default=[], metavar="NAME=VALUE", help="Variable value (repeatable)")
+    render_parser.set_defaults(func=cmd_render)
+
+    batch_parser = subparsers.add_parser("render-batch", help="Render a prompt for every row of a CSV or JSONL file")
+    batch_parser.add_argument("name", help="Prompt name")
+    batch_parser.add_argument("input", help="CSV or JSONL file with one column per variable ('-' for stdin)")
+    batch_parser.add_argument("-o", "--output", default="-", help="Output file (default: stdout)")
+    batch_parser.add_argument("--format", choices=["jsonl", "csv"], help="Output format (default: from the output suffix, else jsonl)")
+    batch_parser.add_argument("--input-format", choices=["csv", "jsonl"], help="Input format (default: from the input suffix)")
+    batch_parser.add_argument("--var", action="append", default=[], metavar="NAME=VALUE", help="Value for rows without one (repeatable)")
+    batch_parser.add_argument("--keep-columns", action="store_true", help="Write the input columns next to the prompt")
+    batch_parser.add_argument("--chunk-rows", type=int, default=10000, help="Rows read and rendered at a time")
+    batch_parser.set_defaults(func=cmd_render_batch)
+
+    pipeline_parser = subparsers.add_parser("pipeline", help="Run a pipeline and print the outputs of its last nodes")
+    pipeline_parser.add_argument("name", help="Pipeline name")
+    pipeline_parser.add_argument("--concurrency", type=int, default=4, help="Nodes run at once")
+    pipeline_parser.add_argument("--json", action="store_true", help="Print every node's result as JSON")
+    pipeline_parser.set_defaults(func=cmd_pipeline)
+
+    validate_parser = subparsers.add_parser("validate", help="Check every action and prompt file and list the invalid ones")
+    validate_parser.add_argument("kind", nargs="?", choices=["actions", "prompts"])
+    validate_parser.set_defaults(func=cmd_validate)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.project_dir:
+        os.chdir(args.project_dir)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+# Usage:
+#   python benchmarks/bench_catalog.py --entries 10000
+#
+# Compares the per-rerun cost of the old glob + json.load loop with the
+# mtime-indexed catalog in modules/catalog.py on a synthetic action directory.
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.catalog import Catalog
+
+
+def make_actions(directory, entries):
+    directory.mkdir(parents=True, exist_ok=True)
+    for i in range(entries):
+        action = {
+            "name": f"Action {i}",
+            "content": f"python agents/random_number.py <max_number> # {i}",
+            "variables": [{"name": "max_number", "type": "number", "default": str(i)}],
+        }
+        with open(directory / f"Action_{i}.json", "w") as file:
+            json.dump(action, file)
+
+
+def legacy_load(directory):
+    actions = []
+    for action_file in directory.glob("*.json"):
+        with open(action_file, "r") as file:
+            actions.append(json.load(file))
+    return actions
+
+
+def timed(func, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark catalog rerun cost")
+    parser.add_argument("--entries", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = Path(tmp) / "actions"
+        make_actions(directory, args.entries)
+
+        catalog = Catalog(directory)
+        start = time.perf_counter()
+        catalog.load()
+        cold = time.perf_counter() - start
+
+        def touch_some():
+            for i in range(10):
+                os.utime(directory / f"Action_{i}.json", ns=(time.time_ns(), time.time_ns()))
+            catalog.load()
+
+        results = [
+            ("legacy glob + json.load", timed(lambda: legacy_load(directory), args.repeat)),
+            ("catalog cold load", cold),
+            ("catalog rerun, nothing changed", timed(catalog.load, args.repeat)),
+            ("catalog rerun, 10 files changed", timed(touch_some, args.repeat)),
+            ("catalog name lookup", timed(lambda: catalog.get(f"Action {args.entries - 1}"), args.repeat)),
+        ]
+
+    print(f"{args.entries} actions, best of {args.repeat}")
+    for label, seconds in results:
+        print(f"  {label:<34} {seconds * 1000:10.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+# Usage:
+#   python benchmarks/bench_cli_startup.py [--runs 20] [--threshold-ms 100]
+#
+# Measures wall-clock startup of the headless CLI (`python -m aigentflow list`)
+# against a bare interpreter, and exits non-zero if the CLI's own overhead goes
+# over the threshold. The bare interpreter time is reported separately because it
+# depends on the machine and on site-packages, not on this project.
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure(command, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command, cwd=PROJECT_ROOT, stdout=subprocess.DEVNULL, check=True)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples), min(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark aigentflow CLI startup")
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--threshold-ms", type=float, default=100.0, help="Maximum median overhead over a bare interpreter")
+    parser.add_argument("--command", nargs="+", default=["list"], help="CLI arguments to time")
+    args = parser.parse_args()
+
+    bare_median, bare_min = measure([sys.executable, "-c", "pass"], args.runs)
+    cli_median, cli_min = measure([sys.executable, "-m", "aigentflow", *args.command], args.runs)
+    overhead = (cli_median - bare_median) * 1000
+
+    print(f"{args.runs} runs, median (min)")
+    print(f"  bare interpreter       {bare_median * 1000:8.1f} ms ({bare_min * 1000:.1f})")
+    print(f"  aigentflow {' '.join(args.command):<11} {cli_median * 1000:8.1f} ms ({cli_min * 1000:.1f})")
+    print(f"  CLI overhead           {overhead:8.1f} ms (threshold {args.threshold_ms:.0f} ms)")
+    if overhead > args.threshold_ms:
+        print("FAIL: CLI startup regressed past the threshold")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
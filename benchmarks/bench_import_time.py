@@ -0,0 +1,114 @@
+# Usage:
+#   python benchmarks/bench_import_time.py               # compare with the saved baseline
+#   python benchmarks/bench_import_time.py --save        # record a new baseline
+#
+# Cold-start import cost of the UI, each page and each agent script, measured with
+# `python -X importtime`. Only imports triggered by the target are counted (the
+# interpreter's own startup imports are subtracted), and the run fails when a target
+# is slower than its baseline by more than the tolerance.
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_FILE = os.path.join(PROJECT_ROOT, "benchmarks", "import_time_baseline.json")
+
+# name -> (directory added to sys.path, module to import)
+TARGETS = {
+    "ui": (".", "main"),
+    "page:prompts": (".", "modules.prompt_manager"),
+    "page:actions": (".", "modules.action_manager"),
+    "page:history": (".", "modules.history_manager"),
+    "page:pipelines": (".", "modules.pipeline_manager"),
+    "page:performance": (".", "modules.performance_manager"),
+    "cli": (".", "aigentflow.cli"),
+    "agent:commit_message": ("agents", "commit_message"),
+    "agent:model_server": ("agents", "model_server"),
+    "agent:navwins_agent": ("agents", "navwins_agent"),
+    "agent:random_number": ("agents", "random_number"),
+    "agent:run_in_llm_chat": ("agents", "run_in_llm_chat"),
+    "agent:smolagents_cli": ("agents", "smolagents_cli"),
+    "agent:wms_smolagents_cli": ("agents/wms_agent", "wms_smolagents_cli"),
+}
+
+IMPORT_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def import_time_us(path, module):
+    """Cumulative microseconds spent importing `module` (and everything it pulls in)."""
+    code = f"import sys; sys.path.insert(0, {os.path.join(PROJECT_ROOT, path)!r}); import {module}"
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+    )
+    if completed.returncode != 0:
+        error = completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else "failed"
+        return None, error
+    total = 0
+    for line in completed.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        # Top-level entries only; nested ones are already part of their parent's cumulative time
+        if match and match.group(3) == " " and match.group(4) == module:
+            total += int(match.group(2))
+    return total, None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Track cold-start import time of the UI and agents")
+    parser.add_argument("--runs", type=int, default=5, help="Runs per target; the median is used")
+    parser.add_argument("--save", action="store_true", help="Write the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative slowdown before failing")
+    parser.add_argument("--slack-ms", type=float, default=5.0, help="Absolute slowdown always allowed")
+    parser.add_argument("targets", nargs="*", default=list(TARGETS), help="Targets to measure")
+    args = parser.parse_args()
+
+    baseline = {}
+    if os.path.exists(BASELINE_FILE):
+        with open(BASELINE_FILE, "r") as file:
+            baseline = json.load(file)
+
+    results = {}
+    regressions = []
+    for name in args.targets:
+        path, module = TARGETS[name]
+        samples, error = [], None
+        for _ in range(args.runs):
+            value, error = import_time_us(path, module)
+            if value is None:
+                break
+            samples.append(value)
+        if not samples:
+            print(f"  {name:<26} skipped ({error})")
+            continue
+        ms = statistics.median(samples) / 1000
+        results[name] = round(ms, 2)
+        line = f"  {name:<26} {ms:9.1f} ms"
+        if name in baseline:
+            limit = baseline[name] * (1 + args.tolerance) + args.slack_ms
+            line += f"   baseline {baseline[name]:.1f} ms"
+            if ms > limit:
+                line += "   REGRESSION"
+                regressions.append(name)
+        print(line)
+
+    if args.save:
+        baseline.update(results)
+        with open(BASELINE_FILE, "w") as file:
+            json.dump(baseline, file, indent=2, sort_keys=True)
+        print(f"Saved baseline to {BASELINE_FILE}")
+        return 0
+    if regressions:
+        print(f"FAIL: import time regressed for {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,58 @@
+# Usage:
+#   python benchmarks/bench_template.py --value-mb 2 --variables 20
+#
+# Compares the old str.replace loop with the compiled template engine in
+# modules/template.py when one variable holds a large pasted value (a diff, a document).
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.template import compile_template, render
+
+
+def replace_loop(content, variable_values):
+    for var_name, var_value in variable_values.items():
+        content = content.replace(f"<{var_name}>", str(var_value))
+    return content
+
+
+def timed(func, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark <variable> substitution")
+    parser.add_argument("--value-mb", type=float, default=2.0, help="Size of the large variable value")
+    parser.add_argument("--variables", type=int, default=20, help="Number of variables in the template")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    names = [f"var{i}" for i in range(args.variables)]
+    content = "Review the following:\n" + "\n".join(f"{name}: <{name}>" for name in names)
+    values = {name: f"value {i}" for i, name in enumerate(names)}
+    values[names[0]] = "diff --git a/x b/x\n+" * int(args.value_mb * 1024 * 1024 / 20)
+
+    assert replace_loop(content, values) == render(content, values)
+    template = compile_template(content)
+
+    results = [
+        ("str.replace loop", timed(lambda: replace_loop(content, values), args.repeat)),
+        ("render() incl. cache lookup", timed(lambda: render(content, values), args.repeat)),
+        ("precompiled Template.render", timed(lambda: template.render(values), args.repeat)),
+    ]
+    print(f"{args.variables} variables, one {args.value_mb} MB value, best of {args.repeat}")
+    for label, seconds in results:
+        print(f"  {label:<30} {seconds * 1000:10.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
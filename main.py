@@ -1,6 +1,7 @@
 # Usage:
 #   python -m streamlit run main.py
 
+import importlib
 import os
 import sys
 
@@ -9,20 +10,31 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 import streamlit as st
 
-from modules import action_manager, history_manager, prompt_manager
+# Each page module is imported the first time its page is shown
+PAGES = {
+    "Prompts": ("modules.prompt_manager", "display_prompts"),
+    "Actions": ("modules.action_manager", "display_actions"),
+    "Pipelines": ("modules.pipeline_manager", "display_pipelines"),
+    "History": ("modules.history_manager", "display_history"),
+    "Performance": ("modules.performance_manager", "display_performance"),
+}
 
 
 def main():
+    if os.getenv("AIGENTFLOW_WATCH", "").lower() in ("1", "true", "yes"):
+        from modules.watcher import watch_store
+        watch_store()
+    if os.getenv("AIGENTFLOW_WARM_POOL", "").lower() in ("1", "true", "yes"):
+        # Start importing agent dependencies before the first action runs
+        from modules.warm_pool import get_pool
+        get_pool()
+
     st.sidebar.title("AIgentFlow")
-    menu = ["Prompts", "Actions", "History"]
+    menu = list(PAGES)
     choice = st.sidebar.selectbox("Menu", menu)
 
-    if choice == "Prompts":
-        prompt_manager.display_prompts()
-    elif choice == "Actions":
-        action_manager.display_actions()
-    elif choice == "History":
-        history_manager.display_history()
+    module_name, display_function = PAGES[choice]
+    getattr(importlib.import_module(module_name), display_function)()
 
 
 if __name__ == "__main__":
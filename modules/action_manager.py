@@ -1,17 +1,37 @@
 import streamlit as st
-import json
-from pathlib import Path
 from utils.string_utils import decode_output
-import subprocess
+from modules import search_index
+from modules.batch import DEFAULT_CONCURRENCY, BatchRun, load_rows
+from modules.jobs import get_job_manager
+from modules.blob_store import preview
+from modules.output_viewer import display_full_output, display_preview
+from modules.runner import run_action
+from modules.schema import SchemaError, compile_variables, object_errors, validate_store
+from modules.storage import get_backend
+from modules.template import compile_argv, compile_template, render
 
-ACTION_DIR = Path(".aigentflow/actions")
+LIMIT_LABELS = {"timeout": "timeout", "cpu_seconds": "CPU time", "max_rss_mb": "memory"}
 
 def load_actions():
-    actions = []
-    for action_file in ACTION_DIR.glob("*.json"):
-        with open(action_file, "r") as file:
-            actions.append(json.load(file))
-    return actions
+    # Files that fail validation are left out here and listed by display_invalid_actions()
+    return validate_store("actions").valid
+
+def display_invalid_actions():
+    errors = validate_store("actions").errors
+    if errors:
+        with st.expander(f"{len(errors)} invalid action files were skipped"):
+            for path, problems in errors.items():
+                st.warning(f"{path}: " + "; ".join(problems))
+
+def get_action(name):
+    return get_backend().get("actions", name)
+
+def save_action(action):
+    """Save `action` unless it is invalid; returns the problems that stopped it (empty if saved)."""
+    problems = object_errors("actions", action)
+    if not problems:
+        get_backend().save("actions", action)
+    return problems
 
 def initialize_session_state():
     defaults = {
@@ -24,11 +44,16 @@ def initialize_session_state():
         "execution_result": None,
         "execution_stdout": None,
         "execution_stderr": None,
+        "execution_stdout_blob": None,
+        "execution_stderr_blob": None,
         "execution_returncode": None,
         "executed_action_name": None,
         "execute_submit": False,
         "run_action": False,
-        "variable_values": {}
+        "variable_values": {},
+        "jobs": [],
+        "batch_action": None,
+        "batch_run": None
     }
     for key, value in defaults.items():
         if key not in st.session_state:
@@ -36,9 +61,7 @@ def initialize_session_state():
 
 def execute_action_test(action_name, content, variable_values):
     try:
-        modified_content = content
-        for var_name, var_value in variable_values.items():
-            modified_content = modified_content.replace(f"<{var_name}>", str(var_value))
+        modified_content = render(content, variable_values)
         # Your execution logic here
         st.session_state.execution_result = True
         st.session_state.executed_action_name = action_name
@@ -51,26 +74,22 @@ def execute_action_test(action_name, content, variable_values):
         st.session_state.execution_returncode = 1
 
 def execute_action(action_name, content, variable_values):
-    try:
-        modified_content = content
-        for var_name, var_value in variable_values.items():
-            # Replace " for ' to avoid issues with shell commands
-            var_value = var_value.replace('"', "'")
-            modified_content = modified_content.replace(f"<{var_name}>", str(var_value))
-        
-        # Execute the command
-        result = subprocess.run(modified_content, shell=True, capture_output=True, text=True)
-        
-        st.session_state.execution_result = True
-        st.session_state.executed_action_name = action_name
-        st.session_state.execution_stdout = result.stdout
-        st.session_state.execution_stderr = result.stderr
-        st.session_state.execution_returncode = result.returncode
-    except Exception as e:
-        st.session_state.execution_result = True
-        st.session_state.executed_action_name = action_name
-        st.session_state.execution_stderr = str(e)
-        st.session_state.execution_returncode = 1
+    action = get_action(action_name)
+    result = run_action(
+        action_name,
+        content,
+        variable_values,
+        limits=action.get("limits") if action else None,
+        shell=action.get("shell", True) if action else True,
+    )
+    st.session_state.execution_result = True
+    st.session_state.executed_action_name = action_name
+    # Only previews live in the session; large outputs are read back from the blob store
+    st.session_state.execution_stdout = preview(result["stdout"])
+    st.session_state.execution_stderr = preview(result["stderr"])
+    st.session_state.execution_stdout_blob = result.get("stdout_blob")
+    st.session_state.execution_stderr_blob = result.get("stderr_blob")
+    st.session_state.execution_returncode = result["returncode"]
 
 def display_execution_results():
     if st.session_state.execution_result:
@@ -81,16 +100,112 @@ def display_execution_results():
                 st.success(st.session_state.execution_stdout)
             else:
                 st.info("Command executed successfully but produced no output.")
+            display_full_output(st.session_state.execution_stdout_blob, "execution_stdout")
         else:
             st.error(output_text)
             st.error(st.session_state.execution_stderr)
+            display_full_output(st.session_state.execution_stderr_blob, "execution_stderr")
         if st.button("Clear Results", key="clear_results"):
-            for key in ["execution_result", "execution_stdout", "execution_stderr", "execution_returncode", "executed_action_name"]:
+            for key in ["execution_result", "execution_stdout", "execution_stderr", "execution_stdout_blob", "execution_stderr_blob", "execution_returncode", "executed_action_name"]:
                 st.session_state[key] = None
             st.rerun()
     else:
         st.info("No action results to display. Execute an action to see results here.")
 
+def display_batch():
+    batch = st.session_state.batch_run
+    if batch is None:
+        action = get_action(st.session_state.batch_action)
+        if action is None:
+            st.session_state.batch_action = None
+            return
+        st.subheader(f"Batch Run: {action['name']}")
+        variable_names = ", ".join(var["name"] for var in action["variables"]) or "none"
+        uploaded = st.file_uploader(f"Variable rows (CSV or JSONL with columns: {variable_names})", type=["csv", "jsonl"], key="batch_file")
+        concurrency = st.number_input("Concurrency", min_value=1, max_value=64, value=DEFAULT_CONCURRENCY, key="batch_concurrency")
+        col1, col2 = st.columns(2)
+        with col1:
+            if st.button("Run Batch", disabled=uploaded is None, key="run_batch"):
+                try:
+                    rows = load_rows(uploaded)
+                except ValueError as e:
+                    st.error(f"Could not read {uploaded.name}: {e}")
+                else:
+                    st.session_state.batch_run = BatchRun(action, rows, concurrency).start()
+                    st.rerun()
+        with col2:
+            if st.button("Cancel", key="cancel_batch_form"):
+                st.session_state.batch_action = None
+                st.rerun()
+    else:
+        display_batch_progress()
+
+@st.fragment(run_every=1)
+def display_batch_progress():
+    batch = st.session_state.batch_run
+    if batch is None:
+        return
+    st.subheader(f"Batch Run: {batch.action['name']}")
+    st.progress(batch.done / batch.total if batch.total else 1.0, text=f"{batch.done}/{batch.total} rows")
+    if batch.running:
+        if st.button("Stop launching rows", key="cancel_batch"):
+            batch.cancel()
+    else:
+        table = batch.table()
+        st.dataframe(table)
+        st.download_button("Download results (CSV)", table.to_csv(index=False), file_name=f"{batch.action['name']}_batch.csv", key="download_batch")
+        if st.button("Close batch", key="close_batch"):
+            st.session_state.batch_run = None
+            st.session_state.batch_action = None
+            st.rerun(scope="app")
+
+@st.fragment(run_every=1)
+def display_jobs():
+    manager = get_job_manager()
+    jobs = manager.jobs(st.session_state.jobs)
+    if len(jobs) < len(st.session_state.jobs):
+        # The manager drops the oldest finished jobs
+        st.session_state.jobs = [job.id for job in jobs]
+    if not jobs:
+        return
+    st.header("Runs")
+    for job in reversed(jobs):
+        progress = job.progress()
+        label = f"{job.action_name} · {progress['status']} · {progress['elapsed']:.1f}s"
+        if job.result and job.result.get("cached"):
+            label += " · cached"
+        with st.expander(label, expanded=not job.done):
+            if not job.done:
+                st.info(f"Running: {job.content}")
+                st.caption(f"stdout: {progress['stdout_bytes']} bytes · stderr: {progress['stderr_bytes']} bytes")
+                stdout_tail = preview(job.stdout.text())
+                if stdout_tail:
+                    st.code(stdout_tail, language=None)
+                if st.button("Cancel", key=f"cancel_job_{job.id}"):
+                    manager.cancel(job.id)
+            elif job.result:
+                cached_note = " from cache" if job.result.get("cached") else ""
+                output_text = f"Executed action [{job.action_name}]{cached_note}\n\n OUTPUT (returncode={job.result['returncode']}):\n\n"
+                if job.result["returncode"] == 0:
+                    st.success(output_text)
+                    if job.result["stdout"].strip():
+                        display_preview(job.result["stdout"], success=True)
+                    else:
+                        st.info("Command executed successfully but produced no output.")
+                else:
+                    st.error(output_text)
+                    st.error(preview(job.result["stderr"]))
+                if limit_message(job.result):
+                    st.warning(limit_message(job.result))
+                for stream in ("stdout", "stderr"):
+                    display_full_output(job.result.get(f"{stream}_blob"), f"job_{job.id}_{stream}", f"Show full {stream}")
+            elif job.error:
+                st.error(job.error)
+            if job.done and st.button("Clear", key=f"clear_job_{job.id}"):
+                st.session_state.jobs.remove(job.id)
+                manager.forget(job.id)
+                st.rerun()
+
 def display_action_form(action=None):
     if action:
         st.header("Edit Action")
@@ -122,18 +237,35 @@ def display_action_form(action=None):
             if st.button("Delete Variable", key=f"delete_var_{var['name']}"):
                 st.session_state.variables.remove(var)
 
+    use_shell = st.checkbox(
+        "Run through the shell",
+        value=(action or {}).get("shell", True),
+        help="Untick to run the command directly: no /bin/sh, and variable values are passed as whole arguments without quote replacement.",
+        key="action_use_shell",
+    )
+    limits = display_limits_form((action or {}).get("limits") or {})
+
     if action:
         if st.button("Update and Save"):
             action["name"] = action_name
             action["content"] = action_content
             action["variables"] = variables
-            safe_action_name = "".join([c if c.isalnum() else "_" for c in action_name])
-            with open(ACTION_DIR / f"{safe_action_name}.json", "w") as file:
-                json.dump(action, file)
-            st.success("Action updated successfully!")
-            st.session_state.show_form = False
-            st.session_state.edit_action = None
-            st.session_state.variables = []
+            if limits:
+                action["limits"] = limits
+            else:
+                action.pop("limits", None)
+            if use_shell:
+                action.pop("shell", None)
+            else:
+                action["shell"] = False
+            problems = save_action(action)
+            if problems:
+                st.error("Action not saved: " + "; ".join(problems))
+            else:
+                st.success("Action updated successfully!")
+                st.session_state.show_form = False
+                st.session_state.edit_action = None
+                st.session_state.variables = []
     else:
         if st.button("Save Action"):
             new_action = {
@@ -141,20 +273,33 @@ def display_action_form(action=None):
                 "content": action_content,
                 "variables": variables
             }
-            ACTION_DIR.mkdir(parents=True, exist_ok=True)
-            safe_action_name = "".join([c if c.isalnum() else "_" for c in action_name])
-            with open(ACTION_DIR / f"{safe_action_name}.json", "w") as file:
-                json.dump(new_action, file)
-            st.success("Action saved successfully!")
-            st.session_state.show_form = False
-            st.session_state.variables = []
+            if limits:
+                new_action["limits"] = limits
+            if not use_shell:
+                new_action["shell"] = False
+            problems = save_action(new_action)
+            if problems:
+                st.error("Action not saved: " + "; ".join(problems))
+            else:
+                st.success("Action saved successfully!")
+                st.session_state.show_form = False
+                st.session_state.variables = []
 
     if action_content:
         st.subheader("Preview")
-        preview_content = action_content
-        for var in variables:
-            preview_content = preview_content.replace(f"<{var['name']}>", var['default'])
-        st.write(preview_content)
+        template = compile_template(action_content)
+        defaults = {var["name"]: var["default"] for var in variables}
+        if use_shell:
+            st.write(template.render(defaults))
+        else:
+            try:
+                st.write(compile_argv(action_content).render(defaults))
+            except ValueError as e:
+                st.error(f"The command cannot be split into arguments: {e}")
+        if template.unknown(defaults):
+            st.warning(f"Placeholders without a variable: {', '.join(template.unknown(defaults))}")
+        if template.unused(defaults):
+            st.warning(f"Variables not used in the content: {', '.join(template.unused(defaults))}")
 
     col1, col2 = st.columns(2)
     with col1:
@@ -169,6 +314,24 @@ def display_action_form(action=None):
             st.session_state.action_content = action_content
             st.session_state.variables = variables
 
+def display_limits_form(limits):
+    with st.expander("Limits", expanded=bool(limits)):
+        st.caption("0 means no limit. The whole process tree is stopped when a limit is exceeded.")
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            timeout = st.number_input("Timeout (s)", min_value=0.0, value=float(limits.get("timeout") or 0), key="limit_timeout")
+        with col2:
+            cpu_seconds = st.number_input("CPU time (s)", min_value=0.0, value=float(limits.get("cpu_seconds") or 0), key="limit_cpu_seconds")
+        with col3:
+            max_rss_mb = st.number_input("Max memory (MB)", min_value=0.0, value=float(limits.get("max_rss_mb") or 0), key="limit_max_rss_mb")
+    return {key: value for key, value in (("timeout", timeout), ("cpu_seconds", cpu_seconds), ("max_rss_mb", max_rss_mb)) if value > 0}
+
+def limit_message(result):
+    limit = result.get("limit_hit")
+    if not limit:
+        return None
+    return f"Stopped after exceeding its {LIMIT_LABELS.get(limit, limit)} limit."
+
 def display_variable_form(variables):
     if "edit_var" in st.session_state and st.session_state.edit_var:
         var_name = st.text_input("Variable Name", value=st.session_state.edit_var["name"])
@@ -213,6 +376,20 @@ def display_variable_form(variables):
             st.session_state.show_variable_form = False
             st.session_state.edit_var = None
 
+def display_variable_inputs(schema):
+    """One input per compiled variable, prefilled with its coerced default."""
+    variable_values = {}
+    for var in schema:
+        if var.type == "number":
+            variable_values[var.name] = st.number_input(var.name, value=var.default)
+        elif var.type == "date":
+            variable_values[var.name] = st.date_input(var.name, value=var.default)
+        elif var.type == "options":
+            variable_values[var.name] = st.selectbox(var.name, options=var.options, index=var.index)
+        else:
+            variable_values[var.name] = st.text_input(var.name, value=var.default)
+    return variable_values
+
 def display_actions():
     st.title("Actions")
     actions = load_actions()
@@ -222,51 +399,63 @@ def display_actions():
         st.info(f"Debug: Form submit flag is {st.session_state.execute_submit}")
         st.info(f"Action content: {st.session_state.action_content}")
         variable_values = {key[4:]: st.session_state[key] for key in st.session_state.keys() if key.startswith("var_")}
-        execute_action(st.session_state.action_name, st.session_state.action_content, variable_values)
+        # Cache settings only apply while the content matches the saved action; limits always do
+        saved_action = get_action(st.session_state.action_name)
+        cache = saved_action.get("cache") if saved_action and saved_action["content"] == st.session_state.action_content else None
+        limits = saved_action.get("limits") if saved_action else None
+        shell = saved_action.get("shell", True) if saved_action else True
+        job_id = get_job_manager().submit(st.session_state.action_name, st.session_state.action_content, variable_values, cache=cache, limits=limits, shell=shell)
+        st.session_state.jobs.append(job_id)
         st.session_state.run_action = False 
         st.rerun()
 
     display_execution_results()
+    display_jobs()
 
     if st.session_state.show_form:
         display_action_form(st.session_state.edit_action)
     else:
         st.button("New Action", on_click=lambda: setattr(st.session_state, 'show_form', True), key="new_action")
         st.header("Existing Actions")
+        display_invalid_actions()
+        query = st.text_input("Search actions", key="action_search", placeholder="Name, content or variable defaults")
+        if query.strip():
+            actions = search_index.matching(actions, "actions", query)
+            st.caption(f"{len(actions)} matching actions")
         if actions:
             for action in actions:
                 with st.expander(action["name"]):
                     description = action.get("description", action["content"][:200])
                     st.write(description)
+                    # Catalog objects are shared across reruns, so edit copies of them
                     if st.button("Edit", key=f"edit_{action['name']}"):
                         st.session_state.show_form = True
-                        st.session_state.edit_action = action
-                        st.session_state.variables = action["variables"]
+                        st.session_state.edit_action = dict(action)
+                        st.session_state.variables = list(action["variables"])
                     if st.button("Execute", key=f"execute_{action['name']}"):
                         st.session_state.execute_submit = True
                         st.session_state.action_name = action["name"]
                         st.session_state.action_content = action["content"]
-                        st.session_state.variables = action["variables"]
+                        st.session_state.variables = list(action["variables"])
+                    if st.button("Batch", key=f"batch_{action['name']}"):
+                        st.session_state.batch_action = action["name"]
         else:
             st.write("No actions found.")
 
+    if st.session_state.batch_action or st.session_state.batch_run:
+        display_batch()
+
     if st.session_state.execute_submit:
         action_name = st.session_state.action_name
         content = st.session_state.action_content
         st.subheader(f"Execute Action: {action_name}")
+        try:
+            schema = compile_variables(st.session_state.variables)
+        except SchemaError as e:
+            st.error(f"Invalid variables: {e}")
+            return
         with st.form(key="execute_action_form"):
-            variable_values = {}
-            for var in st.session_state.variables:
-                if var["type"] == "text":
-                    variable_values[var["name"]] = st.text_input(f"{var['name']}", value=var["default"])
-                elif var["type"] == "number":
-                    variable_values[var["name"]] = st.number_input(f"{var['name']}", value=float(var["default"]) if var["default"] else 0)
-                elif var["type"] == "date":
-                    variable_values[var["name"]] = st.date_input(f"{var['name']}")
-                elif var["type"] == "options":
-                    options = var.get("options", [])
-                    default_idx = options.index(var["default"]) if var["default"] in options else 0
-                    variable_values[var["name"]] = st.selectbox(f"{var['name']}", options=options, index=default_idx)
+            variable_values = display_variable_inputs(schema)
             if st.form_submit_button("Run Action"):
                 for key, value in variable_values.items():
                     st.session_state[f"var_{key}"] = value
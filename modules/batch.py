@@ -0,0 +1,143 @@
+import csv
+import io
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+from modules.runner import OutputCapture, run_action
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONCURRENCY = int(os.getenv("AIGENTFLOW_BATCH_CONCURRENCY", "4"))
+# Each row keeps only the end of its output in memory; rows are also recorded in the journal
+ROW_TAIL_CHARS = 4 * 1024
+
+
+def load_rows(source, fmt=None):
+    """
+    Read variable rows from a pandas DataFrame, a CSV/JSONL path, or an uploaded file.
+
+    Returns a list of dicts mapping variable names to values.
+    """
+    if hasattr(source, "to_dict") and hasattr(source, "columns"):
+        return source.to_dict("records")
+    name = getattr(source, "name", source)
+    fmt = fmt or Path(str(name)).suffix.lstrip(".").lower()
+    if isinstance(source, (str, Path)):
+        with open(source, "r", encoding="utf-8", newline="") as file:
+            return _parse_rows(file, fmt)
+    data = source.read()
+    if isinstance(data, bytes):
+        data = data.decode("utf-8-sig")
+    return _parse_rows(io.StringIO(data, newline=""), fmt)
+
+
+def _parse_rows(file, fmt):
+    if fmt == "csv":
+        return [dict(row) for row in csv.DictReader(file)]
+    if fmt in ("jsonl", "ndjson"):
+        return [json.loads(line) for line in file if line.strip()]
+    raise ValueError(f"Unsupported batch input format: {fmt or 'unknown'} (use csv or jsonl)")
+
+
+def row_variables(action, row):
+    """Variable values for one row, falling back to the action's defaults for missing columns."""
+    values = {var["name"]: var["default"] for var in action.get("variables", [])}
+    values.update({key: value for key, value in row.items() if value is not None})
+    return values
+
+
+class BatchRun:
+    """
+    Runs one action over many variable rows with at most `concurrency` processes at once.
+
+    Every row is its own subprocess, so the worker threads only wait on them. The UI
+    polls `done`/`total` while the batch runs and reads `results` once finished.
+    """
+
+    def __init__(self, action, rows, concurrency=DEFAULT_CONCURRENCY):
+        self.action = action
+        self.rows = list(rows)
+        self.concurrency = max(1, int(concurrency))
+        self.total = len(self.rows)
+        self.done = 0
+        self.results = [None] * self.total
+        self.started_at = None
+        self.finished_at = None
+        self.cancel_requested = False
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, name="aigentflow-batch", daemon=True)
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        """Stop launching new rows; rows already running finish normally."""
+        self.cancel_requested = True
+
+    def run(self):
+        self.started_at = time.time()
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="aigentflow-batch") as executor:
+            futures = {executor.submit(self._run_row, index, row): index for index, row in enumerate(self.rows)}
+            for future in as_completed(futures):
+                index = futures[future]
+                try:
+                    self.results[index] = future.result()
+                except Exception as e:
+                    logger.error(f"Batch row {index} of {self.action['name']} failed: {e}")
+                    self.results[index] = {"row": index, "returncode": None, "error": str(e)}
+                with self._lock:
+                    self.done += 1
+        self.finished_at = time.time()
+        return self.results
+
+    def _run_row(self, index, row):
+        variables = row_variables(self.action, row)
+        if self.cancel_requested:
+            return {"row": index, **variables, "returncode": None, "status": "cancelled"}
+        result = run_action(
+            self.action["name"],
+            self.action["content"],
+            variables,
+            stdout=OutputCapture(tail_chars=ROW_TAIL_CHARS),
+            stderr=OutputCapture(tail_chars=ROW_TAIL_CHARS),
+            cache=self.action.get("cache"),
+            limits=self.action.get("limits"),
+            shell=self.action.get("shell", True),
+        )
+        return {
+            "row": index,
+            **variables,
+            "returncode": result["returncode"],
+            "status": "ok" if result["returncode"] == 0 else "failed",
+            "cached": result.get("cached", False),
+            "limit_hit": result.get("limit_hit"),
+            "duration": result["duration"],
+            "stdout": result["stdout"],
+            "stderr": result["stderr"],
+            "stdout_bytes": result["stdout_bytes"],
+            "stderr_bytes": result["stderr_bytes"],
+        }
+
+    def table(self):
+        """Aggregate per-row results into one pandas DataFrame."""
+        import pandas as pd
+
+        return pd.DataFrame([result for result in self.results if result is not None])
+
+
+def run_batch(action, rows, concurrency=DEFAULT_CONCURRENCY):
+    """Run `action` over every row synchronously and return the results table."""
+    batch = BatchRun(action, rows, concurrency)
+    batch.run()
+    return batch.table()
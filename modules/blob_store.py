@@ -0,0 +1,198 @@
+# Content-addressed store for large action outputs. Each blob is a file named by
+# the sha256 of its bytes under .aigentflow/blobs/<2 hex>/<digest>, so identical
+# outputs are stored once. The UI keeps only a handle (digest, size and a short
+# preview) in st.session_state and reads the full output page by page from disk.
+
+import hashlib
+import logging
+import mmap
+import os
+import re
+import shutil
+import threading
+from pathlib import Path
+
+from modules.catalog import AIGENTFLOW_DIR
+from utils import disk_lru
+from utils.string_utils import decode_output
+
+logger = logging.getLogger(__name__)
+
+BLOB_DIR = AIGENTFLOW_DIR / "blobs"
+MAX_BYTES = int(float(os.getenv("AIGENTFLOW_BLOB_MB", "1024")) * 1024 * 1024)
+PREVIEW_CHARS = 8 * 1024
+PAGE_BYTES = 64 * 1024
+HASH_CHUNK = 1024 * 1024
+MAX_MATCHES = 200
+SNIPPET_CHARS = 160
+
+
+def blob_path(digest, directory=BLOB_DIR):
+    return Path(directory) / digest[:2] / digest
+
+
+def exists(digest, directory=BLOB_DIR):
+    return bool(digest) and blob_path(digest, directory).is_file()
+
+
+def _store(tmp_path, digest, directory):
+    path = blob_path(digest, directory)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.exists():
+        Path(tmp_path).unlink(missing_ok=True)
+    else:
+        os.replace(tmp_path, path)
+    # mtime doubles as the last-access time for LRU eviction
+    os.utime(path)
+    return digest
+
+
+def put_bytes(data, directory=BLOB_DIR, max_bytes=MAX_BYTES):
+    """Store `data` and return its digest."""
+    digest = hashlib.sha256(data).hexdigest()
+    if not exists(digest, directory):
+        tmp_path = Path(directory) / f".{os.getpid()}.{threading.get_ident()}.tmp"
+        tmp_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(tmp_path, "wb") as file:
+            file.write(data)
+        _store(tmp_path, digest, directory)
+        disk_lru.added(directory, len(data), max_bytes, "*/*")
+    else:
+        os.utime(blob_path(digest, directory))
+    return digest
+
+
+def put_file(path, move=False, directory=BLOB_DIR, max_bytes=MAX_BYTES):
+    """
+    Store the file at `path` and return its digest. It is hashed in chunks, never
+    read whole; with `move` it is renamed into the store instead of copied.
+    """
+    sha = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(HASH_CHUNK), b""):
+            sha.update(chunk)
+    digest = sha.hexdigest()
+    if exists(digest, directory):
+        os.utime(blob_path(digest, directory))
+        if move:
+            Path(path).unlink(missing_ok=True)
+        return digest
+    tmp_path = Path(directory) / f".{os.getpid()}.{threading.get_ident()}.tmp"
+    tmp_path.parent.mkdir(parents=True, exist_ok=True)
+    if move:
+        try:
+            os.replace(path, tmp_path)
+        except OSError:
+            # Different filesystem: fall back to a copy
+            shutil.copyfile(path, tmp_path)
+            Path(path).unlink(missing_ok=True)
+    else:
+        shutil.copyfile(path, tmp_path)
+    size = os.path.getsize(tmp_path)
+    _store(tmp_path, digest, directory)
+    disk_lru.added(directory, size, max_bytes, "*/*")
+    return digest
+
+
+def preview(text, chars=PREVIEW_CHARS):
+    """The end of `text`, which is where errors and results usually are."""
+    return text if len(text) <= chars else text[-chars:]
+
+
+def evict(directory=BLOB_DIR, max_bytes=MAX_BYTES):
+    """Drop the least recently used blobs until the store fits in `max_bytes`."""
+    return disk_lru.evict(directory, max_bytes, "*/*")
+
+
+class BlobReader:
+    """
+    Memory-mapped, read-only view of one blob: pages of about `page_bytes` that end
+    on a line break, and search over the raw bytes without loading the file.
+    """
+
+    def __init__(self, digest, page_bytes=PAGE_BYTES, directory=BLOB_DIR):
+        self.digest = digest
+        self.page_bytes = page_bytes
+        self.path = blob_path(digest, directory)
+        self._file = open(self.path, "rb")
+        self.size = os.fstat(self._file.fileno()).st_size
+        # mmap cannot map an empty file
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else b""
+        self._starts = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        self._file.close()
+
+    def page_starts(self):
+        """Byte offset of every page, each one just after a line break when there is one nearby."""
+        if self._starts is None:
+            starts = [0]
+            while starts[-1] + self.page_bytes < self.size:
+                end = starts[-1] + self.page_bytes
+                newline = self._map.rfind(b"\n", starts[-1], end)
+                starts.append(newline + 1 if newline >= starts[-1] else end)
+            self._starts = starts
+        return self._starts
+
+    @property
+    def pages(self):
+        return len(self.page_starts())
+
+    def page_of(self, offset):
+        starts = self.page_starts()
+        low, high = 0, len(starts) - 1
+        while low < high:
+            middle = (low + high + 1) // 2
+            if starts[middle] <= offset:
+                low = middle
+            else:
+                high = middle - 1
+        return low
+
+    def page(self, index):
+        starts = self.page_starts()
+        index = max(0, min(index, len(starts) - 1))
+        end = starts[index + 1] if index + 1 < len(starts) else self.size
+        return decode_output(self._map[starts[index]:end])
+
+    def search(self, query, regex=False, ignore_case=True, max_matches=MAX_MATCHES):
+        """
+        Matches of `query` as dicts with the byte offset, line number, page and a
+        snippet of the line. The query is encoded as UTF-8, so it matches UTF-8
+        and ASCII output; ignore_case only folds ASCII letters.
+        """
+        if not query or not self.size:
+            return []
+        pattern = query.encode("utf-8") if regex else re.escape(query.encode("utf-8"))
+        compiled = re.compile(pattern, re.IGNORECASE if ignore_case else 0)
+        matches = []
+        line, counted = 1, 0
+        for match in compiled.finditer(self._map):
+            offset = match.start()
+            line += self._map[counted:offset].count(b"\n")
+            counted = offset
+            # The snippet starts at the line start, or half a snippet before the match on long lines
+            window_start = max(0, offset - SNIPPET_CHARS // 2)
+            newline = self._map.rfind(b"\n", window_start, offset)
+            snippet_start = newline + 1 if newline != -1 else window_start
+            line_end = self._map.find(b"\n", offset, snippet_start + SNIPPET_CHARS)
+            line_end = snippet_start + SNIPPET_CHARS if line_end == -1 else line_end
+            matches.append(
+                {
+                    "offset": offset,
+                    "line": line,
+                    "page": self.page_of(offset),
+                    "text": decode_output(self._map[snippet_start:line_end]),
+                }
+            )
+            if len(matches) >= max_matches:
+                break
+        return matches
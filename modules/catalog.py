@@ -0,0 +1,155 @@
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+AIGENTFLOW_DIR = Path(".aigentflow")
+ACTION_DIR = AIGENTFLOW_DIR / "actions"
+PROMPT_DIR = AIGENTFLOW_DIR / "prompts"
+HISTORY_DIR = AIGENTFLOW_DIR / "history"
+PIPELINE_DIR = AIGENTFLOW_DIR / "pipelines"
+
+
+class Catalog:
+    """
+    In-memory index of the JSON objects stored in one directory.
+
+    Every entry remembers the (mtime, size) of the file it was parsed from, so
+    refresh() only re-reads the files that changed since the previous call.
+    Objects are also indexed by their `key` field for O(1) lookups.
+    """
+
+    def __init__(self, directory, key="name"):
+        self.directory = Path(directory)
+        self.key = key
+        self.errors = {}
+        # Set by modules.watcher when file events are pushed in, so load() can skip the scan
+        self.watched = False
+        self.generation = 0
+        self._entries = {}
+        self._items = None
+        self._by_key = None
+        self._lock = threading.RLock()
+
+    def refresh(self):
+        """Stat the directory and re-parse new or modified files. Returns True on change."""
+        with self._lock:
+            changed = False
+            seen = set()
+            try:
+                scan = os.scandir(self.directory)
+            except FileNotFoundError:
+                scan = None
+            if scan is not None:
+                with scan:
+                    for entry in scan:
+                        if not entry.name.endswith(".json"):
+                            continue
+                        try:
+                            stat = entry.stat()
+                        except FileNotFoundError:
+                            continue
+                        seen.add(entry.path)
+                        cached = self._entries.get(entry.path)
+                        if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+                            continue
+                        self._parse(entry.path, stat)
+                        changed = True
+            for path in self._entries.keys() - seen:
+                self._forget(path)
+                changed = True
+            if changed:
+                self._invalidate()
+            return changed
+
+    def refresh_files(self, paths):
+        """Re-read only the given files; missing files are dropped from the index."""
+        with self._lock:
+            for path in paths:
+                path = str(path)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    self._forget(path)
+                    continue
+                cached = self._entries.get(path)
+                if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+                    continue
+                self._parse(path, stat)
+            self._invalidate()
+
+    def refresh_file(self, path):
+        """Re-read a single file, e.g. right after the UI saved it."""
+        self.refresh_files([path])
+
+    def load(self):
+        if not self.watched:
+            self.refresh()
+        return self.items()
+
+    def items(self):
+        with self._lock:
+            if self._items is None:
+                self._items = [
+                    self._entries[path][2]
+                    for path in sorted(self._entries)
+                    if self._entries[path][2] is not None
+                ]
+            return self._items
+
+    def entries(self):
+        """(path, object) pairs for every parsed file, in the same order as items()."""
+        with self._lock:
+            return [(path, self._entries[path][2]) for path in sorted(self._entries) if self._entries[path][2] is not None]
+
+    def get(self, key, default=None):
+        if self.key is None:
+            return default
+        with self._lock:
+            if self._by_key is None:
+                self._by_key = {}
+                for obj in self.items():
+                    if isinstance(obj, dict) and self.key in obj:
+                        self._by_key[obj[self.key]] = obj
+            return self._by_key.get(key, default)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _parse(self, path, stat):
+        try:
+            with open(path, "r") as file:
+                obj = json.load(file)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Skipping unreadable catalog file {path}: {e}")
+            self._entries[path] = (stat.st_mtime_ns, stat.st_size, None)
+            self.errors[path] = str(e)
+            return
+        self.errors.pop(path, None)
+        self._entries[path] = (stat.st_mtime_ns, stat.st_size, obj)
+
+    def _invalidate(self):
+        self._items = None
+        self._by_key = None
+        self.generation += 1
+
+    def _forget(self, path):
+        self._entries.pop(path, None)
+        self.errors.pop(path, None)
+
+
+_catalogs = {}
+_catalogs_lock = threading.Lock()
+
+
+def get_catalog(directory, key="name"):
+    """Return the process-wide catalog for `directory`, creating it on first use."""
+    directory = Path(directory)
+    with _catalogs_lock:
+        catalog = _catalogs.get(directory)
+        if catalog is None:
+            catalog = _catalogs[directory] = Catalog(directory, key=key)
+        return catalog
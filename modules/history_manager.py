@@ -1,18 +1,110 @@
 import streamlit as st
-import json
-from pathlib import Path
+from datetime import datetime, time, timedelta
+from modules import search_index
+from modules.blob_store import preview
+from modules.journal import get_journal
+from modules.output_viewer import display_full_output, display_preview
+from modules.storage import get_backend
 
-HISTORY_DIR = Path(".aigentflow/history")
+PAGE_SIZE = 25
+SEARCH_LIMIT = 100
+SORT_OPTIONS = {"Newest first": "newest", "Oldest first": "oldest", "Slowest first": "slowest"}
+RETURNCODE_OPTIONS = {"All": None, "Success": "success", "Failed": "failed"}
 
 def load_history():
-    history = []
-    for history_file in HISTORY_DIR.glob("*.json"):
-        with open(history_file, "r") as file:
-            history.append(json.load(file))
-    return history
+    return get_backend().load("history") + list(get_journal().iter_records())
+
+def save_history(record):
+    get_backend().save("history", record)
+
+def initialize_session_state():
+    if "history_page" not in st.session_state:
+        st.session_state.history_page = 0
+
+def reset_page():
+    st.session_state.history_page = 0
+
+def history_filters():
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        name = st.text_input("Action name", key="history_name", on_change=reset_page).strip() or None
+    with col2:
+        date_range = st.date_input("Date range", value=(), key="history_dates", on_change=reset_page)
+    with col3:
+        returncode = RETURNCODE_OPTIONS[st.selectbox("Result", list(RETURNCODE_OPTIONS), key="history_returncode", on_change=reset_page)]
+    with col4:
+        sort = SORT_OPTIONS[st.selectbox("Sort", list(SORT_OPTIONS), key="history_sort", on_change=reset_page)]
+
+    since = until = None
+    if len(date_range) >= 1:
+        since = datetime.combine(date_range[0], time.min).timestamp()
+    if len(date_range) == 2:
+        until = datetime.combine(date_range[1] + timedelta(days=1), time.min).timestamp()
+    return {"name": name, "since": since, "until": until, "returncode": returncode, "sort": sort}
+
+def display_record(record):
+    started = datetime.fromtimestamp(record.get("timestamp", 0)).strftime("%Y-%m-%d %H:%M:%S")
+    cached = " · cached" if record.get("cached") else ""
+    with st.expander(f"{started} · {record.get('name')} · returncode={record.get('returncode')}{cached}"):
+        st.code(record.get("command", ""), language="bash")
+        if record.get("variables"):
+            st.write(record["variables"])
+        if record.get("limit_hit"):
+            st.warning(f"Stopped by its {record['limit_hit']} limit")
+        st.write(f"Duration: {record.get('duration', 0):.3f}s · stdout: {record.get('stdout_bytes', 0)} bytes · stderr: {record.get('stderr_bytes', 0)} bytes")
+        if record.get("cpu_user") is not None:
+            st.write(f"CPU: {record['cpu_user']:.3f}s user · {record['cpu_system']:.3f}s sys · max RSS: {record['max_rss'] / (1024 * 1024):.1f} MB")
+        if record.get("stdout"):
+            display_preview(record["stdout"])
+        if record.get("stderr"):
+            st.error(preview(record["stderr"]))
+        for stream in ("stdout", "stderr"):
+            display_full_output(record.get(f"{stream}_blob"), f"history_{record.get('timestamp')}_{stream}", f"Show full {stream}")
+
+def display_search_results(query, filters):
+    hits = search_index.search(query, [search_index.RUNS], limit=SEARCH_LIMIT, since=filters["since"], until=filters["until"])
+    if filters["name"]:
+        hits = [hit for hit in hits if hit["name"] == filters["name"]]
+    if filters["returncode"] is not None:
+        hits = [hit for hit in hits if (hit["returncode"] == 0) == (filters["returncode"] == "success")]
+    st.caption(f"{len(hits)} matching runs" + (f" (showing the first {SEARCH_LIMIT})" if len(hits) >= SEARCH_LIMIT else ""))
+    journal = get_journal()
+    for hit in hits:
+        st.markdown(hit["snippet"])
+        if hit["kind"] == search_index.RUNS:
+            display_record(journal.read_at(*search_index.run_position(hit["ref"])))
+        else:
+            st.caption(f"Imported history record · {hit['name']}")
 
 def display_history():
     st.title("History")
-    history = load_history()
-    for record in history:
-        st.write(record)
+    initialize_session_state()
+    journal = get_journal()
+    query = st.text_input("Search runs", key="history_search", placeholder="Command, variables or output")
+    filters = history_filters()
+    if query.strip():
+        display_search_results(query, filters)
+        return
+
+    page = st.session_state.history_page
+    records, has_more = journal.query(offset=page * PAGE_SIZE, limit=PAGE_SIZE, **filters)
+    if not records and page == 0:
+        st.info("No executions recorded yet.")
+    for record in records:
+        display_record(record)
+
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col1:
+        if st.button("Previous", disabled=page == 0, key="history_previous"):
+            st.session_state.history_page -= 1
+            st.rerun()
+    with col2:
+        st.caption(f"Page {page + 1} · {journal.count()} executions recorded")
+    with col3:
+        if st.button("Next", disabled=not has_more, key="history_next"):
+            st.session_state.history_page += 1
+            st.rerun()
+
+    if st.checkbox("Show imported history records", key="history_legacy"):
+        for record in get_backend().load("history"):
+            st.write(record)
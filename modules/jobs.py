@@ -0,0 +1,215 @@
+import itertools
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from modules.catalog import AIGENTFLOW_DIR
+from modules.runner import OutputCapture, run_action, terminate_process
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+FINISHED = "finished"
+FAILED = "failed"
+CANCELLED = "cancelled"
+DONE_STATES = (FINISHED, FAILED, CANCELLED)
+
+MAX_WORKERS = int(os.getenv("AIGENTFLOW_MAX_JOBS", "4"))
+# Finished jobs kept for the UI; older ones are dropped with their spilled output
+MAX_FINISHED_JOBS = int(os.getenv("AIGENTFLOW_MAX_FINISHED_JOBS", "100"))
+CANCEL_GRACE_SECONDS = 3.0
+OUTPUT_DIR = AIGENTFLOW_DIR / "outputs"
+# Characters of each stream kept in memory per job; the full output is spilled to OUTPUT_DIR
+TAIL_CHARS = 64 * 1024
+
+
+class Job:
+    """State of one background action run, updated by the worker thread and polled by the UI."""
+
+    _counter = itertools.count(1)
+
+    def __init__(self, action_name, content, variable_values, cache=None, limits=None, shell=True):
+        self.id = f"{next(self._counter)}-{uuid.uuid4().hex[:8]}"
+        self.action_name = action_name
+        self.content = content
+        self.variable_values = dict(variable_values)
+        self.cache = cache
+        self.limits = limits
+        self.shell = shell
+        self.status = QUEUED
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+        self.error = None
+        self.process = None
+        self.future = None
+        self.cancel_requested = False
+        self.stdout = OutputCapture(tail_chars=TAIL_CHARS, spill_path=OUTPUT_DIR / f"{self.id}.stdout.log")
+        self.stderr = OutputCapture(tail_chars=TAIL_CHARS, spill_path=OUTPUT_DIR / f"{self.id}.stderr.log")
+
+    @property
+    def done(self):
+        return self.status in DONE_STATES
+
+    @property
+    def elapsed(self):
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+    def progress(self):
+        """A snapshot that is safe to render from another thread."""
+        return {
+            "id": self.id,
+            "action_name": self.action_name,
+            "status": self.status,
+            "elapsed": self.elapsed,
+            "returncode": self.result["returncode"] if self.result else None,
+            "stdout_bytes": self.stdout.bytes,
+            "stderr_bytes": self.stderr.bytes,
+        }
+
+
+class JobManager:
+    """
+    Runs actions on a pool of worker threads and tracks them by job id.
+
+    Each worker just waits on its action's subprocess, so several actions run
+    concurrently while the Streamlit script thread only submits and polls.
+    """
+
+    def __init__(self, max_workers=MAX_WORKERS, max_finished=MAX_FINISHED_JOBS):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="aigentflow-job")
+        self.max_finished = max_finished
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, action_name, content, variable_values, cache=None, limits=None, shell=True):
+        job = Job(action_name, content, variable_values, cache=cache, limits=limits, shell=shell)
+        with self._lock:
+            self._jobs[job.id] = job
+        job.future = self._executor.submit(self._run, job)
+        return job.id
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self, job_ids=None):
+        with self._lock:
+            if job_ids is None:
+                return list(self._jobs.values())
+            return [self._jobs[job_id] for job_id in job_ids if job_id in self._jobs]
+
+    def status(self, job_id):
+        job = self.get(job_id)
+        return job.progress() if job else None
+
+    def cancel(self, job_id):
+        """Cancel a queued job, or terminate the process of a running one. Returns False if already done."""
+        job = self.get(job_id)
+        if job is None or job.done:
+            return False
+        job.cancel_requested = True
+        if job.future.cancel():
+            job.status = CANCELLED
+            job.finished_at = time.time()
+            return True
+        process = job.process
+        if process is not None:
+            terminate_process(process)
+            timer = threading.Timer(CANCEL_GRACE_SECONDS, terminate_process, args=(process,), kwargs={"kill": True})
+            timer.daemon = True
+            timer.start()
+        return True
+
+    def forget(self, job_id):
+        """Drop a finished job and its spilled output files."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or not job.done:
+                return
+            del self._jobs[job_id]
+        self._delete_outputs(job)
+
+    def _delete_outputs(self, job):
+        for capture in (job.stdout, job.stderr):
+            if capture.spill_path is not None:
+                capture.spill_path.unlink(missing_ok=True)
+
+    def _prune(self):
+        """Forget the oldest finished jobs beyond `max_finished`, whether or not a session cleared them."""
+        with self._lock:
+            finished = [job for job in self._jobs.values() if job.done]
+            excess = len(finished) - self.max_finished
+            if excess <= 0:
+                return
+            finished.sort(key=lambda job: job.finished_at or job.submitted_at)
+            evicted = finished[:excess]
+            for job in evicted:
+                del self._jobs[job.id]
+        for job in evicted:
+            self._delete_outputs(job)
+        logger.debug(f"Dropped {len(evicted)} finished jobs")
+
+    def shutdown(self):
+        for job in self.jobs():
+            self.cancel(job.id)
+        self._executor.shutdown(wait=False)
+
+    def _run(self, job):
+        if job.cancel_requested:
+            job.status = CANCELLED
+            job.finished_at = time.time()
+            self._prune()
+            return
+        job.status = RUNNING
+        job.started_at = time.time()
+
+        def on_start(process):
+            job.process = process
+            if job.cancel_requested:
+                terminate_process(process)
+
+        try:
+            job.result = run_action(
+                job.action_name,
+                job.content,
+                job.variable_values,
+                on_start=on_start,
+                stdout=job.stdout,
+                stderr=job.stderr,
+                cache=job.cache,
+                limits=job.limits,
+                shell=job.shell,
+            )
+            if job.cancel_requested:
+                job.status = CANCELLED
+            else:
+                job.status = FINISHED if job.result["returncode"] == 0 else FAILED
+        except Exception as e:
+            logger.error(f"Job {job.id} ({job.action_name}) crashed: {e}")
+            job.error = str(e)
+            job.status = FAILED
+        finally:
+            job.finished_at = time.time()
+            job.process = None
+        self._prune()
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_job_manager():
+    """Process-wide job manager shared by every Streamlit session."""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = JobManager()
+        return _manager
@@ -0,0 +1,418 @@
+import atexit
+import heapq
+import itertools
+import json
+import logging
+import os
+import queue
+import struct
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends from several processes are not serialised
+    fcntl = None
+
+from modules import search_index
+from modules.catalog import AIGENTFLOW_DIR
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_DIR = AIGENTFLOW_DIR / "journal"
+SEGMENT_MAX_BYTES = 64 * 1024 * 1024
+
+# Records are appended when a run finishes, so their start timestamps are only ordered
+# to within the longest run; date-range scans stop once they are this far past the range
+TIMESTAMP_SLACK = 3600.0
+
+# Sidecar index entry: offset, length, timestamp, duration, returncode, crc32(name)
+INDEX_ENTRY = struct.Struct("<QIddiI")
+
+
+def name_hash(name):
+    return zlib.crc32((name or "").encode("utf-8"))
+
+
+def pack_entry(offset, length, record):
+    returncode = record.get("returncode")
+    return INDEX_ENTRY.pack(
+        offset,
+        length,
+        float(record.get("timestamp") or 0.0),
+        float(record.get("duration") or 0.0),
+        int(returncode) if returncode is not None else -1,
+        name_hash(record.get("name")),
+    )
+
+
+class IndexEntry:
+    __slots__ = ("segment", "offset", "length", "timestamp", "duration", "returncode", "name_hash")
+
+    def __init__(self, segment, offset, length, timestamp, duration, returncode, name_hash):
+        self.segment = segment
+        self.offset = offset
+        self.length = length
+        self.timestamp = timestamp
+        self.duration = duration
+        self.returncode = returncode
+        self.name_hash = name_hash
+
+
+class Journal:
+    """
+    Append-only execution journal.
+
+    Records are JSON lines in numbered segments (`000001.jsonl`, ...) that rotate
+    once they reach `segment_max_bytes`. Each segment has a `.idx` sidecar of
+    fixed-size entries (offset, length and a few filterable fields) so readers can
+    seek straight to any record without parsing the segment.
+    """
+
+    def __init__(self, directory=JOURNAL_DIR, segment_max_bytes=SEGMENT_MAX_BYTES):
+        self.directory = Path(directory)
+        self.segment_max_bytes = segment_max_bytes
+        self._lock = threading.Lock()
+        self._data = None
+        self._index = None
+        self._segment = None
+        self._size = 0
+        self._lock_file = None
+
+    def segments(self):
+        if not self.directory.exists():
+            return []
+        return sorted(int(path.stem) for path in self.directory.glob("*.jsonl") if path.stem.isdigit())
+
+    def segment_path(self, segment, suffix=".jsonl"):
+        return self.directory / f"{segment:06d}{suffix}"
+
+    def append_many(self, records):
+        """
+        Append records with one write and one flush per segment touched.
+        Returns the (segment, offset, length) of each record.
+        """
+        with self._lock, self._process_lock():
+            self._sync_active()
+            data_chunks, index_chunks, positions = [], [], []
+            for record in records:
+                line = (json.dumps(record, default=str) + "\n").encode("utf-8")
+                if self._size and self._size + len(line) > self.segment_max_bytes:
+                    self._write(data_chunks, index_chunks)
+                    data_chunks, index_chunks = [], []
+                    self._rotate()
+                index_chunks.append(pack_entry(self._size, len(line), record))
+                data_chunks.append(line)
+                positions.append((self._segment, self._size, len(line)))
+                self._size += len(line)
+            self._write(data_chunks, index_chunks)
+            return positions
+
+    def iter_index(self, reverse=False, chunk_entries=4096):
+        """Yield IndexEntry objects across all segments, reading the index in fixed-size chunks."""
+        segments = self.segments()
+        for segment in reversed(segments) if reverse else segments:
+            path = self.segment_path(segment, ".idx")
+            try:
+                file = open(path, "rb")
+            except FileNotFoundError:
+                continue
+            with file:
+                count = os.fstat(file.fileno()).st_size // INDEX_ENTRY.size
+                starts = range(0, count, chunk_entries)
+                for start in reversed(starts) if reverse else starts:
+                    file.seek(start * INDEX_ENTRY.size)
+                    data = file.read(min(chunk_entries, count - start) * INDEX_ENTRY.size)
+                    entries = [IndexEntry(segment, *fields) for fields in INDEX_ENTRY.iter_unpack(data)]
+                    yield from reversed(entries) if reverse else entries
+
+    def segment_counts(self):
+        counts = []
+        for segment in self.segments():
+            try:
+                size = self.segment_path(segment, ".idx").stat().st_size
+            except FileNotFoundError:
+                size = 0
+            counts.append((segment, size // INDEX_ENTRY.size))
+        return counts
+
+    def count(self):
+        return sum(count for _, count in self.segment_counts())
+
+    def entries_at(self, start, stop, reverse=False):
+        """Random access to index entries by global position, seeking straight into the .idx files."""
+        counts = self.segment_counts()
+        if reverse:
+            total = sum(count for _, count in counts)
+            start, stop = max(total - stop, 0), max(total - start, 0)
+        entries = []
+        base = 0
+        for segment, count in counts:
+            lo, hi = max(start - base, 0), min(stop - base, count)
+            if lo < hi:
+                with open(self.segment_path(segment, ".idx"), "rb") as file:
+                    file.seek(lo * INDEX_ENTRY.size)
+                    data = file.read((hi - lo) * INDEX_ENTRY.size)
+                entries.extend(IndexEntry(segment, *fields) for fields in INDEX_ENTRY.iter_unpack(data))
+            base += count
+            if base >= stop:
+                break
+        return entries[::-1] if reverse else entries
+
+    def query(self, name=None, since=None, until=None, returncode=None, sort="newest", offset=0, limit=50):
+        """
+        Return one page of records and whether more follow.
+
+        Filters run against the sidecar index, so only the records on the page are
+        read and parsed. `returncode` is an int, "success" or "failed"; `sort` is
+        "newest", "oldest" or "slowest".
+        """
+        filtered = any(value is not None for value in (name, since, until, returncode))
+        if not filtered and sort in ("newest", "oldest"):
+            entries = self.entries_at(offset, offset + limit + 1, reverse=sort == "newest")
+            records = [self.read(entry) for entry in entries]
+        else:
+            wanted = name_hash(name) if name is not None else None
+
+            def matches(entry):
+                if wanted is not None and entry.name_hash != wanted:
+                    return False
+                if since is not None and entry.timestamp < since:
+                    return False
+                if until is not None and entry.timestamp >= until:
+                    return False
+                if returncode == "success":
+                    return entry.returncode == 0
+                if returncode == "failed":
+                    return entry.returncode != 0
+                return returncode is None or entry.returncode == returncode
+
+            def verified(entries):
+                # Name hashes can collide, so confirm the name on the records actually read
+                for entry in entries:
+                    record = self.read(entry)
+                    if name is None or record.get("name") == name:
+                        yield record
+
+            entries = self.iter_index(reverse=sort != "oldest")
+            if sort != "oldest" and since is not None:
+                entries = itertools.takewhile(lambda entry: entry.timestamp >= since - TIMESTAMP_SLACK, entries)
+            elif sort == "oldest" and until is not None:
+                entries = itertools.takewhile(lambda entry: entry.timestamp < until + TIMESTAMP_SLACK, entries)
+            candidates = filter(matches, entries)
+            if sort == "slowest":
+                candidates = heapq.nlargest(offset + limit + 1, candidates, key=lambda entry: entry.duration)
+            records = list(itertools.islice(verified(candidates), offset, offset + limit + 1))
+        return records[:limit], len(records) > limit
+
+    def read(self, entry):
+        return self.read_at(entry.segment, entry.offset, entry.length)
+
+    def read_at(self, segment, offset, length):
+        with open(self.segment_path(segment), "rb") as file:
+            file.seek(offset)
+            return json.loads(file.read(length))
+
+    def iter_positioned(self, after=(0, -1)):
+        """Yield (segment, offset, length, record) for every record stored after position `after`."""
+        for segment in self.segments():
+            if segment < after[0]:
+                continue
+            with open(self.segment_path(segment), "rb") as file:
+                offset = 0
+                if segment == after[0] and after[1] >= 0:
+                    # Seek to the last record already seen and skip it
+                    file.seek(after[1])
+                    offset = after[1] + len(file.readline())
+                for line in file:
+                    if not line.endswith(b"\n"):
+                        break
+                    yield segment, offset, len(line), json.loads(line)
+                    offset += len(line)
+
+    def iter_records(self):
+        for segment in self.segments():
+            with open(self.segment_path(segment), "rb") as file:
+                for line in file:
+                    if line.endswith(b"\n"):
+                        yield json.loads(line)
+
+    def close(self):
+        with self._lock:
+            self._close_active()
+            if self._lock_file is not None:
+                self._lock_file.close()
+                self._lock_file = None
+
+    @contextmanager
+    def _process_lock(self):
+        """Serialise appends with other processes (the app and the CLI) writing to this journal."""
+        if self._lock_file is None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._lock_file = open(self.directory / "journal.lock", "ab")
+        if fcntl is None:
+            yield
+            return
+        fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _sync_active(self):
+        """
+        Called under the process lock: follow rotations done by other writers and take the
+        segment size from the file, not from what this process last wrote.
+        """
+        segments = self.segments()
+        if self._data is None or (segments and segments[-1] != self._segment):
+            self._close_active()
+            self._open_active()
+            return
+        size = os.fstat(self._data.fileno()).st_size
+        if size != self._size:
+            # Another process appended; it may also have died mid-write, so re-check the tail
+            self._recover(self._segment)
+            self._size = os.fstat(self._data.fileno()).st_size
+
+    def _close_active(self):
+        if self._data is not None:
+            self._data.close()
+            self._index.close()
+            self._data = self._index = None
+
+    def _write(self, data_chunks, index_chunks):
+        if not data_chunks:
+            return
+        # Data first: a crash between the two writes leaves records _recover() can re-index
+        self._data.write(b"".join(data_chunks))
+        self._data.flush()
+        self._index.write(b"".join(index_chunks))
+        self._index.flush()
+
+    def _open_active(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        segments = self.segments()
+        self._segment = segments[-1] if segments else 1
+        self._recover(self._segment)
+        self._data = open(self.segment_path(self._segment), "ab")
+        self._index = open(self.segment_path(self._segment, ".idx"), "ab")
+        self._size = self._data.tell()
+
+    def _rotate(self):
+        self._data.close()
+        self._index.close()
+        self._segment += 1
+        self._data = open(self.segment_path(self._segment), "ab")
+        self._index = open(self.segment_path(self._segment, ".idx"), "ab")
+        self._size = 0
+
+    def _recover(self, segment):
+        """Drop a torn trailing line and index any records written after the last index entry."""
+        data_path = self.segment_path(segment)
+        index_path = self.segment_path(segment, ".idx")
+        if not data_path.exists():
+            return
+        index_size = index_path.stat().st_size if index_path.exists() else 0
+        complete_entries = index_size // INDEX_ENTRY.size
+        indexed_end = 0
+        with open(index_path, "ab+") as index_file:
+            index_file.truncate(complete_entries * INDEX_ENTRY.size)
+            if complete_entries:
+                index_file.seek((complete_entries - 1) * INDEX_ENTRY.size)
+                offset, length, *_ = INDEX_ENTRY.unpack(index_file.read(INDEX_ENTRY.size))
+                indexed_end = offset + length
+            with open(data_path, "rb+") as data_file:
+                data_file.seek(indexed_end)
+                offset = indexed_end
+                for line in data_file:
+                    if not line.endswith(b"\n"):
+                        break
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        break
+                    index_file.write(pack_entry(offset, len(line), record))
+                    offset += len(line)
+                data_file.truncate(offset)
+
+
+class JournalWriter:
+    """
+    Background group-commit writer.
+
+    submit() only enqueues; a daemon thread drains the queue and appends every
+    record that arrived within `linger` seconds with a single write, so recording
+    history never blocks the caller on disk I/O.
+    """
+
+    def __init__(self, journal, linger=0.05, max_batch=1000):
+        self.journal = journal
+        self.linger = linger
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="JournalWriter", daemon=True)
+        self._thread.start()
+
+    def submit(self, record):
+        self._queue.put(record)
+
+    def flush(self):
+        """Block until every submitted record has been written."""
+        self._queue.join()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.linger
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                positions = self.journal.append_many(batch)
+                try:
+                    search_index.index_journaled(batch, positions)
+                except Exception as e:
+                    # The records are on disk; search catches up on its next sync
+                    logger.error(f"Failed to index {len(batch)} journal records: {e}")
+            except Exception as e:
+                logger.error(f"Failed to write {len(batch)} journal records: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+
+_journal = None
+_writer = None
+_journal_lock = threading.Lock()
+
+
+def get_journal():
+    global _journal
+    with _journal_lock:
+        if _journal is None:
+            _journal = Journal()
+        return _journal
+
+
+def get_writer():
+    global _writer
+    journal = get_journal()
+    with _journal_lock:
+        if _writer is None:
+            _writer = JournalWriter(journal)
+            atexit.register(_writer.flush)
+        return _writer
+
+
+def record_execution(record):
+    """Queue an execution record for the journal; returns immediately."""
+    get_writer().submit(record)
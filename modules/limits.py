@@ -0,0 +1,160 @@
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+LIMIT_KEYS = ("timeout", "cpu_seconds", "max_rss_mb")
+POLL_INTERVAL = 0.25
+KILL_GRACE_SECONDS = 3
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+PROC = "/proc"
+
+TIMEOUT = "timeout"
+CPU = "cpu_seconds"
+MEMORY = "max_rss_mb"
+
+
+def limit_options(config):
+    """
+    Normalise an action's "limits" setting, e.g. {"timeout": 60, "cpu_seconds": 30, "max_rss_mb": 512}.
+
+    Missing or empty values mean no limit. Returns None when no limit is set.
+    """
+    if not config:
+        return None
+    options = {}
+    for key in LIMIT_KEYS:
+        value = config.get(key)
+        if value in (None, ""):
+            continue
+        value = float(value)
+        if value <= 0:
+            raise ValueError(f"Limit {key} must be positive, got {value}")
+        options[key] = value
+    return options or None
+
+
+def rlimits(options):
+    """(resource, (soft, hard)) pairs to apply in the child. CPU time is the one kernels enforce per process."""
+    if resource is None or not options or CPU not in options:
+        return []
+    seconds = max(1, int(options[CPU]))
+    # SIGXCPU at the soft limit, SIGKILL one second later for processes that ignore it
+    return [(resource.RLIMIT_CPU, (seconds, seconds + 1))]
+
+
+def apply_rlimits(limits):
+    for name, values in limits:
+        resource.setrlimit(name, values)
+
+
+def preexec(options):
+    """preexec_fn for subprocess.Popen, or None when there is nothing to apply."""
+    limits = rlimits(options)
+    if not limits:
+        return None
+    return lambda: apply_rlimits(limits)
+
+
+def rusage_fields(usage):
+    """CPU seconds and peak RSS in bytes from a resource.struct_rusage (ru_maxrss is KB on Linux, bytes on macOS)."""
+    return {
+        "cpu_user": usage.ru_utime,
+        "cpu_system": usage.ru_stime,
+        "max_rss": usage.ru_maxrss * (1 if sys.platform == "darwin" else 1024),
+    }
+
+
+def cpu_exceeded(returncode):
+    """True if the process (or the shell reporting it) died from SIGXCPU."""
+    if os.name != "posix" or returncode is None:
+        return False
+    return returncode in (-signal.SIGXCPU, 128 + signal.SIGXCPU)
+
+
+def group_usage(pgid):
+    """Total RSS (bytes) and CPU (seconds) of every process in group `pgid`, read from /proc. None if unavailable."""
+    rss = cpu = 0
+    found = False
+    try:
+        entries = os.listdir(PROC)
+    except OSError:
+        return None
+    for entry in entries:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"{PROC}/{entry}/stat", "rb") as file:
+                stat = file.read()
+        except OSError:
+            continue
+        # The command name may contain spaces, so split after its closing parenthesis
+        fields = stat[stat.rfind(b")") + 2:].split()
+        if int(fields[2]) != pgid:
+            continue
+        found = True
+        # utime + stime, plus cutime + cstime of children that already exited
+        cpu += sum(int(value) for value in fields[11:15]) / CLOCK_TICKS
+        rss += int(fields[21]) * PAGE_SIZE
+    return (rss, cpu) if found else None
+
+
+class Watchdog:
+    """
+    Watches one running action and stops its process group when it goes over a limit.
+
+    The wall-clock timeout works everywhere. Memory (RSS) and CPU time are summed
+    over the whole process group from /proc on Linux, so children of the shell count
+    too; CPU is also capped per process with RLIMIT_CPU. `limit_hit` names the limit
+    that stopped the process.
+    """
+
+    def __init__(self, process, options, terminate, interval=POLL_INTERVAL):
+        self.process = process
+        self.options = options
+        self.terminate = terminate
+        self.interval = interval
+        self.limit_hit = None
+        self._stopped = threading.Event()
+        self._track_group = os.name == "posix" and os.path.isdir(PROC) and (MEMORY in options or CPU in options)
+        self._thread = threading.Thread(target=self._watch, name="aigentflow-watchdog", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+
+    def _watch(self):
+        started = time.monotonic()
+        # Runs until stop(): children may outlive the shell and still hold the output pipes
+        while not self._stopped.wait(self.interval):
+            if TIMEOUT in self.options and time.monotonic() - started > self.options[TIMEOUT]:
+                return self._stop_process(TIMEOUT)
+            if self._track_group:
+                usage = group_usage(self.process.pid)
+                if usage is None:
+                    continue
+                rss, cpu = usage
+                if MEMORY in self.options and rss > self.options[MEMORY] * 1024 * 1024:
+                    return self._stop_process(MEMORY)
+                if CPU in self.options and cpu > self.options[CPU]:
+                    return self._stop_process(CPU)
+
+    def _stop_process(self, limit):
+        self.limit_hit = limit
+        logger.warning(f"Process {self.process.pid} exceeded its {limit} limit ({self.options[limit]:g}); stopping it")
+        self.terminate(self.process)
+        if not self._stopped.wait(KILL_GRACE_SECONDS):
+            self.terminate(self.process, kill=True)
@@ -0,0 +1,56 @@
+import re
+import streamlit as st
+from modules import blob_store
+
+MAX_LISTED_MATCHES = 20
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def search_blob(digest, query, regex):
+    # Blobs never change, so a search is cached by digest
+    with blob_store.BlobReader(digest) as reader:
+        return reader.search(query, regex=regex)
+
+def display_preview(text, note_truncated=True, success=False):
+    """The end of an output; the full text stays in the blob store or the journal."""
+    shown = blob_store.preview(text)
+    if success:
+        st.success(shown)
+    else:
+        st.text(shown)
+    if note_truncated and len(shown) < len(text):
+        st.caption(f"Showing the last {len(shown)} of {len(text)} characters.")
+
+def display_full_output(digest, key, label="Show full output"):
+    """A toggle that opens the paged viewer, so collapsed outputs cost nothing on reruns."""
+    if digest and st.toggle(label, key=f"{key}_show"):
+        display_blob(digest, key)
+
+@st.fragment
+def display_blob(digest, key):
+    if not blob_store.exists(digest):
+        st.caption("The full output is no longer stored (the blob store keeps the most recently used outputs).")
+        return
+    page_key = f"{key}_page"
+    with blob_store.BlobReader(digest) as reader:
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            query = st.text_input("Search output", key=f"{key}_query")
+        with col2:
+            regex = st.checkbox("Regex", key=f"{key}_regex")
+        if query:
+            try:
+                matches = search_blob(digest, query, regex)
+            except re.error as e:
+                st.error(f"Invalid search: {e}")
+                matches = []
+            limit_note = "+" if len(matches) >= blob_store.MAX_MATCHES else ""
+            st.caption(f"{len(matches)}{limit_note} matches")
+            for i, match in enumerate(matches[:MAX_LISTED_MATCHES]):
+                if st.button(f"line {match['line']}: {match['text'].strip()}", key=f"{key}_match_{i}"):
+                    # The page widget below is not created yet in this run, so it can still be set
+                    st.session_state[page_key] = match["page"] + 1
+        if not 1 <= st.session_state.get(page_key, 1) <= reader.pages:
+            st.session_state[page_key] = 1
+        page = st.number_input("Page", min_value=1, max_value=reader.pages, key=page_key)
+        st.caption(f"Page {page} of {reader.pages} · {reader.size} bytes")
+        st.code(reader.page(page - 1), language=None)
@@ -0,0 +1,76 @@
+# Latency and resource statistics computed from the execution journal, for the Performance page.
+
+from modules.journal import get_journal
+
+COLUMNS = [
+    "name",
+    "timestamp",
+    "duration",
+    "returncode",
+    "cached",
+    "cpu_user",
+    "cpu_system",
+    "max_rss",
+    "stdout_bytes",
+    "stderr_bytes",
+    "limit_hit",
+]
+NUMERIC_COLUMNS = ["timestamp", "duration", "returncode", "cpu_user", "cpu_system", "max_rss", "stdout_bytes", "stderr_bytes"]
+QUANTILES = {"p50": 0.5, "p95": 0.95, "p99": 0.99}
+DEFAULT_MAX_RUNS = 20000
+
+
+def load_runs(since=None, max_runs=DEFAULT_MAX_RUNS, journal=None):
+    """Newest journaled runs as a DataFrame of telemetry columns only (output text is dropped)."""
+    import pandas as pd
+
+    journal = journal or get_journal()
+    records, _ = journal.query(since=since, sort="newest", limit=max_runs)
+    runs = pd.DataFrame([{column: record.get(column) for column in COLUMNS} for record in records], columns=COLUMNS)
+    for column in NUMERIC_COLUMNS:
+        # Runs journaled before telemetry existed have no CPU/RSS values
+        runs[column] = pd.to_numeric(runs[column], errors="coerce")
+    runs["cached"] = runs["cached"].eq(True)
+    runs["time"] = pd.to_datetime(runs["timestamp"], unit="s")
+    runs["cpu"] = runs["cpu_user"] + runs["cpu_system"]
+    runs["max_rss_mb"] = runs["max_rss"] / (1024 * 1024)
+    runs["output_kb"] = (runs["stdout_bytes"].fillna(0) + runs["stderr_bytes"].fillna(0)) / 1024
+    return runs
+
+
+def executed(runs):
+    """Runs that actually started a process: cache hits would drag the percentiles down."""
+    return runs[~runs["cached"]]
+
+
+def latency_summary(runs):
+    """One row per action: runs, failure rate, p50/p95/p99 wall time, median CPU, peak RSS and output size."""
+    import pandas as pd
+
+    columns = ["runs", "cached_runs", "failure_rate", *QUANTILES, "cpu_p50", "max_rss_mb", "output_kb_p50", "last_run"]
+    frame = executed(runs)
+    if frame.empty:
+        return pd.DataFrame(columns=columns)
+    grouped = frame.groupby("name")
+    summary = pd.DataFrame({"runs": grouped.size()})
+    summary["cached_runs"] = runs[runs["cached"]].groupby("name").size().reindex(summary.index, fill_value=0)
+    summary["failure_rate"] = grouped["returncode"].apply(lambda codes: float((codes != 0).mean()))
+    for label, quantile in QUANTILES.items():
+        summary[label] = grouped["duration"].quantile(quantile)
+    summary["cpu_p50"] = grouped["cpu"].median()
+    summary["max_rss_mb"] = grouped["max_rss_mb"].max()
+    summary["output_kb_p50"] = grouped["output_kb"].median()
+    summary["last_run"] = grouped["time"].max()
+    return summary[columns].sort_values("p95", ascending=False)
+
+
+def trend(runs, column="duration", quantile=0.95, freq="D", names=None):
+    """`quantile` of `column` per time bucket (pandas offset alias `freq`), one column per action."""
+    import pandas as pd
+
+    frame = executed(runs)
+    if names:
+        frame = frame[frame["name"].isin(names)]
+    if frame.empty:
+        return pd.DataFrame()
+    return frame.groupby([pd.Grouper(key="time", freq=freq), "name"])[column].quantile(quantile).unstack("name")
@@ -0,0 +1,65 @@
+import time
+import streamlit as st
+from modules.journal import get_journal
+from modules.performance import DEFAULT_MAX_RUNS, QUANTILES, latency_summary, load_runs, trend
+
+PERIODS = {"Last 24 hours": 86400, "Last 7 days": 7 * 86400, "Last 30 days": 30 * 86400, "All time": None}
+BUCKETS = {"Hour": "h", "Day": "D", "Week": "W"}
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def cached_runs(period, max_runs, journal_version):
+    # Journal records never change once written, so the parsed runs only go stale when
+    # more are appended or old segments are dropped; `journal_version` says which
+    return load_runs(since=time.time() - period if period else None, max_runs=max_runs)
+
+def display_performance():
+    st.title("Performance")
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        period = PERIODS[st.selectbox("Period", list(PERIODS), index=1, key="performance_period")]
+    with col2:
+        bucket = BUCKETS[st.selectbox("Trend bucket", list(BUCKETS), index=1, key="performance_bucket")]
+    with col3:
+        max_runs = st.number_input("Max runs", min_value=100, max_value=500000, value=DEFAULT_MAX_RUNS, step=1000, key="performance_max_runs")
+
+    runs = cached_runs(period, max_runs, tuple(get_journal().segment_counts()))
+    if period:
+        # A cached frame may predate runs that have since aged out of the period
+        runs = runs[runs["timestamp"] >= time.time() - period]
+    if runs.empty:
+        st.info("No executions recorded in this period.")
+        return
+
+    summary = latency_summary(runs)
+    executed_runs = int(summary["runs"].sum()) if not summary.empty else 0
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Runs", len(runs))
+    col2.metric("Cache hits", int(runs["cached"].sum()))
+    col3.metric("Failed", int((runs["returncode"] != 0).sum()))
+    if len(runs) >= max_runs:
+        st.caption(f"Only the newest {max_runs} runs are included.")
+
+    st.header("Latency by action")
+    st.caption(f"Wall time in seconds over {executed_runs} executed runs (cache hits excluded); CPU is user + system seconds.")
+    st.dataframe(
+        summary,
+        column_config={
+            "failure_rate": st.column_config.NumberColumn("failure rate", format="percent"),
+            **{label: st.column_config.NumberColumn(label, format="%.3f") for label in QUANTILES},
+            "cpu_p50": st.column_config.NumberColumn("CPU p50", format="%.3f"),
+            "max_rss_mb": st.column_config.NumberColumn("max RSS (MB)", format="%.1f"),
+            "output_kb_p50": st.column_config.NumberColumn("output p50 (KB)", format="%.1f"),
+        },
+    )
+
+    st.header("Trends")
+    names = list(summary.index)
+    selected = st.multiselect("Actions", names, default=names[:5], key="performance_actions")
+    quantile_label = st.radio("Percentile", list(QUANTILES), index=1, horizontal=True, key="performance_quantile")
+    quantile = QUANTILES[quantile_label]
+    st.subheader(f"Wall time {quantile_label} (s)")
+    st.line_chart(trend(runs, "duration", quantile, bucket, selected))
+    st.subheader(f"CPU time {quantile_label} (s)")
+    st.line_chart(trend(runs, "cpu", quantile, bucket, selected))
+    st.subheader("Peak RSS (MB)")
+    st.line_chart(trend(runs, "max_rss_mb", 1.0, bucket, selected))
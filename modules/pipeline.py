@@ -0,0 +1,245 @@
+# Pipelines chain prompts and actions: each node's output fills a named variable of
+# the nodes that take it as input. They are stored like the other objects, under
+# .aigentflow/pipelines/<name>.json:
+#
+#   {
+#     "name": "Translate and run",
+#     "nodes": [
+#       {"id": "translate", "type": "prompt", "ref": "Translate to english", "variables": {"message": "hola"}},
+#       {"id": "run", "type": "action", "ref": "Run In LLM Chat", "inputs": {"prompt": "translate"}}
+#     ]
+#   }
+#
+# A prompt node outputs its rendered text, an action node its stdout. A node may also
+# carry its own "content", which is used instead of the referenced object's content.
+# Nodes whose inputs are ready run concurrently; a failed node skips everything downstream.
+
+import logging
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from modules.runner import run_action
+from modules.storage import get_backend
+from modules.template import render
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONCURRENCY = int(os.getenv("AIGENTFLOW_PIPELINE_CONCURRENCY", "4"))
+NODE_KINDS = {"prompt": "prompts", "action": "actions"}
+
+PENDING = "pending"
+RUNNING = "running"
+FINISHED = "finished"
+FAILED = "failed"
+SKIPPED = "skipped"
+
+
+def load_pipelines():
+    return get_backend().load("pipelines")
+
+
+def get_pipeline(name):
+    return get_backend().get("pipelines", name)
+
+
+def save_pipeline(pipeline):
+    topological_order(pipeline)
+    get_backend().save("pipelines", pipeline)
+
+
+def topological_order(pipeline):
+    """Check the node graph and return the node ids in dependency order. Raises ValueError."""
+    nodes = pipeline.get("nodes") or []
+    if not nodes:
+        raise ValueError("A pipeline needs at least one node")
+    ids = [node.get("id") for node in nodes]
+    for node in nodes:
+        if not node.get("id"):
+            raise ValueError("Every node needs an id")
+        if ids.count(node["id"]) > 1:
+            raise ValueError(f"Duplicate node id: {node['id']}")
+        if node.get("type") not in NODE_KINDS:
+            raise ValueError(f"Node {node['id']}: type must be one of {', '.join(NODE_KINDS)}")
+        if not node.get("ref") and "content" not in node:
+            raise ValueError(f"Node {node['id']}: missing ref")
+        for variable, source in node.get("inputs", {}).items():
+            if source not in ids:
+                raise ValueError(f"Node {node['id']}: input {variable} comes from unknown node {source}")
+
+    remaining = {node["id"]: set(node.get("inputs", {}).values()) for node in nodes}
+    order = []
+    while remaining:
+        ready = [node_id for node_id in ids if node_id in remaining and not remaining[node_id]]
+        if not ready:
+            raise ValueError(f"Cycle between nodes: {', '.join(sorted(remaining))}")
+        for node_id in ready:
+            del remaining[node_id]
+            for dependencies in remaining.values():
+                dependencies.discard(node_id)
+        order.extend(ready)
+    return order
+
+
+def node_variables(obj, node, outputs):
+    """Referenced object's defaults, then the node's own values, then upstream outputs."""
+    values = {var["name"]: var.get("default", "") for var in (obj or {}).get("variables", [])}
+    values.update(node.get("variables", {}))
+    values.update({variable: outputs[source] for variable, source in node.get("inputs", {}).items()})
+    return values
+
+
+class PipelineRun:
+    """
+    Runs a pipeline on a thread pool, launching each node as soon as all of its inputs are done.
+
+    `results` maps node ids to their status, output and timing, so the UI can poll it
+    while the run is in progress.
+    """
+
+    def __init__(self, pipeline, concurrency=DEFAULT_CONCURRENCY):
+        self.pipeline = pipeline
+        self.order = topological_order(pipeline)
+        self.nodes = {node["id"]: node for node in pipeline["nodes"]}
+        self.concurrency = max(1, int(concurrency))
+        self.results = {
+            node_id: {"id": node_id, "type": self.nodes[node_id]["type"], "ref": self.nodes[node_id].get("ref"), "status": PENDING}
+            for node_id in self.order
+        }
+        self.outputs = {}
+        self.started_at = None
+        self.finished_at = None
+        self.cancel_requested = False
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def done(self):
+        return sum(result["status"] in (FINISHED, FAILED, SKIPPED) for result in self.results.values())
+
+    @property
+    def total(self):
+        return len(self.order)
+
+    @property
+    def succeeded(self):
+        return all(result["status"] == FINISHED for result in self.results.values())
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, name="aigentflow-pipeline", daemon=True)
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        """Stop launching new nodes; nodes already running finish normally."""
+        self.cancel_requested = True
+
+    def sink_outputs(self):
+        """Outputs of the nodes nothing else depends on: the pipeline's results."""
+        used = {source for node in self.nodes.values() for source in node.get("inputs", {}).values()}
+        return {node_id: self.outputs[node_id] for node_id in self.order if node_id not in used and node_id in self.outputs}
+
+    def run(self):
+        self.started_at = time.time()
+        waiting = {node_id: set(self.nodes[node_id].get("inputs", {}).values()) for node_id in self.order}
+        dependents = {node_id: [] for node_id in self.order}
+        for node_id, dependencies in waiting.items():
+            for dependency in dependencies:
+                dependents[dependency].append(node_id)
+
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="aigentflow-pipeline") as executor:
+            futures = {}
+
+            def launch_ready():
+                for node_id in self.order:
+                    if self.results[node_id]["status"] == PENDING and not waiting[node_id] and node_id not in futures.values():
+                        if self.cancel_requested:
+                            self._skip(node_id, "cancelled")
+                            self._skip_downstream(node_id, dependents)
+                        else:
+                            futures[executor.submit(self._run_node, node_id)] = node_id
+
+            launch_ready()
+            while futures:
+                finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    node_id = futures.pop(future)
+                    try:
+                        future.result()
+                    except Exception as e:
+                        logger.error(f"Pipeline node {node_id} failed: {e}")
+                        self._set(node_id, status=FAILED, error=str(e))
+                    if self.results[node_id]["status"] == FINISHED:
+                        for dependent in dependents[node_id]:
+                            waiting[dependent].discard(node_id)
+                    else:
+                        self._skip_downstream(node_id, dependents)
+                launch_ready()
+        self.finished_at = time.time()
+        return self.results
+
+    def _run_node(self, node_id):
+        node = self.nodes[node_id]
+        obj = get_backend().get(NODE_KINDS[node["type"]], node["ref"]) if node.get("ref") else None
+        if obj is None and "content" not in node:
+            raise ValueError(f"No {node['type']} named {node['ref']!r}")
+        content = node.get("content", obj["content"] if obj else "")
+        values = node_variables(obj, node, self.outputs)
+        self._set(node_id, status=RUNNING, started_at=time.time(), wait=time.time() - self.started_at, variables=values)
+        start = time.perf_counter()
+        if node["type"] == "prompt":
+            output, returncode, extra = render(content, values), 0, {}
+        else:
+            result = run_action(
+                node.get("ref") or node_id,
+                content,
+                values,
+                cache=(obj or {}).get("cache"),
+                limits=node.get("limits", (obj or {}).get("limits")),
+                shell=node.get("shell", (obj or {}).get("shell", True)),
+            )
+            # Trailing newlines from print() would leak into the next node's variable
+            output, returncode = result["stdout"].rstrip("\r\n"), result["returncode"]
+            extra = {
+                "stderr": result["stderr"],
+                "cached": result.get("cached", False),
+                "command": result["command"],
+                "limit_hit": result.get("limit_hit"),
+            }
+        duration = time.perf_counter() - start
+        with self._lock:
+            if returncode == 0:
+                self.outputs[node_id] = output
+        self._set(node_id, status=FINISHED if returncode == 0 else FAILED, output=output, returncode=returncode, duration=duration, **extra)
+
+    def _skip_downstream(self, node_id, dependents):
+        for dependent in dependents[node_id]:
+            if self.results[dependent]["status"] == PENDING:
+                self._skip(dependent, f"input {node_id} did not finish")
+                self._skip_downstream(dependent, dependents)
+
+    def _skip(self, node_id, reason):
+        self._set(node_id, status=SKIPPED, error=reason)
+
+    def _set(self, node_id, **values):
+        with self._lock:
+            self.results[node_id] = {**self.results[node_id], **values}
+
+    def table(self):
+        """Per-node status and timing as one pandas DataFrame."""
+        import pandas as pd
+
+        columns = ["id", "type", "ref", "status", "returncode", "wait", "duration", "cached", "limit_hit", "error"]
+        return pd.DataFrame([self.results[node_id] for node_id in self.order]).reindex(columns=columns)
+
+
+def run_pipeline(pipeline, concurrency=DEFAULT_CONCURRENCY):
+    """Run `pipeline` synchronously and return the finished PipelineRun."""
+    run = PipelineRun(pipeline, concurrency)
+    run.run()
+    return run
@@ -0,0 +1,136 @@
+import json
+import streamlit as st
+from modules.pipeline import DEFAULT_CONCURRENCY, FINISHED, PipelineRun, load_pipelines, save_pipeline, topological_order
+
+EXAMPLE_PIPELINE = {
+    "name": "",
+    "description": "",
+    "nodes": [
+        {"id": "prompt", "type": "prompt", "ref": "Translate to english", "variables": {"message": "hola mundo"}},
+        {"id": "action", "type": "action", "ref": "Run In LLM Chat", "inputs": {"prompt": "prompt"}},
+    ],
+}
+STATUS_ICONS = {"pending": "⏳", "running": "▶️", "finished": "✅", "failed": "❌", "skipped": "⏭️"}
+
+def initialize_session_state():
+    defaults = {
+        "show_pipeline_form": False,
+        "edit_pipeline": None,
+        "pipeline_run": None
+    }
+    for key, value in defaults.items():
+        if key not in st.session_state:
+            st.session_state[key] = value
+
+def pipeline_graph(pipeline, results=None):
+    lines = ["digraph {", "rankdir=LR;", "node [shape=box, style=rounded];"]
+    for node in pipeline["nodes"]:
+        status = results[node["id"]]["status"] if results else None
+        label = f"{node['id']}\\n{node['type']}: {node.get('ref', '')}"
+        if status:
+            label += f"\\n{status}"
+        color = {"finished": "green", "failed": "red", "running": "blue"}.get(status, "black")
+        lines.append(f"{json.dumps(node['id'])} [label={json.dumps(label)}, color={color}];")
+        for variable, source in node.get("inputs", {}).items():
+            lines.append(f"{json.dumps(source)} -> {json.dumps(node['id'])} [label={json.dumps(variable)}];")
+    lines.append("}")
+    return "\n".join(lines)
+
+def display_pipeline_form(pipeline=None):
+    st.header("Edit Pipeline" if pipeline else "Create New Pipeline")
+    st.caption("Nodes are prompts or actions; `inputs` maps a variable of the node to the id of the node whose output fills it.")
+    text = st.text_area("Pipeline (JSON)", value=json.dumps(pipeline or EXAMPLE_PIPELINE, indent=2), height=400)
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button("Save Pipeline", key="save_pipeline"):
+            try:
+                new_pipeline = json.loads(text)
+                if not new_pipeline.get("name"):
+                    raise ValueError("The pipeline needs a name")
+                save_pipeline(new_pipeline)
+            except ValueError as e:
+                st.error(f"Invalid pipeline: {e}")
+            else:
+                st.success("Pipeline saved successfully!")
+                st.session_state.show_pipeline_form = False
+                st.session_state.edit_pipeline = None
+                st.rerun()
+    with col2:
+        if st.button("Cancel", key="cancel_pipeline_form"):
+            st.session_state.show_pipeline_form = False
+            st.session_state.edit_pipeline = None
+            st.rerun()
+
+@st.fragment(run_every=1)
+def display_pipeline_run():
+    run = st.session_state.pipeline_run
+    if run is None:
+        return
+    st.header(f"Pipeline Run: {run.pipeline['name']}")
+    st.progress(run.done / run.total if run.total else 1.0, text=f"{run.done}/{run.total} nodes")
+    st.graphviz_chart(pipeline_graph(run.pipeline, run.results))
+    for node_id in run.order:
+        result = run.results[node_id]
+        timing = f" · {result['duration']:.3f}s" if "duration" in result else ""
+        with st.expander(f"{STATUS_ICONS.get(result['status'], '')} {node_id} · {result['status']}{timing}", expanded=False):
+            if "wait" in result:
+                st.caption(f"Started {result['wait']:.3f}s into the run")
+            if result.get("command"):
+                st.code(result["command"], language="bash")
+            if result.get("output"):
+                st.text(result["output"])
+            if result.get("stderr"):
+                st.error(result["stderr"])
+            if result.get("error"):
+                st.error(result["error"])
+    if run.running:
+        if st.button("Stop launching nodes", key="cancel_pipeline"):
+            run.cancel()
+    else:
+        if run.succeeded:
+            st.success(f"Pipeline finished in {run.finished_at - run.started_at:.2f}s")
+            for node_id, output in run.sink_outputs().items():
+                st.subheader(f"Output of {node_id}")
+                st.text(output)
+        else:
+            st.error("Pipeline did not finish: " + ", ".join(node_id for node_id in run.order if run.results[node_id]["status"] != FINISHED))
+        st.dataframe(run.table())
+        if st.button("Close run", key="close_pipeline_run"):
+            st.session_state.pipeline_run = None
+            st.rerun(scope="app")
+
+def display_pipelines():
+    st.title("Pipelines")
+    initialize_session_state()
+    pipelines = load_pipelines()
+
+    if st.session_state.show_pipeline_form:
+        display_pipeline_form(st.session_state.edit_pipeline)
+    else:
+        st.button("New Pipeline", on_click=lambda: setattr(st.session_state, "show_pipeline_form", True), key="new_pipeline")
+        st.header("Existing Pipelines")
+        if not pipelines:
+            st.write("No pipelines found.")
+        for idx, pipeline in enumerate(pipelines):
+            with st.expander(pipeline["name"]):
+                if pipeline.get("description"):
+                    st.write(pipeline["description"])
+                try:
+                    topological_order(pipeline)
+                except ValueError as e:
+                    st.error(f"Invalid pipeline: {e}")
+                    continue
+                st.graphviz_chart(pipeline_graph(pipeline))
+                concurrency = st.number_input("Concurrency", min_value=1, max_value=64, value=DEFAULT_CONCURRENCY, key=f"pipeline_concurrency_{idx}")
+                col1, col2 = st.columns(2)
+                with col1:
+                    if st.button("Run", key=f"run_pipeline_{idx}", disabled=st.session_state.pipeline_run is not None and st.session_state.pipeline_run.running):
+                        st.session_state.pipeline_run = PipelineRun(pipeline, concurrency).start()
+                        st.rerun()
+                with col2:
+                    if st.button("Edit", key=f"edit_pipeline_{idx}"):
+                        st.session_state.show_pipeline_form = True
+                        st.session_state.edit_pipeline = dict(pipeline)
+                        st.rerun()
+
+    display_pipeline_run()
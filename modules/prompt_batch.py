@@ -0,0 +1,171 @@
+# Renders one prompt template over every row of a table (a pandas DataFrame, a CSV or
+# a JSONL file). Rows are read and written in chunks, so memory stays flat however many
+# rows there are, and each chunk is rendered column-wise instead of row by row:
+#
+#   from modules.prompt_batch import render_to_file
+#   render_to_file("Translate to english:\n\n<message>", "messages.csv", "prompts.jsonl")
+
+import csv
+import io
+import json
+import sys
+from pathlib import Path
+
+from modules.template import compile_template
+
+DEFAULT_CHUNK_ROWS = 10000
+OUTPUT_FORMATS = ("jsonl", "csv")
+PROMPT_COLUMN = "prompt"
+
+
+def input_format(source, fmt=None):
+    name = getattr(source, "name", source)
+    fmt = fmt or Path(str(name)).suffix.lstrip(".").lower()
+    if fmt == "ndjson":
+        return "jsonl"
+    if fmt not in ("csv", "jsonl"):
+        raise ValueError(f"Unsupported batch input format: {fmt or 'unknown'} (use csv or jsonl)")
+    return fmt
+
+
+def iter_chunks(source, fmt=None, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """
+    Yield DataFrames of at most `chunk_rows` rows from a DataFrame, a CSV/JSONL path or
+    an open (e.g. uploaded) file. CSV cells are read as text, empty cells as "".
+    """
+    import pandas as pd
+
+    if isinstance(source, pd.DataFrame):
+        for start in range(0, len(source), chunk_rows):
+            yield source.iloc[start:start + chunk_rows]
+        return
+    fmt = input_format(source, fmt)
+    if fmt == "csv":
+        with pd.read_csv(source, dtype=str, keep_default_na=False, chunksize=chunk_rows, encoding="utf-8-sig") as reader:
+            yield from reader
+        return
+    # read_json would turn integer columns with gaps into floats ("3.0"); object columns keep values as written
+    file = open(source, "rb") if isinstance(source, (str, Path)) else source
+    try:
+        rows = []
+        for line in file:
+            if line.strip():
+                rows.append(json.loads(line))
+            if len(rows) >= chunk_rows:
+                yield pd.DataFrame(rows, dtype=object)
+                rows = []
+        if rows:
+            yield pd.DataFrame(rows, dtype=object)
+    finally:
+        if file is not source:
+            file.close()
+
+
+def render_frame(content, frame, defaults=None):
+    """
+    The prompt for every row of `frame` as a Series of strings.
+
+    Each placeholder takes the column of the same name; rows with no value there (and
+    variables with no column) use `defaults`. Placeholders with neither stay as
+    `<name>`, as when a single prompt is rendered with a value missing.
+    """
+    import pandas as pd
+
+    defaults = defaults or {}
+    segments = compile_template(content).segments
+    # Runs of literal text and scalar defaults are merged so only real columns are concatenated
+    parts, literal = [], [segments[0]]
+    for i in range(1, len(segments), 2):
+        name = segments[i]
+        if name in frame.columns:
+            column = frame[name].astype(object)
+            present = column.notna()
+            if name in defaults:
+                # An empty CSV cell counts as missing when the variable has a default
+                present &= column.ne("")
+            column = column.where(present, str(defaults.get(name, f"<{name}>")))
+            parts.extend(["".join(literal), column.astype(str)])
+            literal = []
+        elif name in defaults:
+            literal.append(str(defaults[name]))
+        else:
+            literal.append(f"<{name}>")
+        literal.append(segments[i + 1])
+    parts.append("".join(literal))
+
+    rendered = pd.Series(parts[0], index=frame.index, dtype=object)
+    for part in parts[1:]:
+        if isinstance(part, str):
+            if part:
+                rendered = rendered + part
+        else:
+            rendered = rendered + part.to_numpy(dtype=object)
+    return rendered
+
+
+def render_chunks(content, source, defaults=None, fmt=None, chunk_rows=DEFAULT_CHUNK_ROWS, keep_columns=False):
+    """
+    Yield one DataFrame per input chunk with a "prompt" column (after the input
+    columns when `keep_columns` is set).
+    """
+    import pandas as pd
+
+    for chunk in iter_chunks(source, fmt, chunk_rows):
+        prompts = render_frame(content, chunk, defaults)
+        if keep_columns:
+            yield chunk.assign(**{PROMPT_COLUMN: prompts})
+        else:
+            yield pd.DataFrame({PROMPT_COLUMN: prompts})
+
+
+def write_chunk(frame, file, fmt, header):
+    if fmt == "csv":
+        frame.to_csv(file, header=header, index=False, lineterminator="\n", quoting=csv.QUOTE_MINIMAL)
+    else:
+        # to_json(lines=True) escapes "/" and ends without a newline; json.dumps per row is simpler and as fast
+        columns = list(frame.columns)
+        file.writelines(json.dumps(dict(zip(columns, row)), ensure_ascii=False, default=str) + "\n" for row in frame.itertuples(index=False, name=None))
+
+
+def render_to_file(
+    content,
+    source,
+    output,
+    defaults=None,
+    fmt=None,
+    output_format=None,
+    chunk_rows=DEFAULT_CHUNK_ROWS,
+    keep_columns=False,
+    on_chunk=None,
+):
+    """
+    Render `content` over every row of `source` and stream the results to `output`
+    (a path, "-" for stdout, or an open text file) as JSONL or CSV. `on_chunk` is
+    called with the running row count after each chunk. Returns the number of rows.
+    """
+    if output_format is None:
+        suffix = Path(str(getattr(output, "name", output))).suffix.lstrip(".").lower()
+        output_format = suffix if suffix in OUTPUT_FORMATS else "jsonl"
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unsupported output format: {output_format} (use {' or '.join(OUTPUT_FORMATS)})")
+
+    if output == "-":
+        file, close = sys.stdout, False
+    elif isinstance(output, io.TextIOBase):
+        file, close = output, False
+    else:
+        Path(output).parent.mkdir(parents=True, exist_ok=True)
+        file, close = open(output, "w", encoding="utf-8", newline=""), True
+    rows = 0
+    try:
+        for chunk in render_chunks(content, source, defaults, fmt, chunk_rows, keep_columns):
+            write_chunk(chunk, file, output_format, header=rows == 0)
+            rows += len(chunk)
+            if on_chunk is not None:
+                on_chunk(rows)
+    finally:
+        if close:
+            file.close()
+        else:
+            file.flush()
+    return rows
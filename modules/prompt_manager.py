@@ -1,15 +1,33 @@
 import streamlit as st
-import json
-from pathlib import Path
-
-PROMPT_DIR = Path(".aigentflow/prompts")
+import time
+from modules import search_index
+from modules.jobs import OUTPUT_DIR
+from modules.pipeline import run_pipeline
+from modules.prompt_batch import OUTPUT_FORMATS, render_to_file
+from modules.schema import SchemaError, compile_variables, object_errors, validate_store
+from modules.storage import get_backend, safe_file_name
+from modules.template import compile_template, render
 
 def load_prompts():
-    prompts = []
-    for prompt_file in PROMPT_DIR.glob("*.json"):
-        with open(prompt_file, "r") as file:
-            prompts.append(json.load(file))
-    return prompts
+    # Files that fail validation are left out here and listed by display_invalid_prompts()
+    return validate_store("prompts").valid
+
+def display_invalid_prompts():
+    errors = validate_store("prompts").errors
+    if errors:
+        with st.expander(f"{len(errors)} invalid prompt files were skipped"):
+            for path, problems in errors.items():
+                st.warning(f"{path}: " + "; ".join(problems))
+
+def get_prompt(name):
+    return get_backend().get("prompts", name)
+
+def save_prompt(prompt):
+    """Save `prompt` unless it is invalid; returns the problems that stopped it (empty if saved)."""
+    problems = object_errors("prompts", prompt)
+    if not problems:
+        get_backend().save("prompts", prompt)
+    return problems
 
 def initialize_session_state():
     defaults = {
@@ -23,17 +41,92 @@ def initialize_session_state():
         "run_prompt": False,
         "variable_values": {},
         "action": None,
-        "target_variable": None
+        "target_variable": None,
+        "batch_prompt": None,
+        "prompt_batch_output": None
     }
     for key, value in defaults.items():
         if key not in st.session_state:
             st.session_state[key] = value
 
 def prepare_prompt(prompt_content, variable_values, action=None, target_variable=None):
-    content = prompt_content
-    for var_name, var_value in variable_values.items():
-        content = content.replace(f"<{var_name}>", str(var_value))
-    return content    
+    return render(prompt_content, variable_values)
+
+def prompt_to_action_pipeline(prompt_name, prompt_content, variable_values, action, target_variable):
+    # A two-node pipeline: the rendered prompt fills `target_variable` of the action
+    return {
+        "name": f"{prompt_name} -> {action}",
+        "nodes": [
+            {"id": "prompt", "type": "prompt", "ref": prompt_name, "content": prompt_content, "variables": variable_values},
+            {"id": "action", "type": "action", "ref": action, "inputs": {target_variable: "prompt"}},
+        ],
+    }
+
+def run_prompt_as_input(prompt_name, prompt_content, variable_values, action, target_variable):
+    if not action or not target_variable:
+        st.error("Select an action with at least one variable to use the prompt as its input.")
+        return
+    with st.spinner(f"Running {action}..."):
+        run = run_pipeline(prompt_to_action_pipeline(prompt_name, prompt_content, variable_values, action, target_variable))
+    result = run.results["action"]
+    timing = " · ".join(f"{node_id}: {run.results[node_id].get('duration', 0):.3f}s" for node_id in run.order)
+    if result["status"] == "finished":
+        st.success(f"Executed action [{action}] with {target_variable} = prompt ({timing})")
+        st.success(result["output"] or "Command executed successfully but produced no output.")
+    else:
+        st.error(f"Action [{action}] failed ({timing})")
+        st.error(result.get("stderr") or result.get("error", ""))
+
+PREVIEW_LINES = 20
+
+def display_prompt_batch():
+    prompt = get_prompt(st.session_state.batch_prompt)
+    if prompt is None:
+        st.session_state.batch_prompt = None
+        return
+    st.subheader(f"Batch Render: {prompt['name']}")
+    variable_names = ", ".join(var["name"] for var in prompt["variables"]) or "none"
+    uploaded = st.file_uploader(f"Variable rows (CSV or JSONL with columns: {variable_names})", type=["csv", "jsonl"], key="prompt_batch_file")
+    col1, col2 = st.columns(2)
+    with col1:
+        output_format = st.selectbox("Output format", OUTPUT_FORMATS, key="prompt_batch_format")
+    with col2:
+        keep_columns = st.checkbox("Keep input columns", key="prompt_batch_keep_columns")
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button("Render", disabled=uploaded is None, key="prompt_batch_render"):
+            # Streamed to disk chunk by chunk; only the preview and the path stay in the session
+            output = OUTPUT_DIR / f"{safe_file_name(prompt['name'])}_{int(time.time())}.{output_format}"
+            progress = st.empty()
+            defaults = {var["name"]: var.get("default", "") for var in prompt["variables"]}
+            try:
+                rows = render_to_file(
+                    prompt["content"],
+                    uploaded,
+                    output,
+                    defaults,
+                    output_format=output_format,
+                    keep_columns=keep_columns,
+                    on_chunk=lambda done: progress.caption(f"{done} rows rendered"),
+                )
+            except ValueError as e:
+                st.error(f"Could not render {uploaded.name}: {e}")
+            else:
+                st.session_state.prompt_batch_output = {"path": str(output), "rows": rows, "format": output_format}
+    with col2:
+        if st.button("Close", key="prompt_batch_close"):
+            st.session_state.batch_prompt = None
+            st.session_state.prompt_batch_output = None
+            st.rerun()
+
+    output = st.session_state.prompt_batch_output
+    if output:
+        st.success(f"Rendered {output['rows']} prompts to {output['path']}")
+        with open(output["path"], "r", encoding="utf-8") as file:
+            preview = "".join(line for _, line in zip(range(PREVIEW_LINES), file))
+        st.code(preview, language="json" if output["format"] == "jsonl" else None)
+        with open(output["path"], "rb") as file:
+            st.download_button("Download", file, file_name=f"{safe_file_name(prompt['name'])}.{output['format']}", key="prompt_batch_download")
 
 def display_prompt_form(prompt=None):
     if prompt:
@@ -76,12 +169,14 @@ def display_prompt_form(prompt=None):
             prompt["name"] = prompt_name
             prompt["content"] = prompt_content
             prompt["variables"] = variables
-            with open(PROMPT_DIR / f"{prompt_name}.json", "w") as file:
-                json.dump(prompt, file)
-            st.success("Prompt updated successfully!")
-            st.session_state.show_form = False
-            st.session_state.edit_prompt = None
-            st.session_state.variables = []
+            problems = save_prompt(prompt)
+            if problems:
+                st.error("Prompt not saved: " + "; ".join(problems))
+            else:
+                st.success("Prompt updated successfully!")
+                st.session_state.show_form = False
+                st.session_state.edit_prompt = None
+                st.session_state.variables = []
     else:
         if st.button("Save Prompt"):
             new_prompt = {
@@ -89,19 +184,23 @@ def display_prompt_form(prompt=None):
                 "content": prompt_content,
                 "variables": variables
             }
-            PROMPT_DIR.mkdir(parents=True, exist_ok=True)
-            with open(PROMPT_DIR / f"{prompt_name}.json", "w") as file:
-                json.dump(new_prompt, file)
-            st.success("Prompt saved successfully!")
-            st.session_state.show_form = False
-            st.session_state.variables = []
+            problems = save_prompt(new_prompt)
+            if problems:
+                st.error("Prompt not saved: " + "; ".join(problems))
+            else:
+                st.success("Prompt saved successfully!")
+                st.session_state.show_form = False
+                st.session_state.variables = []
 
     if prompt_content:
         st.subheader("Preview")
-        preview_content = prompt_content
-        for var in variables:
-            preview_content = preview_content.replace(f"<{var['name']}>", var['default'])
-        st.write(preview_content)
+        template = compile_template(prompt_content)
+        defaults = {var["name"]: var["default"] for var in variables}
+        st.write(template.render(defaults))
+        if template.unknown(defaults):
+            st.warning(f"Placeholders without a variable: {', '.join(template.unknown(defaults))}")
+        if template.unused(defaults):
+            st.warning(f"Variables not used in the content: {', '.join(template.unused(defaults))}")
 
     col1, col2 = st.columns(2)
     with col1:
@@ -150,7 +249,7 @@ def display_prompts():
         st.info(content)
         
         if st.session_state.run_prompt and st.session_state.action_type == "Use as Input":
-            st.error("Run as Action is not implemented yet.")
+            run_prompt_as_input(st.session_state.prompt_name, st.session_state.prompt_content, variable_values, st.session_state.action, st.session_state.target_variable)
         
         st.session_state.run_prompt = False
             
@@ -159,47 +258,57 @@ def display_prompts():
     else:
         st.button("New Prompt", on_click=lambda: setattr(st.session_state, 'show_form', True), key="pr_new_prompt")
         st.header("Existing Prompts")
+        display_invalid_prompts()
+        query = st.text_input("Search prompts", key="prompt_search", placeholder="Name, content or variable defaults")
+        if query.strip():
+            prompts = search_index.matching(prompts, "prompts", query)
+            st.caption(f"{len(prompts)} matching prompts")
         if prompts:
             for idx, prompt in enumerate(prompts):
                 with st.expander(prompt["name"]):
                     description = prompt.get("description", prompt["content"][:200])
                     st.write(description)
+                    # Catalog objects are shared across reruns, so edit copies of them
                     if st.button("Edit", key=f"edit_{prompt['name']}_{idx}"):
                         st.session_state.show_form = True
-                        st.session_state.edit_prompt = prompt
-                        st.session_state.variables = prompt["variables"]
+                        st.session_state.edit_prompt = dict(prompt)
+                        st.session_state.variables = list(prompt["variables"])
                     if st.button("Execute", key=f"execute_{prompt['name']}_{idx}"):
                         st.session_state.execute_submit = True
                         st.session_state.prompt_name = prompt["name"]
                         st.session_state.prompt_content = prompt["content"]
-                        st.session_state.variables = prompt["variables"]
+                        st.session_state.variables = list(prompt["variables"])
+                    if st.button("Batch", key=f"batch_{prompt['name']}_{idx}"):
+                        st.session_state.batch_prompt = prompt["name"]
+                        st.session_state.prompt_batch_output = None
         else:
             st.write("No prompts found.")
 
+    if st.session_state.batch_prompt:
+        display_prompt_batch()
+
     if st.session_state.execute_submit:
         prompt_name = st.session_state.prompt_name
         content = st.session_state.prompt_content
         action_type = st.session_state.action
         target_variable = st.session_state.target_variable
         st.subheader(f"Execute Prompt: {prompt_name}")
+        from .action_manager import display_variable_inputs, get_action, load_actions
+        try:
+            schema = compile_variables(st.session_state.variables)
+        except SchemaError as e:
+            st.error(f"Invalid variables: {e}")
+            return
         with st.form(key="execute_prompt_form"):
-            variable_values = {}
-            for var in st.session_state.variables:
-                if var["type"] == "text":
-                    variable_values[var["name"]] = st.text_input(f"{var['name']}", value=var["default"])
-                elif var["type"] == "number":
-                    variable_values[var["name"]] = st.number_input(f"{var['name']}", value=float(var["default"]) if var["default"] else 0)
-                elif var["type"] == "date":
-                    variable_values[var["name"]] = st.date_input(f"{var['name']}")
+            variable_values = display_variable_inputs(schema)
             action_type = st.selectbox("Action", ["Show in Window", "Use as Input"])
             target_variable = None
-            from .action_manager import load_actions
             actions = load_actions()
             available_actions = [action["name"] for action in actions]
             if action_type == "Use as Input":
                 selected_action = st.selectbox("Select Action", available_actions)
                 if selected_action:
-                    action_obj = [act for act in actions if act["name"] == selected_action][0]
+                    action_obj = get_action(selected_action)
                     possible_variables = [var["name"] for var in action_obj["variables"]]
                     if possible_variables:
                         target_variable = st.selectbox("Target Variable", possible_variables)
@@ -0,0 +1,109 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import time
+from pathlib import Path
+
+from modules.catalog import AIGENTFLOW_DIR
+from modules.template import render
+from utils import disk_lru
+
+logger = logging.getLogger(__name__)
+
+RESULT_CACHE_DIR = AIGENTFLOW_DIR / "cache" / "results"
+MAX_BYTES = int(os.getenv("AIGENTFLOW_RESULT_CACHE_MB", "256")) * 1024 * 1024
+DEFAULT_TTL = None
+# Entries are written with "expires_at" first so eviction can read it without parsing the result
+_EXPIRES_AT = re.compile(rb'^\{"expires_at": (null|[0-9.eE+-]+)')
+
+
+def cache_options(config):
+    """
+    Normalise an action's "cache" setting.
+
+    `true` enables caching with no expiry; a dict may set "ttl" (seconds) and
+    "inputs" (file paths, which may use <variables>, whose contents join the key).
+    Returns None when caching is off.
+    """
+    if not config:
+        return None
+    if config is True:
+        return {"ttl": DEFAULT_TTL, "inputs": []}
+    return {"ttl": config.get("ttl", DEFAULT_TTL), "inputs": list(config.get("inputs", []))}
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_key(command, variable_values, options):
+    inputs = {}
+    for pattern in options["inputs"]:
+        path = render(pattern, variable_values)
+        try:
+            inputs[path] = file_digest(path)
+        except OSError:
+            inputs[path] = None
+    payload = json.dumps(
+        {
+            "command": command,
+            "variables": {name: str(value) for name, value in variable_values.items()},
+            "inputs": inputs,
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def entry_path(key, directory=RESULT_CACHE_DIR):
+    return Path(directory) / key[:2] / f"{key}.json"
+
+
+def get(key, directory=RESULT_CACHE_DIR):
+    """Return the cached result for `key`, or None if missing or past its TTL."""
+    path = entry_path(key, directory)
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            entry = json.load(file)
+    except (OSError, ValueError):
+        return None
+    expires_at = entry.get("expires_at")
+    if expires_at is not None and expires_at < time.time():
+        path.unlink(missing_ok=True)
+        return None
+    # mtime doubles as the last-access time for LRU eviction
+    os.utime(path)
+    return entry["result"]
+
+
+def put(key, result, ttl=None, directory=RESULT_CACHE_DIR, max_bytes=MAX_BYTES):
+    path = entry_path(key, directory)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    entry = {
+        "expires_at": time.time() + ttl if ttl else None,
+        "created_at": time.time(),
+        "result": result,
+    }
+    tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        json.dump(entry, file, default=str)
+    os.replace(tmp_path, path)
+    disk_lru.added(directory, path.stat().st_size, max_bytes, "*/*.json", _expired)
+
+
+def _expired(path, now):
+    with open(path, "rb") as file:
+        match = _EXPIRES_AT.match(file.read(64))
+    return match is not None and match.group(1) != b"null" and float(match.group(1)) < now
+
+
+def evict(directory=RESULT_CACHE_DIR, max_bytes=MAX_BYTES):
+    """Drop expired entries, then least recently used ones until the cache fits in `max_bytes`."""
+    return disk_lru.evict(directory, max_bytes, "*/*.json", _expired)
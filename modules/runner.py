@@ -0,0 +1,324 @@
+import logging
+import os
+import selectors
+import shlex
+import signal
+import subprocess
+import threading
+import time
+from pathlib import Path
+
+from modules import blob_store, result_cache, warm_pool
+from modules.journal import record_execution
+from modules.limits import Watchdog, cpu_exceeded, limit_options, preexec, rlimits, rusage_fields
+from modules.template import compile_argv, render
+from utils.ring_buffer import RingBuffer
+from utils.string_utils import DEFAULT_ENCODINGS, StreamDecoder
+
+logger = logging.getLogger(__name__)
+
+# Only the first few KB of each stream are kept in the journal; the sizes are always recorded
+STORED_OUTPUT_LIMIT = 64 * 1024
+READ_CHUNK = 64 * 1024
+
+
+class OutputCapture:
+    """
+    Collects one output stream (stdout or stderr) of a running action.
+
+    With `tail_chars` set only the last characters are kept in memory (a ring
+    buffer) and, if `spill_path` is given, the raw bytes are appended to that file
+    as they arrive. Without it the whole decoded output is kept, as before.
+    """
+
+    def __init__(self, tail_chars=None, spill_path=None, encoding=None):
+        self.spill_path = Path(spill_path) if spill_path else None
+        self.bytes = 0
+        self._tail = RingBuffer(tail_chars) if tail_chars else None
+        self._parts = [] if self._tail is None else None
+        self._spill = None
+        # Decoded chunk by chunk, falling back to cp1252/latin-1 only for chunks that are not UTF-8
+        encodings = [encoding] if encoding else []
+        self._decoder = StreamDecoder(encodings + [name for name in DEFAULT_ENCODINGS if name not in encodings])
+
+    def feed(self, data):
+        self.bytes += len(data)
+        if self.spill_path is not None:
+            if self._spill is None:
+                self.spill_path.parent.mkdir(parents=True, exist_ok=True)
+                self._spill = open(self.spill_path, "ab")
+            self._spill.write(data)
+            self._spill.flush()
+        self._append(self._decoder.decode(data))
+
+    def close(self):
+        self._append(self._decoder.decode(b"", final=True))
+        if self._spill is not None:
+            self._spill.close()
+            self._spill = None
+
+    def text(self):
+        if self._tail is not None:
+            return self._tail.getvalue()
+        return "".join(self._parts)
+
+    @property
+    def truncated(self):
+        return self._tail is not None and self._tail.truncated
+
+    def _append(self, text):
+        if not text:
+            return
+        if self._tail is not None:
+            self._tail.append(text)
+        else:
+            self._parts.append(text)
+
+
+def pump_output(process, captures):
+    """Feed each (pipe, capture) pair until every pipe reaches EOF, reading whatever is available."""
+    if os.name == "posix":
+        with selectors.DefaultSelector() as selector:
+            for pipe, capture in captures:
+                os.set_blocking(pipe.fileno(), False)
+                selector.register(pipe, selectors.EVENT_READ, capture)
+            while selector.get_map():
+                for key, _ in selector.select():
+                    try:
+                        data = os.read(key.fd, READ_CHUNK)
+                    except BlockingIOError:
+                        continue
+                    if data:
+                        key.data.feed(data)
+                    else:
+                        selector.unregister(key.fileobj)
+                        key.fileobj.close()
+    else:
+        # Windows pipes cannot be polled, so read each one on its own thread
+        def read(pipe, capture):
+            with pipe:
+                for data in iter(lambda: pipe.read1(READ_CHUNK), b""):
+                    capture.feed(data)
+
+        threads = [threading.Thread(target=read, args=pair, daemon=True) for pair in captures]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    for _, capture in captures:
+        capture.close()
+
+
+def shell_value(value):
+    # Replace " for ' to avoid issues with shell commands
+    return str(value).replace('"', "'")
+
+
+def render_command(content, variable_values):
+    return render(content, variable_values, convert=shell_value)
+
+
+def terminate_process(process, kill=False):
+    """Signal the action's whole process group on POSIX, so children of the shell stop too."""
+    if os.name == "posix":
+        try:
+            os.killpg(process.pid, signal.SIGKILL if kill else signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+    elif kill:
+        process.kill()
+    else:
+        process.terminate()
+
+
+def wait_for_exit(process):
+    """
+    Reap `process` and return (returncode, usage).
+
+    On POSIX the exit is collected with os.wait4, which also reports the CPU time and
+    peak RSS of the process and of the children it waited for (e.g. the shell's
+    command). `usage` is None where that is unavailable.
+    """
+    if isinstance(process, subprocess.Popen) and hasattr(os, "wait4"):
+        try:
+            _, status, rusage = os.wait4(process.pid, 0)
+        except ChildProcessError:
+            # Already reaped elsewhere (e.g. poll()), so only the return code is known
+            return process.wait(), None
+        process.returncode = os.waitstatus_to_exitcode(status)
+        return process.returncode, rusage_fields(rusage)
+    # Warm pool workers are reaped by the zygote, which sends their usage along
+    return process.wait(), getattr(process, "rusage", None)
+
+
+def render_argv(content, variable_values):
+    """Argument vector for a shell-free action: each value fills its argument unchanged."""
+    return compile_argv(content).render(variable_values)
+
+
+def store_output(capture):
+    """
+    Move an output too large for the journal into the blob store and return its
+    digest, or None if it fits. A spilled output is moved from its spill file.
+    """
+    if capture.bytes <= STORED_OUTPUT_LIMIT and not capture.truncated:
+        return None
+    try:
+        if capture.spill_path is not None:
+            return blob_store.put_file(capture.spill_path, move=True)
+        return blob_store.put_bytes(capture.text().encode("utf-8"))
+    except OSError as e:
+        logger.warning(f"Could not store output in the blob store: {e}")
+        return None
+
+
+def run_action(
+    action_name,
+    content,
+    variable_values,
+    record=True,
+    on_start=None,
+    stdout=None,
+    stderr=None,
+    cache=None,
+    limits=None,
+    shell=True,
+):
+    """
+    Render and run an action's shell command, returning a result dict.
+
+    `on_start` is called with the Popen object once the process exists, so callers
+    such as the job manager can cancel it. `stdout`/`stderr` are OutputCapture
+    objects the caller can read while the action runs; by default the full output
+    is kept. `cache` is the action's "cache" setting (see modules.result_cache) and
+    `limits` its "limits" setting (see modules.limits); `limit_hit` in the result
+    names the limit that stopped the process, if any. With `shell` False (the
+    action's "shell": false) the content is split into arguments once and run
+    without /bin/sh, so values are passed intact instead of having `"` replaced.
+    Outputs larger than STORED_OUTPUT_LIMIT are kept in the blob store; their
+    digests are `stdout_blob`/`stderr_blob` in the result.
+    The result is queued for the execution journal unless `record` is False.
+    """
+    stdout = stdout or OutputCapture()
+    stderr = stderr or OutputCapture()
+    started_at = time.time()
+    render_start = time.perf_counter()
+    argv = None
+    render_error = None
+    try:
+        if shell:
+            command = render_command(content, variable_values)
+        else:
+            argv = render_argv(content, variable_values)
+            command = shlex.join(argv)
+    except ValueError as e:
+        # e.g. an unbalanced quote in a shell-free action: fail the run like any other error
+        command = content
+        render_error = f"Cannot split the action into arguments: {e}"
+    render_duration = time.perf_counter() - render_start
+
+    cache_options = result_cache.cache_options(cache) if render_error is None else None
+    cache_key = None
+    if cache_options is not None:
+        cache_key = result_cache.cache_key(command, variable_values, cache_options)
+        cached = result_cache.get(cache_key)
+        if cached is not None:
+            result = dict(
+                cached,
+                name=action_name,
+                variables=variable_values,
+                timestamp=started_at,
+                render_duration=render_duration,
+                duration=time.perf_counter() - render_start,
+                cached=True,
+                cpu_user=None,
+                cpu_system=None,
+                max_rss=None,
+            )
+            if record:
+                record_execution(journal_record(result))
+            return result
+
+    options = limit_options(limits)
+    watchdog = None
+    usage = None
+    start = time.perf_counter()
+    warm = False
+    try:
+        if render_error is not None:
+            raise ValueError(render_error)
+        # Python agent scripts can run in a pre-imported worker (AIGENTFLOW_WARM_POOL=1)
+        started = warm_pool.start(command, rlimits=rlimits(options), argv=argv)
+        if started is not None:
+            process, stdout_pipe, stderr_pipe = started
+            warm = True
+        else:
+            process = subprocess.Popen(
+                command if shell else argv,
+                shell=shell,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                start_new_session=os.name == "posix",
+                preexec_fn=preexec(options),
+            )
+            stdout_pipe, stderr_pipe = process.stdout, process.stderr
+        if options is not None:
+            watchdog = Watchdog(process, options, terminate_process).start()
+        if on_start is not None:
+            on_start(process)
+        pump_output(process, [(stdout_pipe, stdout), (stderr_pipe, stderr)])
+        returncode, usage = wait_for_exit(process)
+    except Exception as e:
+        stderr.feed(str(e).encode("utf-8"))
+        stdout.close()
+        stderr.close()
+        returncode = 1
+    finally:
+        if watchdog is not None:
+            watchdog.stop()
+    duration = time.perf_counter() - start
+    limit_hit = watchdog.limit_hit if watchdog is not None else None
+    if limit_hit is None and options is not None and cpu_exceeded(returncode):
+        limit_hit = "cpu_seconds"
+
+    result = {
+        "name": action_name,
+        "command": command,
+        "variables": variable_values,
+        "returncode": returncode,
+        "stdout": stdout.text(),
+        "stderr": stderr.text(),
+        "timestamp": started_at,
+        "render_duration": render_duration,
+        "duration": duration,
+        "stdout_bytes": stdout.bytes,
+        "stderr_bytes": stderr.bytes,
+        "stdout_truncated": stdout.truncated,
+        "stderr_truncated": stderr.truncated,
+        "cached": False,
+        "warm": warm,
+        "limit_hit": limit_hit,
+        "cpu_user": usage["cpu_user"] if usage else None,
+        "cpu_system": usage["cpu_system"] if usage else None,
+        "max_rss": usage["max_rss"] if usage else None,
+        "stdout_blob": store_output(stdout),
+        "stderr_blob": store_output(stderr),
+    }
+    # Only complete, successful outputs are worth replaying
+    if cache_key is not None and returncode == 0 and not stdout.truncated and not stderr.truncated:
+        result_cache.put(cache_key, result, ttl=cache_options["ttl"])
+    for stream, capture in (("stdout", stdout), ("stderr", stderr)):
+        if result[f"{stream}_blob"] is not None:
+            result[f"{stream}_path"] = str(blob_store.blob_path(result[f"{stream}_blob"]))
+        elif capture.spill_path is not None:
+            result[f"{stream}_path"] = str(capture.spill_path)
+    if record:
+        record_execution(journal_record(result))
+    return result
+
+
+def journal_record(result):
+    record = dict(result)
+    record["stdout"] = result["stdout"][:STORED_OUTPUT_LIMIT]
+    record["stderr"] = result["stderr"][:STORED_OUTPUT_LIMIT]
+    return record
@@ -0,0 +1,284 @@
+# Validation of stored actions and prompts, and of the values their variables take.
+#
+# A `variables` list is compiled once into a VariableSchema (cached by content), whose
+# typed variables coerce form and command-line values:
+#
+#   {"name": "max_number", "type": "number", "default": "25"}
+#   {"name": "when", "type": "date", "default": "2025-01-31"}
+#   {"name": "model", "type": "options", "default": "Grok", "options": ["Mistral", "Grok"]}
+#
+# validate_store() checks every object of a kind in one pass and reports each bad file
+# with all of its problems, so broken files show up on load instead of inside a form.
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from datetime import date
+
+from modules.limits import limit_options
+from modules.template import PLACEHOLDER, compile_argv
+
+VARIABLE_TYPES = ("text", "number", "date", "options")
+CACHE_SIZE = 1024
+
+
+class SchemaError(ValueError):
+    """Raised with every problem found, not just the first; `errors` lists them."""
+
+    def __init__(self, errors):
+        self.errors = list(errors)
+        super().__init__("; ".join(self.errors))
+
+
+def coerce_text(value):
+    return "" if value is None else str(value)
+
+
+def coerce_number(value):
+    """Integers stay integers, so "25" renders as 25 rather than 25.0."""
+    if isinstance(value, bool):
+        raise ValueError(f"not a number: {value!r}")
+    if isinstance(value, (int, float)):
+        return value
+    text = coerce_text(value).strip()
+    if not text:
+        return 0
+    try:
+        return int(text)
+    except ValueError:
+        pass
+    try:
+        return float(text)
+    except ValueError:
+        raise ValueError(f"not a number: {value!r}") from None
+
+
+def coerce_date(value):
+    """ISO dates; an empty value means today, as the date picker does."""
+    if isinstance(value, date):
+        return value
+    text = coerce_text(value).strip()
+    if not text:
+        return date.today()
+    try:
+        return date.fromisoformat(text[:10])
+    except ValueError:
+        raise ValueError(f"not an ISO date (YYYY-MM-DD): {value!r}") from None
+
+
+COERCERS = {"text": coerce_text, "number": coerce_number, "date": coerce_date}
+
+
+class Variable:
+    """One compiled variable: its type's coercer, its coerced default and, for options, the choices."""
+
+    __slots__ = ("name", "type", "default", "options", "_coerce")
+
+    def __init__(self, name, var_type, default, options=None):
+        self.name = name
+        self.type = var_type
+        self.options = tuple(options) if options is not None else None
+        self._coerce = self._coerce_option if var_type == "options" else COERCERS[var_type]
+        if var_type == "options" and default in (None, ""):
+            # The form has always preselected the first option when there is no default
+            self.default = self.options[0]
+        else:
+            self.default = self._coerce(default)
+
+    def _coerce_option(self, value):
+        text = coerce_text(value)
+        if text not in self.options:
+            raise ValueError(f"{text!r} is not one of {', '.join(self.options)}")
+        return text
+
+    def coerce(self, value):
+        try:
+            return self._coerce(value)
+        except ValueError as e:
+            raise ValueError(f"{self.name}: {e}") from None
+
+    @property
+    def index(self):
+        """Position of the default among the options, for st.selectbox."""
+        return self.options.index(self.default) if self.options else 0
+
+
+class VariableSchema:
+    """A compiled `variables` list. Raises SchemaError listing every invalid variable."""
+
+    __slots__ = ("variables", "by_name")
+
+    def __init__(self, variables):
+        errors = variable_errors(variables)
+        if errors:
+            raise SchemaError(errors)
+        self.variables = tuple(Variable(var["name"], var.get("type", "text"), var.get("default"), var.get("options")) for var in variables)
+        self.by_name = {var.name: var for var in self.variables}
+
+    def __iter__(self):
+        return iter(self.variables)
+
+    def defaults(self):
+        return {var.name: var.default for var in self.variables}
+
+    def coerce(self, values):
+        """Coerce the values of known variables (others pass through); SchemaError lists every bad one."""
+        coerced, errors = dict(values), []
+        for name, value in values.items():
+            var = self.by_name.get(name)
+            if var is None:
+                continue
+            try:
+                coerced[name] = var.coerce(value)
+            except ValueError as e:
+                errors.append(str(e))
+        if errors:
+            raise SchemaError(errors)
+        return coerced
+
+
+def variable_errors(variables):
+    """Every problem with a `variables` list, as messages."""
+    if not isinstance(variables, list):
+        return [f"variables must be a list, got {type(variables).__name__}"]
+    errors = []
+    seen = set()
+    for i, var in enumerate(variables):
+        if not isinstance(var, dict):
+            errors.append(f"variable #{i + 1} must be an object")
+            continue
+        name = var.get("name")
+        label = f"variable {name!r}" if name else f"variable #{i + 1}"
+        if not isinstance(name, str) or not name:
+            errors.append(f"{label}: missing name")
+        elif not PLACEHOLDER.fullmatch(f"<{name}>"):
+            errors.append(f"{label}: a name cannot contain <, > or line breaks, or start or end with a space")
+        elif name in seen:
+            errors.append(f"{label}: defined twice")
+        else:
+            seen.add(name)
+        var_type = var.get("type", "text")
+        if var_type not in VARIABLE_TYPES:
+            errors.append(f"{label}: type must be one of {', '.join(VARIABLE_TYPES)}, got {var_type!r}")
+            continue
+        default = var.get("default")
+        if var_type == "options":
+            options = var.get("options")
+            if not isinstance(options, list) or not options or not all(isinstance(option, str) for option in options):
+                errors.append(f"{label}: options must be a non-empty list of strings")
+            elif default not in (None, "") and default not in options:
+                errors.append(f"{label}: default {default!r} is not one of the options")
+            continue
+        try:
+            COERCERS[var_type](default)
+        except ValueError as e:
+            errors.append(f"{label}: default is {e}")
+    return errors
+
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def compile_variables(variables):
+    """
+    Return the VariableSchema for a `variables` list, compiling it only the first time
+    its content is seen. Raises SchemaError.
+    """
+    key = hashlib.blake2b(json.dumps(variables, sort_keys=True, default=str).encode("utf-8"), digest_size=16).digest()
+    with _cache_lock:
+        compiled = _cache.get(key)
+        if compiled is not None:
+            _cache.move_to_end(key)
+            return compiled
+    compiled = VariableSchema(variables)
+    with _cache_lock:
+        _cache[key] = compiled
+        if len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return compiled
+
+
+def object_errors(kind, obj):
+    """Every problem with a stored action or prompt, as messages."""
+    if not isinstance(obj, dict):
+        return [f"must be a JSON object, got {type(obj).__name__}"]
+    errors = []
+    if not isinstance(obj.get("name"), str) or not obj.get("name"):
+        errors.append("missing name")
+    if not isinstance(obj.get("content"), str):
+        errors.append("content must be a string")
+    if "variables" in obj:
+        try:
+            compile_variables(obj["variables"])
+        except SchemaError as e:
+            errors.extend(e.errors)
+    if kind == "actions":
+        if not isinstance(obj.get("shell", True), bool):
+            errors.append("shell must be true or false")
+        elif obj.get("shell") is False and isinstance(obj.get("content"), str):
+            try:
+                compile_argv(obj["content"])
+            except ValueError as e:
+                errors.append(f"content cannot be split into arguments: {e}")
+        try:
+            limit_options(obj.get("limits"))
+        except (AttributeError, TypeError, ValueError) as e:
+            errors.append(f"invalid limits: {e}")
+    return errors
+
+
+class ValidationReport:
+    """Outcome of checking one kind: the usable objects and the problems per file (or name)."""
+
+    def __init__(self, valid, errors):
+        self.valid = valid
+        self.errors = errors
+
+    @property
+    def ok(self):
+        return not self.errors
+
+
+def validate_objects(kind, entries):
+    """Check (label, obj) pairs in one pass; unreadable entries (obj None) must be reported by the caller."""
+    valid, errors = [], {}
+    for label, obj in entries:
+        problems = object_errors(kind, obj)
+        if problems:
+            errors[label] = problems
+        else:
+            valid.append(obj)
+    return ValidationReport(valid, errors)
+
+
+_reports = {}
+_reports_lock = threading.Lock()
+
+
+def validate_store(kind, backend=None):
+    """
+    Validate every stored object of `kind` ("actions" or "prompts"). JSON files are
+    reported by path, together with files that are not valid JSON; SQLite rows by
+    name. The report is reused until the store changes.
+    """
+    from modules.catalog import get_catalog
+    from modules.storage import JsonDirBackend, get_backend
+
+    backend = backend or get_backend()
+    # Catalogs and the SQLite backend hand out the same list until something changes
+    objects = backend.load(kind)
+    with _reports_lock:
+        cached = _reports.get(kind)
+        if cached is not None and cached[0] is objects:
+            return cached[1]
+    if isinstance(backend, JsonDirBackend):
+        catalog = get_catalog(backend.directory(kind))
+        report = validate_objects(kind, catalog.entries())
+        report.errors.update({path: [f"not valid JSON: {error}"] for path, error in catalog.errors.items()})
+    else:
+        report = validate_objects(kind, ((obj.get("name", "?") if isinstance(obj, dict) else "?", obj) for obj in objects))
+    with _reports_lock:
+        _reports[kind] = (objects, report)
+    return report
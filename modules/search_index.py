@@ -0,0 +1,410 @@
+# Usage:
+#   python -m modules.search_index rebuild
+#   python -m modules.search_index search "translate english" [--kind actions]
+#
+# Full-text index over prompts, actions and run outputs, kept in a SQLite FTS5 table
+# (.aigentflow/search.db) next to the storage backend. Saved objects are indexed when
+# they are saved, runs when the journal writer appends them; objects edited outside the
+# UI and runs journaled by other processes are picked up by search() before it queries.
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+
+from modules.catalog import AIGENTFLOW_DIR
+from modules.sqlite_connections import ThreadConnections
+
+logger = logging.getLogger(__name__)
+
+SEARCH_DB_PATH = AIGENTFLOW_DIR / "search.db"
+OBJECT_KINDS = ("actions", "prompts")
+RUNS = "runs"
+# Legacy history records (storage kind "history") are indexed as runs too
+HISTORY = "history"
+DEFAULT_LIMIT = 50
+SNIPPET_TOKENS = 16
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS documents (
+        id INTEGER PRIMARY KEY,
+        kind TEXT NOT NULL,
+        ref TEXT NOT NULL,
+        name TEXT,
+        digest TEXT,
+        timestamp REAL,
+        returncode INTEGER,
+        UNIQUE (kind, ref)
+    );
+    CREATE VIRTUAL TABLE IF NOT EXISTS objects_fts USING fts5(
+        name, content, variables,
+        tokenize='unicode61 remove_diacritics 2'
+    );
+    CREATE VIRTUAL TABLE IF NOT EXISTS runs_fts USING fts5(
+        name, command, variables, output,
+        tokenize='unicode61 remove_diacritics 2'
+    );
+    CREATE TABLE IF NOT EXISTS meta (
+        key TEXT PRIMARY KEY,
+        value TEXT NOT NULL
+    );
+"""
+# Saved objects and runs have their own FTS tables, so a search over thousands of
+# actions is not slowed down by millions of runs
+FTS_TABLES = {"actions": "objects_fts", "prompts": "objects_fts", RUNS: "runs_fts", HISTORY: "runs_fts"}
+FTS_COLUMNS = {"objects_fts": ("name", "content", "variables"), "runs_fts": ("name", "command", "variables", "output")}
+# bm25 weights per column: a match in the name ranks first
+RANKS = {"objects_fts": "bm25(objects_fts, 10.0, 3.0, 2.0)", "runs_fts": "bm25(runs_fts, 10.0, 3.0, 2.0, 1.0)"}
+# Ranking costs a few microseconds per matching document, so queries matching more than
+# this many documents list the newest matches first instead
+RANK_WINDOW = 2000
+
+
+def bindable(fields):
+    # SQLite only takes valid UTF-8; a lone surrogate (e.g. a value decoded with
+    # surrogateescape from the command line) becomes U+FFFD in the index
+    return tuple(field.encode("utf-8", "surrogatepass").decode("utf-8", "replace") for field in fields)
+
+
+def object_fields(obj):
+    variables = " ".join(f"{var.get('name', '')} {var.get('default', '')}" for var in obj.get("variables", []))
+    content = "\n".join(filter(None, [obj.get("description"), obj.get("content")]))
+    return bindable((obj.get("name", ""), content, variables))
+
+
+def run_fields(record):
+    variables = " ".join(f"{name} {value}" for name, value in (record.get("variables") or {}).items())
+    output = "\n".join(filter(None, [record.get("stdout"), record.get("stderr")]))
+    return bindable((record.get("name") or "", record.get("command") or "", variables, output))
+
+
+def digest(obj):
+    return hashlib.blake2b(json.dumps(obj, sort_keys=True, default=str).encode("utf-8"), digest_size=16).hexdigest()
+
+
+def fts_query(text):
+    """
+    Turn what the user typed into an FTS5 query: every word must match, the last one
+    as a prefix, and FTS5 operators in the input are treated as plain words.
+    """
+    words = text.split()
+    if not words:
+        return None
+    terms = ['"' + word.replace('"', '""') + '"' for word in words]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+class SearchIndex:
+    """
+    FTS5 index of documents keyed by (kind, ref): an action or prompt by name, a
+    journaled run by its journal position "segment:offset:length".
+
+    Run timestamps and return codes, which are filtered on but not searched, live
+    in `documents`, whose id is the rowid in the kind's FTS table.
+    """
+
+    def __init__(self, path=SEARCH_DB_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._connections = ThreadConnections(path)
+        # Last object list synced per kind; catalogs hand out the same list until something changes
+        self._synced = {}
+        with self.connection() as conn:
+            conn.executescript(SCHEMA)
+
+    def connection(self):
+        return self._connections.get()
+
+    def _upsert(self, conn, kind, ref, fields, doc_digest=None, timestamp=None, returncode=None):
+        table = FTS_TABLES[kind]
+        row = conn.execute("SELECT id, digest FROM documents WHERE kind = ? AND ref = ?", (kind, ref)).fetchone()
+        if row is not None:
+            if doc_digest is not None and row[1] == doc_digest:
+                return False
+            conn.execute(f"DELETE FROM {table} WHERE rowid = ?", (row[0],))
+            conn.execute(
+                "UPDATE documents SET name = ?, digest = ?, timestamp = ?, returncode = ? WHERE id = ?",
+                (fields[0], doc_digest, timestamp, returncode, row[0]),
+            )
+            doc_id = row[0]
+        else:
+            doc_id = conn.execute(
+                "INSERT INTO documents (kind, ref, name, digest, timestamp, returncode) VALUES (?, ?, ?, ?, ?, ?)",
+                (kind, ref, fields[0], doc_digest, timestamp, returncode),
+            ).lastrowid
+        columns = FTS_COLUMNS[table]
+        conn.execute(
+            f"INSERT INTO {table} (rowid, {', '.join(columns)}) VALUES (?{', ?' * len(columns)})",
+            (doc_id, *fields),
+        )
+        return True
+
+    def _delete(self, conn, kind, ref):
+        row = conn.execute("SELECT id FROM documents WHERE kind = ? AND ref = ?", (kind, ref)).fetchone()
+        if row is not None:
+            conn.execute(f"DELETE FROM {FTS_TABLES[kind]} WHERE rowid = ?", (row[0],))
+            conn.execute("DELETE FROM documents WHERE id = ?", (row[0],))
+
+    def index_objects(self, kind, objects):
+        """Index saved actions, prompts or legacy history records."""
+        conn = self.connection()
+        with conn:
+            for obj in objects:
+                if kind == HISTORY:
+                    ref = f"{obj.get('timestamp')}:{obj.get('name')}"
+                    self._upsert(conn, HISTORY, ref, run_fields(obj), digest(obj), _float(obj.get("timestamp")), obj.get("returncode"))
+                else:
+                    self._upsert(conn, kind, obj["name"], object_fields(obj), digest(obj))
+
+    def index_runs(self, positioned):
+        """Index journaled runs given as ((segment, offset, length), record) pairs; known runs are skipped."""
+        conn = self.connection()
+        with conn:
+            for (segment, offset, length), record in positioned:
+                self._upsert(
+                    conn,
+                    RUNS,
+                    f"{segment}:{offset}:{length}",
+                    run_fields(record),
+                    # A journal record never changes, so any digest marks it as indexed
+                    RUNS,
+                    _float(record.get("timestamp")),
+                    record.get("returncode"),
+                )
+
+    def journal_position(self):
+        row = self.connection().execute("SELECT value FROM meta WHERE key = 'journal_position'").fetchone()
+        return tuple(json.loads(row[0])) if row else (0, -1)
+
+    def sync_objects(self, kind, objects):
+        """
+        Bring the index for `kind` in line with `objects` (e.g. after files were edited
+        by hand): changed objects are re-indexed and missing ones dropped. A list that
+        was already synced is skipped without looking at it.
+        """
+        if self._synced.get(kind) is objects:
+            return
+        conn = self.connection()
+        with conn:
+            if kind == HISTORY:
+                self.index_objects(HISTORY, objects)
+            else:
+                stored = {ref: doc_digest for ref, doc_digest in conn.execute("SELECT ref, digest FROM documents WHERE kind = ?", (kind,))}
+                names = set()
+                for obj in objects:
+                    names.add(obj["name"])
+                    obj_digest = digest(obj)
+                    if stored.get(obj["name"]) != obj_digest:
+                        self._upsert(conn, kind, obj["name"], object_fields(obj), obj_digest)
+                for name in stored.keys() - names:
+                    self._delete(conn, kind, name)
+        self._synced[kind] = objects
+
+    def sync_runs(self, journal, batch=1000):
+        """
+        Index the journal records written since the last sync. Runs this process
+        journaled are usually indexed already; runs from other processes (e.g. the
+        CLI) are picked up here.
+        """
+        pending = []
+        last = None
+        for segment, offset, length, record in journal.iter_positioned(self.journal_position()):
+            pending.append(((segment, offset, length), record))
+            last = (segment, offset)
+            if len(pending) >= batch:
+                self.index_runs(pending)
+                pending = []
+        self.index_runs(pending)
+        if last is not None:
+            conn = self.connection()
+            with conn:
+                conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('journal_position', ?)", (json.dumps(last),))
+
+    def search(self, text, kinds=None, limit=DEFAULT_LIMIT, since=None, until=None):
+        """
+        Matches as dicts with kind, ref, name, timestamp, returncode and a snippet where
+        the matched words are wrapped in ** for Markdown. Actions and prompts come before
+        runs. Within each, best matches come first, or the newest ones when more than
+        RANK_WINDOW documents match.
+        """
+        query = fts_query(text)
+        if query is None:
+            return []
+        kinds = list(kinds or FTS_TABLES)
+        hits = []
+        for table in dict.fromkeys(FTS_TABLES[kind] for kind in kinds):
+            if len(hits) >= limit:
+                break
+            table_kinds = [kind for kind in kinds if FTS_TABLES[kind] == table]
+            hits.extend(self._search_table(table, query, table_kinds, limit - len(hits), since, until))
+        return hits
+
+    def _search_table(self, table, query, kinds, limit, since, until):
+        conn = self.connection()
+        many = conn.execute(
+            f"SELECT rowid FROM {table} WHERE {table} MATCH ? ORDER BY rowid DESC LIMIT 1 OFFSET ?",
+            (query, RANK_WINDOW - 1),
+        ).fetchone()
+        conditions, params = [f"{table} MATCH ?"], [query]
+        if set(kinds) != {kind for kind, kind_table in FTS_TABLES.items() if kind_table == table}:
+            conditions.append(f"d.kind IN ({', '.join('?' for _ in kinds)})")
+            params.extend(kinds)
+        if since is not None:
+            conditions.append("d.timestamp >= ?")
+            params.append(since)
+        if until is not None:
+            conditions.append("d.timestamp < ?")
+            params.append(until)
+        rows = conn.execute(
+            f"""
+            SELECT d.kind, d.ref, d.name, d.timestamp, d.returncode,
+                   snippet({table}, -1, '**', '**', ' … ', {SNIPPET_TOKENS})
+            FROM {table} JOIN documents AS d ON d.id = {table}.rowid
+            WHERE {' AND '.join(conditions)}
+            ORDER BY {f'{table}.rowid DESC' if many else RANKS[table]}
+            LIMIT ?
+            """,
+            (*params, limit),
+        )
+        columns = ("kind", "ref", "name", "timestamp", "returncode", "snippet")
+        return [dict(zip(columns, row)) for row in rows]
+
+    def clear(self):
+        conn = self.connection()
+        with conn:
+            conn.execute("DELETE FROM documents")
+            for table in FTS_COLUMNS:
+                conn.execute(f"DELETE FROM {table}")
+            conn.execute("DELETE FROM meta")
+        self._synced.clear()
+
+    def close(self):
+        self._connections.close_all()
+
+
+def _float(value):
+    return float(value) if isinstance(value, (int, float)) else None
+
+
+def run_position(ref):
+    """(segment, offset, length) of a run document, for Journal.read()."""
+    segment, offset, length = (int(part) for part in ref.split(":"))
+    return segment, offset, length
+
+
+def available():
+    """FTS5 is compiled into nearly every SQLite build, but not all of them."""
+    try:
+        sqlite3.connect(":memory:").execute("CREATE VIRTUAL TABLE probe USING fts5(text)")
+    except sqlite3.OperationalError:
+        return False
+    return True
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    """Process-wide index, or None where FTS5 is unavailable."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            if not available():
+                logger.warning("SQLite was built without FTS5; search is disabled")
+                _index = False
+            else:
+                _index = SearchIndex(os.getenv("AIGENTFLOW_SEARCH_DB", SEARCH_DB_PATH))
+        return _index or None
+
+
+def index_saved(kind, objects):
+    """Called by the storage backends after a save; indexing problems never fail the save."""
+    if kind not in OBJECT_KINDS + (HISTORY,):
+        return
+    try:
+        index = get_index()
+        if index is not None:
+            index.index_objects(kind, objects)
+    except Exception as e:
+        # Not only sqlite3.Error: e.g. a lone surrogate in a value cannot be bound at all
+        logger.error(f"Failed to index saved {kind}: {e}")
+
+
+def index_journaled(records, positions):
+    """Called by the journal writer once a batch of runs is on disk; never raises."""
+    try:
+        index = get_index()
+        if index is not None:
+            index.index_runs(list(zip(positions, records)))
+    except Exception as e:
+        logger.error(f"Failed to index {len(records)} runs: {e}")
+
+
+def search(text, kinds=None, limit=DEFAULT_LIMIT, since=None, until=None):
+    """Sync the index with the store and the journal, then search it. [] without FTS5."""
+    from modules.journal import get_journal
+    from modules.storage import get_backend
+
+    index = get_index()
+    if index is None:
+        return []
+    kinds = list(kinds or OBJECT_KINDS + (RUNS,))
+    backend = get_backend()
+    for kind in OBJECT_KINDS:
+        if kind in kinds:
+            index.sync_objects(kind, backend.load(kind))
+    if RUNS in kinds:
+        index.sync_objects(HISTORY, backend.load(HISTORY))
+        index.sync_runs(get_journal())
+        kinds.append(HISTORY)
+    return index.search(text, kinds, limit, since, until)
+
+
+def matching(objects, kind, text, limit=500):
+    """The `objects` of `kind` that match `text`, best match first."""
+    by_name = {obj["name"]: obj for obj in objects}
+    return [by_name[hit["ref"]] for hit in search(text, [kind], limit) if hit["ref"] in by_name]
+
+
+def rebuild():
+    """Drop and re-create the whole index from the store and the journal. Returns document counts."""
+    from modules.journal import get_journal
+    from modules.storage import get_backend
+
+    index = get_index()
+    if index is None:
+        raise RuntimeError("SQLite was built without FTS5")
+    index.clear()
+    backend = get_backend()
+    for kind in OBJECT_KINDS + (HISTORY,):
+        index.index_objects(kind, backend.load(kind))
+    index.sync_runs(get_journal())
+    rows = index.connection().execute("SELECT kind, COUNT(*) FROM documents GROUP BY kind")
+    return dict(rows.fetchall())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild or query the AIgentFlow search index")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("rebuild", help="Re-index every prompt, action and journaled run")
+    search_parser = subparsers.add_parser("search", help="Print the best matches")
+    search_parser.add_argument("text")
+    search_parser.add_argument("--kind", action="append", choices=OBJECT_KINDS + (RUNS,), help="Repeatable; default all")
+    search_parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.command == "rebuild":
+        counts = rebuild()
+        print(", ".join(f"{count} {kind}" for kind, count in counts.items()) or "Nothing to index")
+    else:
+        for hit in search(args.text, args.kind, args.limit):
+            print(f"[{hit['kind']}] {hit['name']}: {hit['snippet']}")
+
+
+if __name__ == "__main__":
+    main()
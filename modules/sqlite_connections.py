@@ -0,0 +1,72 @@
+# Per-thread SQLite connections for the storage backend and the search index.
+#
+# Streamlit runs every script rerun on a new thread, so a connection per thread must
+# also go away with its thread: each one is closed as soon as the thread that opened it
+# exits, rather than being kept in a list for the life of the server.
+
+import itertools
+import sqlite3
+import threading
+import weakref
+
+
+class _Owner:
+    """Lives in the thread-local slot; CPython frees it when its thread exits."""
+
+    __slots__ = ("serial", "conn", "__weakref__")
+
+    def __init__(self, serial, conn):
+        self.serial = serial
+        self.conn = conn
+
+
+class ThreadConnections:
+    """
+    One WAL-mode connection per thread to `path`. `serial()` identifies the calling
+    thread's connection and, unlike id(conn), is never reused, so it is safe in cache keys.
+    """
+
+    def __init__(self, path, timeout=30):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._open = {}
+        self._serials = itertools.count(1)
+
+    def _owner(self):
+        owner = getattr(self._local, "owner", None)
+        if owner is None:
+            # Closed from whichever thread frees the owner, after its own thread is gone
+            conn = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            owner = _Owner(next(self._serials), conn)
+            with self._lock:
+                self._open[owner.serial] = conn
+            weakref.finalize(owner, self._release, owner.serial)
+            self._local.owner = owner
+        return owner
+
+    def get(self):
+        return self._owner().conn
+
+    def serial(self):
+        return self._owner().serial
+
+    def __len__(self):
+        with self._lock:
+            return len(self._open)
+
+    def _release(self, serial):
+        with self._lock:
+            conn = self._open.pop(serial, None)
+        if conn is not None:
+            conn.close()
+
+    def close_all(self):
+        with self._lock:
+            connections, self._open = list(self._open.values()), {}
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
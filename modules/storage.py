@@ -0,0 +1,299 @@
+# Usage:
+#   python -m modules.storage import [--db .aigentflow/aigentflow.db] [--source .aigentflow]
+#   python -m modules.storage export [--db .aigentflow/aigentflow.db] [--target .aigentflow]
+#
+# Storage backends for prompts, actions, pipelines and history. The JSON directory layout is
+# the default; set AIGENTFLOW_STORAGE=sqlite to use a single SQLite file instead.
+
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime
+from pathlib import Path
+
+from modules import search_index
+from modules.catalog import AIGENTFLOW_DIR, get_catalog
+from modules.sqlite_connections import ThreadConnections
+
+logger = logging.getLogger(__name__)
+
+KINDS = ("actions", "prompts", "history", "pipelines")
+SQLITE_PATH = AIGENTFLOW_DIR / "aigentflow.db"
+
+
+def safe_file_name(name):
+    return "".join([c if c.isalnum() else "_" for c in name])
+
+
+def record_timestamp(record, fallback=None):
+    """Return a history record's timestamp as epoch seconds, accepting numbers or ISO strings."""
+    value = record.get("timestamp") if isinstance(record, dict) else None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value).timestamp()
+        except ValueError:
+            pass
+    return fallback if fallback is not None else time.time()
+
+
+class StorageBackend(ABC):
+    """Interface shared by the managers to read and write prompts, actions, pipelines and history."""
+
+    @abstractmethod
+    def load(self, kind):
+        """Return every object of `kind` as a list of dicts."""
+
+    @abstractmethod
+    def get(self, kind, name):
+        """Return the action, prompt or pipeline called `name`, or None."""
+
+    @abstractmethod
+    def save(self, kind, obj):
+        """Create or replace an action, prompt or pipeline, or append a history record."""
+
+    def close(self):
+        pass
+
+
+class JsonDirBackend(StorageBackend):
+    """One JSON file per object under .aigentflow/<kind>/, served through the catalogs."""
+
+    def __init__(self, root=AIGENTFLOW_DIR):
+        self.root = Path(root)
+
+    def directory(self, kind):
+        return self.root / kind
+
+    def load(self, kind):
+        return get_catalog(self.directory(kind)).load()
+
+    def get(self, kind, name):
+        catalog = get_catalog(self.directory(kind))
+        if not catalog.watched:
+            catalog.refresh()
+        return catalog.get(name)
+
+    def save(self, kind, obj):
+        directory = self.directory(kind)
+        directory.mkdir(parents=True, exist_ok=True)
+        if kind == "history":
+            file_name = f"{int(record_timestamp(obj) * 1000)}_{safe_file_name(obj.get('name', 'record'))}"
+        elif kind in ("actions", "pipelines"):
+            file_name = safe_file_name(obj["name"])
+        else:
+            # Prompts have always been stored under their raw name
+            file_name = obj["name"]
+        path = directory / f"{file_name}.json"
+        with open(path, "w") as file:
+            json.dump(obj, file)
+        get_catalog(directory).refresh_file(path)
+        search_index.index_saved(kind, [obj])
+        return path
+
+
+class SQLiteBackend(StorageBackend):
+    """
+    Single-file SQLite store in WAL mode.
+
+    Parsed objects are cached per kind and only reloaded when the kind's change counter
+    moved: every save bumps it in the same transaction, from any thread or process.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS actions (
+            name TEXT PRIMARY KEY,
+            data TEXT NOT NULL,
+            updated_at REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS prompts (
+            name TEXT PRIMARY KEY,
+            data TEXT NOT NULL,
+            updated_at REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS pipelines (
+            name TEXT PRIMARY KEY,
+            data TEXT NOT NULL,
+            updated_at REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT,
+            timestamp REAL NOT NULL,
+            data TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS versions (
+            kind TEXT PRIMARY KEY,
+            version INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_actions_updated_at ON actions(updated_at);
+        CREATE INDEX IF NOT EXISTS idx_prompts_updated_at ON prompts(updated_at);
+        CREATE INDEX IF NOT EXISTS idx_history_name ON history(name);
+        CREATE INDEX IF NOT EXISTS idx_history_timestamp ON history(timestamp);
+    """
+
+    def __init__(self, path=SQLITE_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._cache = {}
+        # Streamlit runs each script rerun on its own thread, so connections are per thread
+        self._connections = ThreadConnections(self.path)
+        with self.connection() as conn:
+            conn.executescript(self.SCHEMA)
+
+    def connection(self):
+        return self._connections.get()
+
+    def _version(self, conn, kind):
+        # Unlike PRAGMA data_version this compares across connections, and each Streamlit rerun has its own
+        row = conn.execute("SELECT version FROM versions WHERE kind = ?", (kind,)).fetchone()
+        return row[0] if row else 0
+
+    def load(self, kind):
+        self._check_kind(kind)
+        conn = self.connection()
+        version = self._version(conn, kind)
+        with self._lock:
+            cached = self._cache.get(kind)
+            if cached and cached[0] == version:
+                return cached[1]
+        if kind == "history":
+            rows = conn.execute("SELECT data FROM history ORDER BY timestamp, id")
+        else:
+            rows = conn.execute(f"SELECT data FROM {kind} ORDER BY name")
+        objects = [json.loads(data) for (data,) in rows]
+        with self._lock:
+            self._cache[kind] = (version, objects)
+        return objects
+
+    def get(self, kind, name):
+        self._check_kind(kind)
+        if kind == "history":
+            row = self.connection().execute(
+                "SELECT data FROM history WHERE name = ? ORDER BY timestamp DESC, id DESC LIMIT 1", (name,)
+            ).fetchone()
+        else:
+            row = self.connection().execute(f"SELECT data FROM {kind} WHERE name = ?", (name,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save(self, kind, obj):
+        self.save_many(kind, [obj])
+
+    def save_many(self, kind, objects, timestamps=None):
+        self._check_kind(kind)
+        conn = self.connection()
+        now = time.time()
+        with conn:
+            if kind == "history":
+                conn.executemany(
+                    "INSERT INTO history (name, timestamp, data) VALUES (?, ?, ?)",
+                    (
+                        (obj.get("name"), record_timestamp(obj, timestamps[i] if timestamps else None), json.dumps(obj))
+                        for i, obj in enumerate(objects)
+                    ),
+                )
+            else:
+                conn.executemany(
+                    f"INSERT OR REPLACE INTO {kind} (name, data, updated_at) VALUES (?, ?, ?)",
+                    ((obj["name"], json.dumps(obj), now) for obj in objects),
+                )
+            conn.execute(
+                "INSERT INTO versions (kind, version) VALUES (?, 1) ON CONFLICT(kind) DO UPDATE SET version = version + 1",
+                (kind,),
+            )
+        with self._lock:
+            self._cache.pop(kind, None)
+        search_index.index_saved(kind, objects)
+
+    def close(self):
+        self._connections.close_all()
+
+    @staticmethod
+    def _check_kind(kind):
+        if kind not in KINDS:
+            raise ValueError(f"Unknown storage kind: {kind}")
+
+
+def import_json_dir(backend, source=AIGENTFLOW_DIR):
+    """One-shot copy of an existing .aigentflow/ JSON layout into `backend`. Returns counts per kind."""
+    source = Path(source)
+    counts = {}
+    for kind in KINDS:
+        objects, timestamps = [], []
+        directory = source / kind
+        for path in sorted(directory.glob("*.json")):
+            try:
+                with open(path, "r") as file:
+                    obj = json.load(file)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Skipping {path}: {e}")
+                continue
+            objects.append(obj)
+            timestamps.append(path.stat().st_mtime)
+        if kind == "history" and isinstance(backend, SQLiteBackend):
+            backend.save_many(kind, objects, timestamps=timestamps)
+        elif isinstance(backend, SQLiteBackend):
+            backend.save_many(kind, objects)
+        else:
+            for obj in objects:
+                backend.save(kind, obj)
+        counts[kind] = len(objects)
+    return counts
+
+
+def export_json_dir(backend, target=AIGENTFLOW_DIR):
+    """Write every object held by `backend` back out as the one-file-per-object JSON layout."""
+    json_backend = JsonDirBackend(target)
+    counts = {}
+    for kind in KINDS:
+        objects = backend.load(kind)
+        for obj in objects:
+            json_backend.save(kind, obj)
+        counts[kind] = len(objects)
+    return counts
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """Return the process-wide backend selected by AIGENTFLOW_STORAGE (json or sqlite)."""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            name = os.getenv("AIGENTFLOW_STORAGE", "json").lower()
+            if name == "sqlite":
+                _backend = SQLiteBackend(os.getenv("AIGENTFLOW_DB", SQLITE_PATH))
+            elif name == "json":
+                _backend = JsonDirBackend()
+            else:
+                raise ValueError(f"Unsupported storage backend: {name}")
+        return _backend
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Move AIgentFlow data between the JSON layout and SQLite")
+    parser.add_argument("command", choices=["import", "export"])
+    parser.add_argument("--db", default=str(SQLITE_PATH), help="SQLite database file")
+    parser.add_argument("--source", default=str(AIGENTFLOW_DIR), help="JSON root to import from")
+    parser.add_argument("--target", default=str(AIGENTFLOW_DIR), help="JSON root to export to")
+    args = parser.parse_args()
+
+    backend = SQLiteBackend(args.db)
+    if args.command == "import":
+        counts = import_json_dir(backend, args.source)
+    else:
+        counts = export_json_dir(backend, args.target)
+    backend.close()
+    print(", ".join(f"{count} {kind}" for kind, count in counts.items()))
+
+
+if __name__ == "__main__":
+    main()
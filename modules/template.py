@@ -0,0 +1,120 @@
+import hashlib
+import os
+import re
+import shlex
+import threading
+from collections import OrderedDict
+
+# A name may hold anything but angle brackets and line breaks, spaces and punctuation
+# included, but cannot start or end with a space, so shell redirections like
+# `sort < in > out` are left alone; schema.variable_errors rejects names this cannot match
+PLACEHOLDER = re.compile(r"<([^<>\s](?:[^<>\n]*[^<>\s])?)>")
+CACHE_SIZE = 512
+# Private-use character marking a placeholder while ArgvTemplate splits a command line
+ARG_TOKEN = "\ue000"
+ARG_TOKEN_PATTERN = re.compile(ARG_TOKEN + r"(\d+)" + ARG_TOKEN)
+
+
+class Template:
+    """
+    A `<variable>` template parsed into literal and placeholder segments.
+
+    Rendering fills every placeholder in one pass and joins the parts once, so
+    values are never re-scanned for placeholders and large values are copied once.
+    """
+
+    __slots__ = ("segments", "names")
+
+    def __init__(self, content):
+        parts = PLACEHOLDER.split(content)
+        # re.split with one group alternates literal, name, literal, ...
+        self.segments = tuple(parts)
+        self.names = frozenset(parts[1::2])
+
+    def render(self, values, convert=str):
+        parts = list(self.segments)
+        for i in range(1, len(parts), 2):
+            name = parts[i]
+            if name in values:
+                parts[i] = convert(values[name])
+            else:
+                parts[i] = f"<{name}>"
+        return "".join(parts)
+
+    def unknown(self, values):
+        """Placeholders in the template that `values` does not provide."""
+        return sorted(self.names - set(values))
+
+    def unused(self, values):
+        """Entries of `values` the template never references."""
+        return sorted(set(values) - self.names)
+
+
+class ArgvTemplate:
+    """
+    A command line split into argument templates, for running without a shell.
+
+    `content` is split with shell quoting rules once; each argument is its own
+    Template, so a value fills its argument as-is (spaces, quotes and newlines
+    included) and never becomes extra arguments.
+    """
+
+    __slots__ = ("args", "names")
+
+    def __init__(self, content):
+        # Placeholders are swapped for tokens while splitting, so a name with spaces or
+        # quotes stays one placeholder instead of being split or unbalancing the quotes
+        names = []
+
+        def protect(match):
+            names.append(match.group(0))
+            return f"{ARG_TOKEN}{len(names) - 1}{ARG_TOKEN}"
+
+        protected = PLACEHOLDER.sub(protect, content)
+        if os.name == "posix":
+            args = shlex.split(protected)
+        else:
+            # Keep Windows backslashes; only strip the quotes around an argument
+            args = [arg[1:-1] if len(arg) > 1 and arg[0] == arg[-1] and arg[0] in "\"'" else arg for arg in shlex.split(protected, posix=False)]
+        if not args:
+            raise ValueError("Empty command")
+        if names:
+            args = [ARG_TOKEN_PATTERN.sub(lambda match: names[int(match.group(1))], arg) for arg in args]
+        self.args = tuple(Template(arg) for arg in args)
+        self.names = frozenset().union(*(arg.names for arg in self.args))
+
+    def render(self, values, convert=str):
+        return [arg.render(values, convert) for arg in self.args]
+
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _compiled(factory, content):
+    key = (factory, hashlib.blake2b(content.encode("utf-8", errors="surrogatepass"), digest_size=16).digest())
+    with _cache_lock:
+        compiled = _cache.get(key)
+        if compiled is not None:
+            _cache.move_to_end(key)
+            return compiled
+    compiled = factory(content)
+    with _cache_lock:
+        _cache[key] = compiled
+        if len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return compiled
+
+
+def compile_template(content):
+    """Return the Template for `content`, parsing it only the first time its hash is seen."""
+    return _compiled(Template, content)
+
+
+def compile_argv(content):
+    """Return the ArgvTemplate for `content`, splitting it only the first time its hash is seen. Raises ValueError."""
+    return _compiled(ArgvTemplate, content)
+
+
+def render(content, values, convert=str):
+    return compile_template(content).render(values, convert)
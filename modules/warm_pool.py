@@ -0,0 +1,379 @@
+# Usage:
+#   AIGENTFLOW_WARM_POOL=1 python -m streamlit run main.py
+#
+# Warm worker pool for Python agent actions. A "zygote" interpreter imports the
+# heavy agent dependencies once and then forks one worker per run, so actions like
+# `python agents/random_number.py 10` skip interpreter start-up and those imports.
+# Each worker gets its own argv, cwd, process group and output pipes. POSIX only;
+# anything that is not a plain `python <script>.py ...` command runs as before.
+
+import itertools
+import json
+import logging
+import os
+import re
+import runpy
+import select
+import shlex
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import traceback
+
+from modules.limits import rusage_fields
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WARM_MODULES = ["dotenv", "smolagents", "smolagents.default_tools", "pyautogui", "pyperclip", "requests"]
+PYTHON_NAMES = re.compile(r"^python(\d+(\.\d+)?)?(\.exe)?$")
+# Commands using any shell syntax still need /bin/sh
+SHELL_SYNTAX = re.compile(r"[|&;<>()$`*?{}\[\]~\n]")
+MAX_MESSAGE = 64 * 1024
+# How long start() waits for the zygote to fork before running the command normally
+START_TIMEOUT = 10.0
+
+
+def enabled():
+    return os.name == "posix" and os.getenv("AIGENTFLOW_WARM_POOL", "").lower() in ("1", "true", "yes")
+
+
+def warm_modules():
+    names = os.getenv("AIGENTFLOW_WARM_MODULES")
+    return names.split(",") if names else DEFAULT_WARM_MODULES
+
+
+def parse_python_agent(command):
+    """Return (script, args) if `command` just runs a Python script, otherwise None."""
+    if SHELL_SYNTAX.search(command):
+        return None
+    try:
+        argv = shlex.split(command)
+    except ValueError:
+        return None
+    return python_agent_args(argv)
+
+
+def python_agent_args(argv):
+    """Return (script, args) if `argv` runs a Python script, otherwise None."""
+    if len(argv) < 2:
+        return None
+    executable = os.path.basename(argv[0])
+    if not (PYTHON_NAMES.match(executable) or argv[0] == sys.executable):
+        return None
+    script = argv[1]
+    if script.startswith("-") or not script.endswith(".py"):
+        return None
+    return script, argv[2:]
+
+
+class WarmProcess:
+    """Popen-like handle for a run inside a forked worker, so runner.terminate_process works on it."""
+
+    def __init__(self, pool, request_id):
+        self.pool = pool
+        self.request_id = request_id
+        self.pid = None
+        self.returncode = None
+        self.rusage = None
+        self.error = None
+        self.started = threading.Event()
+        self.finished = threading.Event()
+
+    def poll(self):
+        return self.returncode
+
+    def wait(self):
+        self.finished.wait()
+        return self.returncode
+
+    def terminate(self):
+        self.send_signal(signal.SIGTERM)
+
+    def kill(self):
+        self.send_signal(signal.SIGKILL)
+
+    def send_signal(self, signum):
+        if self.pid is not None and self.returncode is None:
+            try:
+                os.killpg(self.pid, signum)
+            except ProcessLookupError:
+                pass
+
+
+class WarmPool:
+    """Client side of the zygote: sends run requests with their output pipes and collects exit codes."""
+
+    def __init__(self, modules=None):
+        self._socket, zygote_socket = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._zygote = subprocess.Popen(
+            [sys.executable, "-m", "modules.warm_pool", str(zygote_socket.fileno()), ",".join(modules or warm_modules())],
+            pass_fds=[zygote_socket.fileno()],
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            stdin=subprocess.DEVNULL,
+        )
+        zygote_socket.close()
+        self._ids = itertools.count(1)
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._reader = threading.Thread(target=self._read_replies, name="WarmPoolReader", daemon=True)
+        self._reader.start()
+
+    @property
+    def alive(self):
+        return self._zygote.poll() is None
+
+    def start(self, script, args, cwd=None, rlimits=()):
+        """
+        Fork a warm worker running `script` with `args` and the given resource limits.
+
+        Returns (WarmProcess, stdout_pipe, stderr_pipe); the pipes are binary file
+        objects the caller reads until EOF.
+        """
+        process = WarmProcess(self, next(self._ids))
+        request = {
+            "script": script,
+            "args": args,
+            "cwd": os.path.abspath(cwd or os.getcwd()),
+            "rlimits": [[name, *values] for name, values in rlimits],
+        }
+        # The id goes before the JSON so the zygote can answer even a request it cannot parse
+        message = f"{process.request_id}\n".encode("ascii") + json.dumps(request).encode("utf-8")
+        if len(message) > MAX_MESSAGE:
+            # A datagram longer than the zygote's buffer would arrive truncated
+            raise RuntimeError(f"request of {len(message)} bytes is too large for the warm pool")
+        stdout_read, stdout_write = os.pipe()
+        stderr_read, stderr_write = os.pipe()
+        with self._lock:
+            self._pending[process.request_id] = process
+        try:
+            socket.send_fds(self._socket, [message], [stdout_write, stderr_write])
+        except OSError:
+            with self._lock:
+                self._pending.pop(process.request_id, None)
+            os.close(stdout_read)
+            os.close(stderr_read)
+            raise
+        finally:
+            # The worker gets its own copies; ours must go or the reader never sees EOF
+            os.close(stdout_write)
+            os.close(stderr_write)
+        if not process.started.wait(START_TIMEOUT):
+            with self._lock:
+                abandoned = self._pending.pop(process.request_id, None) is not None
+            if abandoned:
+                os.close(stdout_read)
+                os.close(stderr_read)
+                raise RuntimeError(f"warm pool did not start the worker within {START_TIMEOUT:g}s")
+        if process.error:
+            os.close(stdout_read)
+            os.close(stderr_read)
+            raise RuntimeError(process.error)
+        return process, os.fdopen(stdout_read, "rb", buffering=0), os.fdopen(stderr_read, "rb", buffering=0)
+
+    def close(self):
+        # Wake the reader and let it exit before the descriptor is freed: a reader still
+        # blocked on its number would otherwise receive the next pool's replies
+        try:
+            self._socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._zygote.terminate()
+        self._reader.join(timeout=5)
+        self._socket.close()
+        try:
+            self._zygote.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self._zygote.kill()
+
+    def _read_replies(self):
+        while True:
+            try:
+                data = self._socket.recv(MAX_MESSAGE)
+            except OSError:
+                data = b""
+            if not data:
+                break
+            reply = json.loads(data)
+            with self._lock:
+                process = self._pending.get(reply["id"])
+                if process is not None and ("returncode" in reply or "error" in reply):
+                    del self._pending[reply["id"]]
+            if process is None:
+                if "pid" in reply:
+                    # start() gave up waiting for this worker and ran the command itself
+                    try:
+                        os.killpg(reply["pid"], signal.SIGKILL)
+                    except ProcessLookupError:
+                        pass
+                continue
+            if "pid" in reply:
+                process.pid = reply["pid"]
+                process.started.set()
+            if "error" in reply:
+                process.error = reply["error"]
+                process.returncode = 1
+                process.started.set()
+                process.finished.set()
+            if "returncode" in reply:
+                process.rusage = reply.get("rusage")
+                process.returncode = reply["returncode"]
+                process.finished.set()
+        # The zygote is gone: fail whatever was still running
+        with self._lock:
+            pending, self._pending = list(self._pending.values()), {}
+        for process in pending:
+            process.error = process.error or "warm pool stopped"
+            if process.returncode is None:
+                process.returncode = 1
+            process.started.set()
+            process.finished.set()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Start the zygote on first use; restart it if it died. Returns None when disabled."""
+    global _pool
+    if not enabled():
+        return None
+    with _pool_lock:
+        if _pool is None or not _pool.alive:
+            if _pool is not None:
+                _pool.close()
+            _pool = WarmPool()
+        return _pool
+
+
+def start(command, cwd=None, rlimits=(), argv=None):
+    """
+    Run `command` (or, for shell-free actions, `argv`) in a warm worker if the pool
+    is enabled and it is a plain Python script invocation. Returns (process,
+    stdout_pipe, stderr_pipe), or None when the caller should start a fresh process instead.
+    """
+    if not enabled():
+        return None
+    agent = parse_python_agent(command) if argv is None else python_agent_args(argv)
+    if agent is None:
+        return None
+    try:
+        return get_pool().start(*agent, cwd=cwd, rlimits=rlimits)
+    except (OSError, RuntimeError) as e:
+        logger.warning("Warm pool unavailable, starting a new process: %s", e)
+        return None
+
+
+# Zygote side
+
+
+def _run_worker(request, stdout_fd, stderr_fd, wakeup_fds):
+    """Runs in the forked worker: become a process group leader, wire up stdio, run the script."""
+    import resource
+
+    os.setsid()
+    for name, soft, hard in request.get("rlimits", []):
+        resource.setrlimit(name, (soft, hard))
+    signal.set_wakeup_fd(-1)
+    signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+    for fd in wakeup_fds:
+        os.close(fd)
+    devnull = os.open(os.devnull, os.O_RDONLY)
+    os.dup2(devnull, 0)
+    os.dup2(stdout_fd, 1)
+    os.dup2(stderr_fd, 2)
+    for fd in (devnull, stdout_fd, stderr_fd):
+        os.close(fd)
+    code = 0
+    try:
+        os.chdir(request["cwd"])
+        script = os.path.abspath(request["script"])
+        sys.argv = [request["script"], *request["args"]]
+        # Same sys.path[0] as `python <script>` would have
+        sys.path[0] = os.path.dirname(script)
+        runpy.run_path(script, run_name="__main__")
+    except SystemExit as e:
+        if e.code is None:
+            code = 0
+        elif isinstance(e.code, int):
+            code = e.code
+        else:
+            print(e.code, file=sys.stderr)
+            code = 1
+    except BaseException:
+        traceback.print_exc()
+        code = 1
+    finally:
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        finally:
+            os._exit(code)
+
+
+def _zygote(sock_fd, modules):
+    sock = socket.socket(fileno=sock_fd)
+    for name in modules:
+        try:
+            __import__(name)
+        except Exception as e:
+            print(f"warm pool: could not pre-import {name}: {e}", file=sys.stderr)
+    sys.stdout.flush()
+    sys.stderr.flush()
+    # SIGCHLD wakes up the select below as soon as a worker exits
+    wakeup_read, wakeup_write = os.pipe()
+    os.set_blocking(wakeup_read, False)
+    os.set_blocking(wakeup_write, False)
+    signal.set_wakeup_fd(wakeup_write)
+    signal.signal(signal.SIGCHLD, lambda signum, frame: None)
+    running = {}
+    while True:
+        ready, _, _ = select.select([sock, wakeup_read], [], [], 1.0)
+        if wakeup_read in ready:
+            try:
+                os.read(wakeup_read, 4096)
+            except BlockingIOError:
+                pass
+        if sock in ready:
+            try:
+                data, fds, _flags, _addr = socket.recv_fds(sock, MAX_MESSAGE, 2)
+            except OSError:
+                return
+            if not data:
+                return
+            header, _, body = data.partition(b"\n")
+            try:
+                request_id = int(header)
+                request = json.loads(body)
+                if len(fds) != 2:
+                    raise ValueError(f"expected 2 file descriptors, got {len(fds)}")
+                pid = os.fork()
+            except (OSError, ValueError) as e:
+                for fd in fds:
+                    os.close(fd)
+                if header.isdigit():
+                    sock.send(json.dumps({"id": int(header), "error": f"warm pool: {e}"}).encode("utf-8"))
+                else:
+                    print(f"warm pool: dropped an unreadable request: {e}", file=sys.stderr)
+                continue
+            if pid == 0:
+                sock.close()
+                _run_worker(request, *fds, wakeup_fds=(wakeup_read, wakeup_write))
+            for fd in fds:
+                os.close(fd)
+            running[pid] = request_id
+            sock.send(json.dumps({"id": request_id, "pid": pid}).encode("utf-8"))
+        while running:
+            pid, status, usage = os.wait4(-1, os.WNOHANG)
+            if pid == 0:
+                break
+            request_id = running.pop(pid, None)
+            if request_id is not None:
+                reply = {"id": request_id, "returncode": os.waitstatus_to_exitcode(status), "rusage": rusage_fields(usage)}
+                sock.send(json.dumps(reply).encode("utf-8"))
+
+
+if __name__ == "__main__":
+    _zygote(int(sys.argv[1]), [name for name in sys.argv[2].split(",") if name])
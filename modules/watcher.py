@@ -0,0 +1,252 @@
+import ctypes
+import ctypes.util
+import logging
+import os
+import platform
+import select
+import struct
+import threading
+import time
+from pathlib import Path
+
+from modules.catalog import ACTION_DIR, HISTORY_DIR, PIPELINE_DIR, PROMPT_DIR, get_catalog
+
+logger = logging.getLogger(__name__)
+
+ADDED = "added"
+MODIFIED = "modified"
+DELETED = "deleted"
+RESCAN = "rescan"
+
+# inotify(7) constants
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class Watcher:
+    """
+    Base class for directory watchers.
+
+    Subclasses report raw events through _emit(); the base class coalesces them
+    per path and calls `callback(batch)` once the directories have been quiet for
+    `debounce` seconds (or after `max_delay` seconds of continuous activity), so a
+    burst such as a `git pull` touching hundreds of files becomes a single refresh.
+    """
+
+    def __init__(self, directories, callback, debounce=0.2, max_delay=2.0):
+        self.directories = [Path(directory) for directory in directories]
+        self.callback = callback
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self._pending = {}
+        self._first_event = None
+        self._last_event = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name=type(self).__name__, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self._wait(self.debounce if self._pending else 1.0)
+            except Exception as e:
+                logger.error(f"{type(self).__name__} stopped: {e}")
+                return
+            if self._pending:
+                now = time.monotonic()
+                if now - self._last_event >= self.debounce or now - self._first_event >= self.max_delay:
+                    self._flush()
+        self._close()
+
+    def _emit(self, kind, path):
+        now = time.monotonic()
+        if not self._pending:
+            self._first_event = now
+        self._last_event = now
+        previous = self._pending.get(path)
+        # A file created and then modified within one batch is still an addition
+        if previous == ADDED and kind == MODIFIED:
+            kind = ADDED
+        self._pending[path] = kind
+
+    def _flush(self):
+        batch = list(self._pending.items())
+        self._pending.clear()
+        try:
+            self.callback(batch)
+        except Exception as e:
+            logger.error(f"Watcher callback failed: {e}")
+
+    def _wait(self, timeout):
+        raise NotImplementedError
+
+    def _close(self):
+        pass
+
+
+class PollingWatcher(Watcher):
+    """Portable fallback: diff (mtime, size) snapshots of the directories every `interval` seconds."""
+
+    def __init__(self, directories, callback, interval=1.0, **kwargs):
+        super().__init__(directories, callback, **kwargs)
+        self.interval = interval
+        self._snapshot = {directory: self._scan(directory) for directory in self.directories}
+
+    def _wait(self, timeout):
+        if self._stop.wait(min(timeout, self.interval)):
+            return
+        for directory in self.directories:
+            current = self._scan(directory)
+            previous = self._snapshot[directory]
+            for path, signature in current.items():
+                if path not in previous:
+                    self._emit(ADDED, path)
+                elif previous[path] != signature:
+                    self._emit(MODIFIED, path)
+            for path in previous.keys() - current.keys():
+                self._emit(DELETED, path)
+            self._snapshot[directory] = current
+
+    @staticmethod
+    def _scan(directory):
+        snapshot = {}
+        try:
+            with os.scandir(directory) as scan:
+                for entry in scan:
+                    if entry.name.endswith(".json"):
+                        try:
+                            stat = entry.stat()
+                        except FileNotFoundError:
+                            continue
+                        snapshot[entry.path] = (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            pass
+        return snapshot
+
+
+class InotifyWatcher(Watcher):
+    """Linux watcher reading inotify events through libc, without any extra dependency."""
+
+    MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_MOVED_FROM | IN_DELETE | IN_CREATE | IN_MODIFY
+
+    def __init__(self, directories, callback, **kwargs):
+        super().__init__(directories, callback, **kwargs)
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._watches = {}
+        for directory in self.directories:
+            directory.mkdir(parents=True, exist_ok=True)
+            wd = libc.inotify_add_watch(self._fd, os.fsencode(directory), self.MASK)
+            if wd < 0:
+                os.close(self._fd)
+                raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {directory}")
+            self._watches[wd] = directory
+
+    def _wait(self, timeout):
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return
+        offset = 0
+        while offset < len(data):
+            wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0").decode(errors="surrogateescape")
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                for directory in self.directories:
+                    self._emit(RESCAN, str(directory))
+                continue
+            directory = self._watches.get(wd)
+            if directory is None or not name.endswith(".json"):
+                continue
+            path = os.path.join(directory, name)
+            if mask & (IN_DELETE | IN_MOVED_FROM):
+                self._emit(DELETED, path)
+            elif mask & (IN_CREATE | IN_MOVED_TO):
+                self._emit(ADDED, path)
+            else:
+                self._emit(MODIFIED, path)
+
+    def _close(self):
+        os.close(self._fd)
+
+
+def create_watcher(directories, callback, **kwargs):
+    """Return an inotify watcher on Linux, falling back to polling elsewhere or on failure."""
+    if platform.system() == "Linux":
+        try:
+            return InotifyWatcher(directories, callback, **kwargs)
+        except (OSError, AttributeError) as e:
+            logger.warning(f"inotify unavailable, falling back to polling: {e}")
+    return PollingWatcher(directories, callback, **kwargs)
+
+
+def apply_events(batch):
+    """Push a coalesced batch of file events into the catalogs behind the managers."""
+    by_directory = {}
+    for path, kind in batch:
+        if kind == RESCAN:
+            get_catalog(path).refresh()
+        else:
+            by_directory.setdefault(Path(path).parent, []).append(path)
+    for directory, paths in by_directory.items():
+        get_catalog(directory).refresh_files(paths)
+    logger.debug(f"Applied {len(batch)} store events")
+
+
+_store_watcher = None
+_store_watcher_lock = threading.Lock()
+
+
+def watch_store(directories=(ACTION_DIR, PROMPT_DIR, HISTORY_DIR, PIPELINE_DIR), **kwargs):
+    """
+    Start (once per process) a watcher over the .aigentflow store.
+
+    The watched catalogs are loaded once and then only updated from file events,
+    so Streamlit reruns no longer stat the directories.
+    """
+    global _store_watcher
+    with _store_watcher_lock:
+        if _store_watcher is None:
+            watcher = create_watcher(directories, apply_events, **kwargs)
+            for directory in directories:
+                catalog = get_catalog(directory)
+                catalog.refresh()
+                catalog.watched = True
+            _store_watcher = watcher.start()
+        return _store_watcher
+
+
+def stop_watching_store():
+    global _store_watcher
+    with _store_watcher_lock:
+        if _store_watcher is not None:
+            _store_watcher.stop()
+            for directory in _store_watcher.directories:
+                get_catalog(directory).watched = False
+            _store_watcher = None
@@ -0,0 +1,141 @@
+# Usage:
+#   pytest tests/benchmarks --benchmark-only --benchmark-storage=tests/benchmarks/baselines --benchmark-compare --benchmark-compare-fail=min:50%
+#   pytest tests/benchmarks --benchmark-only --benchmark-storage=tests/benchmarks/baselines --benchmark-save=baseline
+#   AIGENTFLOW_BENCH_SIZES=10,1000,100000 pytest tests/benchmarks --benchmark-only   # include the 100k tree
+#
+# Times the core hot paths through their public functions on synthetic .aigentflow trees
+# of actions, prompts and history records: the page loaders (first load and reruns), the
+# history page query, prompt rendering with large variable values, decode_output on
+# multi-MB outputs and an end-to-end run of a trivial `echo` action. The Streamlit pages'
+# loaders are skipped where streamlit is not installed.
+
+import json
+import os
+import time
+
+import pytest
+
+from modules import catalog, schema, storage
+from modules.journal import Journal, get_journal, get_writer
+from modules.runner import run_action
+from utils.string_utils import decode_output
+
+pytest.importorskip("pytest_benchmark")
+
+SIZES = [int(size) for size in os.getenv("AIGENTFLOW_BENCH_SIZES", "10,1000").split(",") if size]
+
+
+def make_tree(root, size):
+    """Write `size` actions, prompts and history records under root/.aigentflow."""
+    store = root / ".aigentflow"
+    for kind in ("actions", "prompts"):
+        (store / kind).mkdir(parents=True)
+    for i in range(size):
+        action = {
+            "name": f"Action {i}",
+            "content": f"python agents/random_number.py <max_number> # {i}",
+            "variables": [{"name": "max_number", "type": "number", "default": str(i)}],
+        }
+        prompt = {
+            "name": f"Prompt {i}",
+            "content": f"Translate to english the next message:\n\n<message>\n\n({i})",
+            "variables": [{"name": "message", "type": "text", "default": "hola mundo"}],
+        }
+        (store / "actions" / f"Action_{i}.json").write_text(json.dumps(action))
+        (store / "prompts" / f"Prompt_{i}.json").write_text(json.dumps(prompt))
+
+    journal = Journal(store / "journal")
+    now = time.time() - size
+    records = (
+        {
+            "name": f"Action {i % 50}",
+            "command": f"python agents/random_number.py {i}",
+            "variables": {"max_number": i},
+            "returncode": 0 if i % 7 else 1,
+            "stdout": f"{i}\n",
+            "stderr": "",
+            "timestamp": now + i,
+            "duration": 0.05 + (i % 13) / 100,
+            "stdout_bytes": len(str(i)) + 1,
+            "stderr_bytes": 0,
+        }
+        for i in range(size)
+    )
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) == 10000:
+            journal.append_many(batch)
+            batch = []
+    journal.append_many(batch)
+    journal.close()
+
+
+@pytest.fixture(scope="module", params=SIZES, ids=lambda size: f"{size}")
+def tree(request, tmp_path_factory):
+    root = tmp_path_factory.mktemp(f"tree_{request.param}")
+    make_tree(root, request.param)
+    return root
+
+
+@pytest.fixture
+def in_tree(tree, project_dir, monkeypatch):
+    monkeypatch.chdir(tree)
+    return tree
+
+
+def cold():
+    """Forget the process-wide catalogs and backend, as in a freshly started app."""
+    catalog._catalogs.clear()
+    storage._backend = None
+
+
+def page_loader(module, name):
+    return getattr(pytest.importorskip(module, reason="the page modules need streamlit"), name)
+
+
+@pytest.mark.parametrize("module, loader", [("modules.action_manager", "load_actions"), ("modules.prompt_manager", "load_prompts")])
+def test_load_first(benchmark, in_tree, module, loader):
+    load = page_loader(module, loader)
+    benchmark.pedantic(load, setup=cold, rounds=20, warmup_rounds=1)
+
+
+@pytest.mark.parametrize("module, loader", [("modules.action_manager", "load_actions"), ("modules.prompt_manager", "load_prompts")])
+def test_load_rerun(benchmark, in_tree, module, loader):
+    load = page_loader(module, loader)
+    load()
+    benchmark(load)
+
+
+@pytest.mark.parametrize("kind", ["actions", "prompts"])
+def test_validate_store_first(benchmark, in_tree, kind):
+    # What the page loaders call, without Streamlit
+    benchmark.pedantic(schema.validate_store, args=(kind,), setup=cold, rounds=20, warmup_rounds=1)
+
+
+def test_load_history(benchmark, in_tree):
+    load_history = page_loader("modules.history_manager", "load_history")
+    benchmark(load_history)
+
+
+def test_history_page(benchmark, in_tree):
+    benchmark(lambda: get_journal().query(limit=25))
+
+
+def test_prepare_prompt(benchmark):
+    prepare_prompt = page_loader("modules.prompt_manager", "prepare_prompt")
+    prompt = "Summarise the following diff:\n\n<diff>\n\nContext:\n<context>\n\nAnswer in <language>."
+    values = {"diff": "+ added line\n- removed line\n" * 100000, "context": "x" * (1024 * 1024), "language": "English"}
+    benchmark(prepare_prompt, prompt, values)
+
+
+@pytest.mark.parametrize("encoding, text", [("utf-8", "línea de salida ✓ "), ("cp1252", "línea de salida ")], ids=["utf-8", "cp1252"])
+def test_decode_output(benchmark, encoding, text):
+    output = (text * 250000).encode(encoding)
+    assert benchmark(decode_output, output) == text * 250000
+
+
+def test_run_action(benchmark, project_dir):
+    result = benchmark(run_action, "Echo", "echo <message>", {"message": "hello"})
+    get_writer().flush()
+    assert result["stdout"] == "hello\n"
@@ -0,0 +1,20 @@
+import pytest
+
+from modules import catalog, journal, search_index, storage
+
+
+@pytest.fixture(autouse=True)
+def project_dir(tmp_path, monkeypatch):
+    """
+    Run each test in an empty project directory. .aigentflow is relative to the working
+    directory, so the process-wide catalogs, backend, journal and index start over too.
+    """
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(catalog, "_catalogs", {})
+    monkeypatch.setattr(storage, "_backend", None)
+    monkeypatch.setattr(journal, "_journal", None)
+    monkeypatch.setattr(journal, "_writer", None)
+    monkeypatch.setattr(search_index, "_index", None)
+    yield tmp_path
+    if journal._writer is not None:
+        journal._writer.flush()
@@ -0,0 +1,51 @@
+import os
+import time
+
+from utils import disk_lru
+
+
+def write(directory, name, size, age):
+    path = directory / name[:2] / name
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"x" * size)
+    stamp = time.time() - age
+    os.utime(path, (stamp, stamp))
+    return path
+
+
+def test_evicts_least_recently_used_first(tmp_path):
+    paths = [write(tmp_path, f"{i:02d}blob", 100, age=100 - i) for i in range(10)]
+    assert disk_lru.evict(tmp_path, 450) == 400
+    assert [path.exists() for path in paths] == [False] * 6 + [True] * 4
+
+
+def test_expired_entries_go_first(tmp_path):
+    old = write(tmp_path, "aaold", 100, age=10)
+    expired = write(tmp_path, "bbexpired", 100, age=0)
+    assert disk_lru.evict(tmp_path, 1000, expired=lambda path, now: path.name == "bbexpired") == 100
+    assert old.exists() and not expired.exists()
+
+
+def test_added_scans_only_when_due(tmp_path, monkeypatch):
+    scans = []
+    evict = disk_lru.evict
+    monkeypatch.setattr(disk_lru, "_budgets", {})
+    monkeypatch.setattr(disk_lru, "evict", lambda *args: scans.append(args) or evict(*args))
+    # The first write in a process always scans; later ones wait for 10% of the budget
+    for _ in range(10):
+        disk_lru.added(tmp_path, 100, 10000)
+    assert len(scans) == 1
+    disk_lru.added(tmp_path, 100, 10000)
+    assert len(scans) == 2
+    # ... or for SCAN_INTERVAL to pass, to catch up with other processes
+    monkeypatch.setattr(disk_lru, "SCAN_INTERVAL", 0.0)
+    disk_lru.added(tmp_path, 100, 10000)
+    assert len(scans) == 3
+
+
+def test_added_keeps_the_store_near_its_budget(tmp_path):
+    for i in range(200):
+        path = write(tmp_path, f"{i:03d}blob", 100, age=0)
+        disk_lru.added(tmp_path, path.stat().st_size, 5000)
+    total = sum(path.stat().st_size for path in tmp_path.glob("*/*"))
+    assert total <= 5000 * (1 + disk_lru.SCAN_FRACTION)
@@ -0,0 +1,25 @@
+import sys
+
+from modules.jobs import CANCELLED, FINISHED, Job, JobManager
+
+
+def test_job_runs_in_background():
+    manager = JobManager(max_workers=1)
+    job_id = manager.submit("Echo", f"{sys.executable} -c 'print(<n>)'", {"n": "42"})
+    manager.get(job_id).future.result()
+    progress = manager.status(job_id)
+    assert (progress["status"], progress["returncode"]) == (FINISHED, 0)
+    assert manager.get(job_id).stdout.text() == "42\n"
+    manager.shutdown()
+
+
+def test_job_cancelled_before_it_starts_has_finished_at():
+    # Cancelled after a worker took it but before it started: the worker notices first
+    manager = JobManager(max_workers=1)
+    job = Job("Echo", "echo hi", {})
+    job.cancel_requested = True
+    manager._run(job)
+    assert job.status == CANCELLED
+    assert job.finished_at is not None
+    assert job.started_at is None and job.elapsed == 0.0
+    manager.shutdown()
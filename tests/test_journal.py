@@ -0,0 +1,119 @@
+from modules import search_index
+from modules.journal import INDEX_ENTRY, Journal, JournalWriter
+
+
+def record(i, name="Echo", returncode=0):
+    return {"name": name, "command": f"echo {i}", "returncode": returncode, "timestamp": 1000.0 + i, "duration": i / 10, "stdout": f"{i}\n"}
+
+
+def test_append_and_read_back(tmp_path):
+    journal = Journal(tmp_path)
+    positions = journal.append_many([record(i) for i in range(3)])
+    assert [journal.read_at(*position)["command"] for position in positions] == ["echo 0", "echo 1", "echo 2"]
+    assert journal.count() == 3
+    assert [r["command"] for r in journal.iter_records()] == ["echo 0", "echo 1", "echo 2"]
+    journal.close()
+
+
+def test_query_filters_sorts_and_pages(tmp_path):
+    journal = Journal(tmp_path)
+    journal.append_many([record(i, name="A" if i % 2 else "B", returncode=i % 3) for i in range(10)])
+
+    records, more = journal.query(limit=3)
+    assert [r["command"] for r in records] == ["echo 9", "echo 8", "echo 7"]
+    assert more
+
+    records, more = journal.query(sort="oldest", offset=8, limit=5)
+    assert [r["command"] for r in records] == ["echo 8", "echo 9"]
+    assert not more
+
+    records, _ = journal.query(name="A", returncode="success", limit=10)
+    assert [r["command"] for r in records] == ["echo 9", "echo 3"]
+
+    records, _ = journal.query(since=1005.0, until=1008.0, sort="oldest", limit=10)
+    assert [r["command"] for r in records] == ["echo 5", "echo 6", "echo 7"]
+
+    records, _ = journal.query(sort="slowest", limit=1, returncode="failed")
+    assert records[0]["command"] == "echo 8"
+    journal.close()
+
+
+def test_rotates_segments(tmp_path):
+    journal = Journal(tmp_path, segment_max_bytes=300)
+    journal.append_many([record(i) for i in range(10)])
+    assert len(journal.segments()) > 1
+    assert journal.count() == 10
+    assert [entry.timestamp for entry in journal.iter_index(reverse=True)] == [1000.0 + i for i in reversed(range(10))]
+    journal.close()
+
+
+def test_recovers_torn_tail_and_missing_index(tmp_path):
+    journal = Journal(tmp_path)
+    journal.append_many([record(i) for i in range(3)])
+    journal.close()
+    data_path = journal.segment_path(1)
+    index_path = journal.segment_path(1, ".idx")
+    # A crash after the data write: the last record is not indexed, the next one is torn
+    with open(index_path, "rb+") as file:
+        file.truncate(2 * INDEX_ENTRY.size + 5)
+    with open(data_path, "ab") as file:
+        file.write(b'{"name": "Echo", "comm')
+
+    journal = Journal(tmp_path)
+    journal.append_many([record(3)])
+    assert journal.count() == 4
+    assert [r["command"] for r in journal.iter_records()] == ["echo 0", "echo 1", "echo 2", "echo 3"]
+    records, _ = journal.query(sort="oldest", limit=10)
+    assert [r["command"] for r in records] == ["echo 0", "echo 1", "echo 2", "echo 3"]
+    journal.close()
+
+
+def test_instances_sharing_a_directory_do_not_overwrite_offsets(tmp_path):
+    # Two processes (the app and the CLI) append to the same journal
+    first, second = Journal(tmp_path, segment_max_bytes=400), Journal(tmp_path, segment_max_bytes=400)
+    positions = []
+    for i in range(12):
+        positions += (first if i % 2 else second).append_many([record(i)])
+    assert [first.read_at(*position)["command"] for position in positions] == [f"echo {i}" for i in range(12)]
+    assert second.count() == 12
+    first.close()
+    second.close()
+
+
+def test_writer_flushes_submitted_records(tmp_path):
+    journal = Journal(tmp_path)
+    writer = JournalWriter(journal, linger=0.01)
+    for i in range(50):
+        writer.submit(record(i))
+    writer.flush()
+    assert journal.count() == 50
+    journal.close()
+
+
+def test_writer_survives_records_the_index_cannot_take(tmp_path):
+    # e.g. `aigentflow run ... --var x=$'caf\xe9'` gives a value with a lone surrogate
+    journal = Journal(tmp_path / "journal")
+    writer = JournalWriter(journal, linger=0.01)
+    writer.submit(dict(record(0), variables={"x": "caf\udce9"}))
+    writer.flush()
+    writer.submit(record(1))
+    writer.flush()
+    assert [r["command"] for r in journal.iter_records()] == ["echo 0", "echo 1"]
+    if search_index.get_index() is not None:
+        # Indexed too, at segment 1, offset 0
+        assert [match["ref"].split(":")[:2] for match in search_index.search("caf")] == [["1", "0"]]
+    journal.close()
+
+
+def test_writer_survives_index_failures(tmp_path, monkeypatch):
+    def broken():
+        raise RuntimeError("index unavailable")
+
+    monkeypatch.setattr(search_index, "get_index", broken)
+    journal = Journal(tmp_path / "journal")
+    writer = JournalWriter(journal, linger=0.01)
+    for i in range(2):
+        writer.submit(record(i))
+        writer.flush()
+    assert journal.count() == 2
+    journal.close()
@@ -0,0 +1,84 @@
+import os
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from agents import llm_cache
+from agents.llm_cache import CacheMiss, CachedModel, cache_key
+
+MESSAGES = [{"role": "user", "content": [{"type": "text", "text": "What is 2 + 2?"}]}]
+
+
+class StubModel:
+    """Answers every call with the number of calls so far."""
+
+    def __init__(self):
+        self.calls = 0
+        self.last_input_token_count = None
+        self.last_output_token_count = None
+
+    def __call__(self, messages, stop_sequences=None, grammar=None, tools_to_call_from=None, **kwargs):
+        from smolagents.models import ChatMessage
+
+        self.calls += 1
+        self.last_input_token_count, self.last_output_token_count = 10, self.calls
+        return ChatMessage(role="assistant", content=f"answer {self.calls}")
+
+
+def tool(name, inputs):
+    return SimpleNamespace(name=name, description=f"{name} tool", inputs=inputs, output_type="string")
+
+
+def test_key_depends_on_the_whole_call():
+    key = cache_key("HfApiModel", "m", MESSAGES, stop_sequences=["Observation:"], tools=None)
+    assert key == cache_key("HfApiModel", "m", MESSAGES, stop_sequences=["Observation:"], tools=None)
+    assert key != cache_key("HfApiModel", "m", MESSAGES, stop_sequences=["Observation:", "<end>"], tools=None)
+    assert key != cache_key("HfApiModel", "other", MESSAGES, stop_sequences=["Observation:"], tools=None)
+
+    search = tool("search", {"query": {"type": "string", "description": "What to look for"}})
+    with_tool = cache_key("HfApiModel", "m", MESSAGES, stop_sequences=None, tools=[search])
+    assert with_tool != cache_key("HfApiModel", "m", MESSAGES, stop_sequences=None, tools=None)
+    changed = tool("search", {"query": {"type": "string", "description": "A web search query"}})
+    assert with_tool != cache_key("HfApiModel", "m", MESSAGES, stop_sequences=None, tools=[changed])
+
+
+def test_evict_respects_max_bytes(tmp_path):
+    for i in range(10):
+        key = f"{i:02d}" + "0" * 38
+        llm_cache.put(key, {"message": {"content": "x" * 100}}, tmp_path, max_bytes=10**6)
+        path = llm_cache.entry_path(key, tmp_path)
+        stamp = time.time() - 100 + i
+        os.utime(path, (stamp, stamp))
+    size = llm_cache.entry_path("00" + "0" * 38, tmp_path).stat().st_size
+
+    assert llm_cache.evict(tmp_path, 4 * size) <= 4 * size
+    kept = sorted(path.name[:2] for path in tmp_path.glob("*/*.json"))
+    assert kept == ["06", "07", "08", "09"]
+
+
+def test_recorded_call_replays_without_the_model(tmp_path):
+    pytest.importorskip("smolagents")
+    stub = StubModel()
+    model = CachedModel(stub, "StubModel", "stub", directory=tmp_path)
+    first = model(MESSAGES, stop_sequences=["Observation:"])
+    again = model(MESSAGES, stop_sequences=["Observation:"])
+    assert (first.content, again.content) == ("answer 1", "answer 1")
+    assert stub.calls == 1
+    assert (model.hits, model.misses) == (1, 1)
+    assert model.get_token_counts() == {"input_token_count": 10, "output_token_count": 1}
+
+    replay = CachedModel(None, "StubModel", "stub", replay=True, directory=tmp_path)
+    assert replay(MESSAGES, stop_sequences=["Observation:"]).content == "answer 1"
+    # A different stop sequence is a different call
+    assert model(MESSAGES, stop_sequences=["<end>"]).content == "answer 2"
+
+
+def test_replay_raises_cache_miss_for_unrecorded_call(tmp_path):
+    pytest.importorskip("smolagents")
+    stub = StubModel()
+    model = CachedModel(stub, "StubModel", "stub", replay=True, directory=tmp_path)
+    with pytest.raises(CacheMiss, match="run once without --replay"):
+        model(MESSAGES)
+    assert stub.calls == 0
+    assert model.misses == 1
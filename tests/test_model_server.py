@@ -0,0 +1,146 @@
+import json
+import socket
+import threading
+import time
+
+import pytest
+
+from agents import model_server
+from agents.model_server import Batcher, ModelServerError, ModelServerModel, make_server
+
+
+class EchoBackend:
+    """Answers each request with its last message, upper-cased; a message "fail" breaks its batch."""
+
+    model_id = "test/echo"
+
+    def __init__(self):
+        self.batches = []
+
+    def generate_batch(self, payloads):
+        self.batches.append(len(payloads))
+        texts = [payload["messages"][-1]["content"] for payload in payloads]
+        if "fail" in texts:
+            raise RuntimeError("cannot generate")
+        return [{"content": text.upper(), "input_token_count": len(text), "output_token_count": len(text)} for text in texts]
+
+
+@pytest.fixture
+def backend():
+    return EchoBackend()
+
+
+@pytest.fixture
+def server(backend):
+    server = make_server(backend, "127.0.0.1:0", max_wait=0.5)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def address(server):
+    host, port = server.server_address
+    return f"{host}:{port}"
+
+
+def ask(server, text):
+    """Send one generate request on its own connection, as a separate agent process would."""
+    with socket.create_connection(server.server_address, timeout=5) as sock, sock.makefile("rwb") as file:
+        file.write(json.dumps({"op": "generate", "messages": [{"role": "user", "content": text}]}).encode("utf-8") + b"\n")
+        file.flush()
+        return json.loads(file.readline())
+
+
+def ask_concurrently(server, texts):
+    responses = [None] * len(texts)
+
+    def worker(i):
+        responses[i] = ask(server, texts[i])
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(len(texts))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return responses
+
+
+def test_parse_address():
+    assert model_server.parse_address("127.0.0.1:8765")[1] == ("127.0.0.1", 8765)
+    assert model_server.parse_address(":9000")[1] == ("127.0.0.1", 9000)
+
+
+def test_concurrent_requests_share_one_batch(server, backend):
+    responses = ask_concurrently(server, ["a", "b", "c", "d"])
+    assert [response["content"] for response in responses] == ["A", "B", "C", "D"]
+    assert backend.batches == [4]
+
+
+def test_failing_request_fails_only_itself(server, backend):
+    responses = ask_concurrently(server, ["a", "fail", "c"])
+    assert responses[0]["content"] == "A"
+    assert responses[1]["error"] == "RuntimeError: cannot generate"
+    assert responses[2]["content"] == "C"
+    # The failed batch, then each request on its own
+    assert backend.batches == [3, 1, 1, 1]
+
+
+def test_batcher_respects_max_batch_size(backend):
+    batcher = Batcher(backend.generate_batch, max_batch_size=2, max_wait=0.5)
+    results = [None] * 3
+    threads = [
+        threading.Thread(target=lambda i=i: results.__setitem__(i, batcher.submit({"messages": [{"content": str(i)}]})))
+        for i in range(3)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert [result["content"] for result in results] == ["0", "1", "2"]
+    assert sorted(backend.batches) == [1, 2]
+    assert (batcher.batches, batcher.requests) == (2, 3)
+
+
+def test_info_reports_served_model(server, capsys):
+    model = ModelServerModel(address=address(server), model_id="someone/else")
+    assert model.model_id == "test/echo"
+    assert "serves test/echo, not someone/else" in capsys.readouterr().err
+    ask(server, "a")
+    assert model._request({"op": "info"})["requests"] == 1
+    model.close()
+
+
+def test_info_without_model_id_does_not_warn(server, capsys):
+    ModelServerModel(address=address(server)).close()
+    assert capsys.readouterr().err == ""
+
+
+def test_client_reconnects_after_server_drops_connection(server, monkeypatch):
+    # The server closes connections that stay idle longer than this
+    monkeypatch.setattr(model_server._Handler, "timeout", 0.1)
+    monkeypatch.setattr(server, "handle_error", lambda request, client_address: None)
+    model = ModelServerModel(address=address(server), timeout=5)
+    dropped = model._socket
+    time.sleep(0.3)
+    assert model._request({"op": "info"})["model_id"] == "test/echo"
+    assert model._socket is not dropped
+    model.close()
+
+
+def test_missing_server_is_reported():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        host, port = sock.getsockname()
+    with pytest.raises(ModelServerError, match="No model server"):
+        ModelServerModel(address=f"{host}:{port}")
+
+
+def test_call_returns_chat_message(server):
+    pytest.importorskip("smolagents")
+    model = ModelServerModel(address=address(server))
+    message = model([{"role": "user", "content": [{"type": "text", "text": "hello"}]}], stop_sequences=["Observation:"])
+    assert message.content == "HELLO"
+    assert model.get_token_counts() == {"input_token_count": 5, "output_token_count": 5}
+    model.close()
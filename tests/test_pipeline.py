@@ -0,0 +1,30 @@
+from modules.pipeline import FINISHED, SKIPPED, PipelineRun
+
+CHAIN = {
+    "name": "Chain",
+    "nodes": [
+        {"id": "a", "type": "prompt", "content": "<word>", "variables": {"word": "hello"}},
+        {"id": "b", "type": "prompt", "content": "<text> world", "inputs": {"text": "a"}},
+        {"id": "c", "type": "prompt", "content": "<text>!", "inputs": {"text": "b"}},
+    ],
+}
+
+
+def statuses(run):
+    return {node_id: result["status"] for node_id, result in run.results.items()}
+
+
+def test_chain_passes_outputs_downstream():
+    run = PipelineRun(CHAIN)
+    run.run()
+    assert statuses(run) == {"a": FINISHED, "b": FINISHED, "c": FINISHED}
+    assert run.sink_outputs() == {"c": "hello world!"}
+
+
+def test_cancel_skips_everything_downstream():
+    run = PipelineRun(CHAIN)
+    run.cancel()
+    run.run()
+    assert statuses(run) == {"a": SKIPPED, "b": SKIPPED, "c": SKIPPED}
+    assert run.results["a"]["error"] == "cancelled"
+    assert run.done == run.total
@@ -0,0 +1,51 @@
+import os
+import sys
+
+import pytest
+
+from modules.journal import get_journal, get_writer
+from modules.runner import render_argv, run_action
+
+posix_only = pytest.mark.skipif(os.name != "posix", reason="shell syntax differs on Windows")
+
+
+def test_render_argv_keeps_each_value_in_one_argument():
+    argv = render_argv("grep -r <pattern> '<dir>/src'", {"pattern": 'a "quoted" value; rm -rf /', "dir": "my project"})
+    assert argv == ["grep", "-r", 'a "quoted" value; rm -rf /', "my project/src"]
+
+
+def test_render_argv_keeps_values_with_newlines_and_unknown_placeholders():
+    assert render_argv("echo <text> <other>", {"text": "two\nlines"}) == ["echo", "two\nlines", "<other>"]
+
+
+def test_render_argv_names_with_spaces():
+    assert render_argv("cp <source file> <target dir>", {"source file": "a b.txt", "target dir": "out"}) == ["cp", "a b.txt", "out"]
+
+
+@pytest.mark.parametrize("content", ["echo 'unbalanced", "", "   "])
+def test_render_argv_rejects_unsplittable_content(content):
+    with pytest.raises(ValueError):
+        render_argv(content, {})
+
+
+def test_run_action_without_shell_passes_values_intact():
+    result = run_action("Echo", f"{sys.executable} -c 'import sys; print(sys.argv[1])' <value>", {"value": 'say "hi"; exit 3'}, shell=False, record=False)
+    assert result["returncode"] == 0
+    assert result["stdout"].strip() == 'say "hi"; exit 3'
+
+
+def test_run_action_reports_unsplittable_content_as_failed_run():
+    result = run_action("Broken", "echo 'unbalanced <x>", {"x": "1"}, shell=False)
+    assert result["returncode"] == 1
+    assert "Cannot split the action into arguments" in result["stderr"]
+    get_writer().flush()
+    records, _ = get_journal().query(limit=1)
+    assert records[0]["name"] == "Broken"
+    assert records[0]["returncode"] == 1
+
+
+@posix_only
+def test_run_action_with_shell():
+    result = run_action("Echo", "echo <a> | tr a-z A-Z; exit 2", {"a": "hello"}, record=False)
+    assert result["returncode"] == 2
+    assert result["stdout"] == "HELLO\n"
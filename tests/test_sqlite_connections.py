@@ -0,0 +1,32 @@
+import gc
+import threading
+
+from modules.sqlite_connections import ThreadConnections
+
+
+def test_one_connection_per_thread(tmp_path):
+    connections = ThreadConnections(str(tmp_path / "db.sqlite"))
+    assert connections.get() is connections.get()
+    serial = connections.serial()
+    seen = []
+    thread = threading.Thread(target=lambda: seen.append(connections.serial()))
+    thread.start()
+    thread.join()
+    assert seen and seen[0] != serial
+    assert connections.get().execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    connections.close_all()
+
+
+def test_connections_close_when_their_thread_exits(tmp_path):
+    # Streamlit runs each rerun on a new thread
+    connections = ThreadConnections(str(tmp_path / "db.sqlite"))
+    connections.get().execute("CREATE TABLE t (x)")
+    for i in range(50):
+        thread = threading.Thread(target=lambda: connections.get().execute("INSERT INTO t VALUES (1)").connection.commit())
+        thread.start()
+        thread.join()
+    gc.collect()
+    assert len(connections) == 1
+    assert connections.get().execute("SELECT count(*) FROM t").fetchone()[0] == 50
+    connections.close_all()
+    assert len(connections) == 0
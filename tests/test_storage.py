@@ -0,0 +1,34 @@
+import threading
+
+from modules.storage import SQLiteBackend
+
+
+def in_thread(function, *args):
+    """Call `function` on a new thread, as Streamlit does for each rerun."""
+    result = []
+    thread = threading.Thread(target=lambda: result.append(function(*args)))
+    thread.start()
+    thread.join()
+    return result[0]
+
+
+def test_sqlite_cache_survives_reruns_on_new_threads(project_dir):
+    backend = SQLiteBackend(project_dir / "store.sqlite")
+    backend.save("actions", {"name": "Echo", "content": "echo hi"})
+    first = in_thread(backend.load, "actions")
+    assert in_thread(backend.load, "actions") is first
+    # Other kinds keep their cache when one kind changes
+    prompts = backend.load("prompts")
+    backend.save("actions", {"name": "Ls", "content": "ls"})
+    assert backend.load("prompts") is prompts
+    backend.close()
+
+
+def test_sqlite_cache_sees_saves_from_other_connections(project_dir):
+    backend = SQLiteBackend(project_dir / "store.sqlite")
+    other = SQLiteBackend(project_dir / "store.sqlite")
+    assert backend.load("actions") == []
+    in_thread(other.save, "actions", {"name": "Echo", "content": "echo hi"})
+    assert [action["name"] for action in backend.load("actions")] == ["Echo"]
+    other.close()
+    backend.close()
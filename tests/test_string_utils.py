@@ -0,0 +1,56 @@
+import codecs
+
+import pytest
+
+from utils.string_utils import StreamDecoder, decode_output
+
+
+def stream(data, chunk_size, **kwargs):
+    decoder = StreamDecoder(**kwargs)
+    parts = [decoder.decode(data[start:start + chunk_size]) for start in range(0, len(data), chunk_size)]
+    parts.append(decoder.decode(b"", final=True))
+    return "".join(parts), decoder
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64])
+def test_utf8_split_across_chunks(chunk_size):
+    text = "línea ✓ 日本語 🙂\n" * 5
+    decoded, decoder = stream(text.encode("utf-8"), chunk_size)
+    assert decoded == text
+    assert decoder.encoding == "utf-8"
+
+
+def test_stray_cp1252_byte_only_affects_itself():
+    data = "naïve “quoted” ✓".encode("utf-8") + b" \x93smart\x94 " + "café".encode("utf-8")
+    expected = "naïve “quoted” ✓ “smart” café"
+    assert stream(data, 5)[0] == expected
+    assert decode_output(data) == expected
+
+
+def test_bytes_no_encoding_accepts_fall_through_to_latin1():
+    # 0x81 is undefined in cp1252
+    data = b"ok \x81 \x80 " + "ñ".encode("utf-8")
+    assert stream(data, 1)[0] == decode_output(data) == "ok \x81 € ñ"
+
+
+def test_truncated_sequence_at_end_is_not_lost():
+    data = "abc".encode("utf-8") + "✓".encode("utf-8")[:2]
+    assert stream(data, 2)[0] == decode_output(data) == "abcâœ"
+
+
+@pytest.mark.parametrize("encoding, bom", [("utf-8-sig", codecs.BOM_UTF8), ("utf-16-le", codecs.BOM_UTF16_LE), ("utf-16-be", codecs.BOM_UTF16_BE)])
+def test_bom_selects_encoding(encoding, bom):
+    text = "héllo wörld\n"
+    data = bom + text.encode(encoding.replace("-sig", ""))
+    assert stream(data, 3)[0].lstrip("\ufeff") == text
+    assert decode_output(data).lstrip("\ufeff") == text
+
+
+def test_cp1252_output_matches_one_shot_decode():
+    data = ("línea de salida “x” " * 1000).encode("cp1252")
+    assert stream(data, 4096)[0] == decode_output(data) == data.decode("cp1252")
+
+
+def test_empty_output():
+    assert decode_output(b"") == ""
+    assert stream(b"", 1)[0] == ""
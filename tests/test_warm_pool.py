@@ -0,0 +1,99 @@
+import os
+import signal
+import time
+
+import pytest
+
+from modules import warm_pool
+
+pytestmark = pytest.mark.skipif(os.name != "posix", reason="the warm pool forks")
+
+SCRIPT = """
+import sys
+print("args", *sys.argv[1:])
+print("to stderr", file=sys.stderr)
+sys.exit(int(sys.argv[1]) if len(sys.argv) > 1 and sys.argv[1].isdigit() else 0)
+"""
+
+
+@pytest.fixture
+def script(project_dir):
+    path = project_dir / "agent.py"
+    path.write_text(SCRIPT)
+    return str(path)
+
+
+@pytest.fixture
+def pool():
+    pool = warm_pool.WarmPool(modules=["json"])
+    yield pool
+    pool.close()
+
+
+def run(pool, script, *args):
+    process, stdout, stderr = pool.start(script, list(args))
+    with stdout, stderr:
+        out, err = stdout.read(), stderr.read()
+    return process.wait(), out, err, process
+
+
+def test_parse_python_agent():
+    assert warm_pool.parse_python_agent("python agents/rain.py --city 'Santiago de Compostela'") == ("agents/rain.py", ["--city", "Santiago de Compostela"])
+    assert warm_pool.parse_python_agent("python3.12 x.py") == ("x.py", [])
+    assert warm_pool.parse_python_agent("python agents/rain.py | tee out") is None
+    assert warm_pool.parse_python_agent("python -m http.server") is None
+    assert warm_pool.parse_python_agent("node x.js") is None
+
+
+def test_runs_script_and_reports_exit_code(pool, script):
+    returncode, out, err, process = run(pool, script, "3", "two words")
+    assert returncode == 3
+    assert out == b"args 3 two words\n"
+    assert err == b"to stderr\n"
+    assert process.rusage["cpu_user"] >= 0
+
+
+def test_oversized_request_is_refused_before_sending(pool, script):
+    with pytest.raises(RuntimeError, match="too large"):
+        pool.start(script, ["x" * warm_pool.MAX_MESSAGE])
+    assert not pool._pending
+    assert run(pool, script, "0")[0] == 0
+
+
+def test_start_times_out_when_zygote_does_not_answer(pool, script, monkeypatch):
+    monkeypatch.setattr(warm_pool, "START_TIMEOUT", 0.3)
+    os.kill(pool._zygote.pid, signal.SIGSTOP)
+    try:
+        with pytest.raises(RuntimeError, match="did not start"):
+            pool.start(script, ["0"])
+    finally:
+        os.kill(pool._zygote.pid, signal.SIGCONT)
+    assert not pool._pending
+    # The late worker is killed, and the pool keeps serving
+    assert run(pool, script, "5")[0] == 5
+
+
+def test_unreadable_datagram_does_not_kill_zygote(pool, script):
+    pool._socket.send(b"not a request")
+    pool._socket.send(b"7\n{not json")
+    time.sleep(0.2)
+    assert pool.alive
+    assert run(pool, script, "0")[1] == b"args 0\n"
+
+
+def test_module_start_falls_back_when_disabled_or_oversized(script, monkeypatch):
+    monkeypatch.delenv("AIGENTFLOW_WARM_POOL", raising=False)
+    assert warm_pool.start(f"python {script}") is None
+    monkeypatch.setenv("AIGENTFLOW_WARM_POOL", "1")
+    monkeypatch.setenv("AIGENTFLOW_WARM_MODULES", "json")
+    monkeypatch.setattr(warm_pool, "_pool", None)
+    try:
+        assert warm_pool.start("echo hi") is None
+        assert warm_pool.start("python agent.py", argv=["python", script, "y" * warm_pool.MAX_MESSAGE]) is None
+        process, stdout, stderr = warm_pool.start(f"python {script} 4")
+        with stdout, stderr:
+            assert stdout.read() == b"args 4\n"
+        assert process.wait() == 4
+    finally:
+        if warm_pool._pool is not None:
+            warm_pool._pool.close()
@@ -1,3 +1,4 @@
-from .string_utils import decode_output
+from .ring_buffer import RingBuffer
+from .string_utils import StreamDecoder, decode_output
 
-__all__ = ['decode_output']
+__all__ = ['decode_output', 'RingBuffer', 'StreamDecoder']
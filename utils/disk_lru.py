@@ -0,0 +1,81 @@
+# Size-bounded directories of cache files: the blob store, the result cache and the LLM
+# response cache. Readers bump a file's mtime, so it doubles as the last-access time and
+# eviction drops the oldest files first.
+#
+# Finding what to evict means a stat of every file in the store, so it is not done on
+# every write. `added()` counts the bytes written in this process and only scans once they
+# reach a slice of the budget, or once SCAN_INTERVAL has passed since the last scan so that
+# writes from other processes are caught up with too. A store can therefore run over its
+# budget by about that slice between scans.
+
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+SCAN_FRACTION = 0.1
+SCAN_INTERVAL = 300.0
+
+_lock = threading.Lock()
+_budgets = {}
+
+
+class _Budget:
+    __slots__ = ("pending", "scanned_at")
+
+    def __init__(self):
+        self.pending = 0
+        # The first write in a process scans, whatever the store held before it started
+        self.scanned_at = None
+
+
+def evict(directory, max_bytes, pattern="*/*", expired=None):
+    """
+    Drop the least recently used files matching `pattern` until they fit in `max_bytes`.
+    `expired(path, now)`, if given, marks files to drop whatever their age. Returns the
+    bytes left in the store.
+    """
+    with _lock:
+        entries = []
+        total = 0
+        now = time.time()
+        for path in Path(directory).glob(pattern):
+            try:
+                stat = path.stat()
+                if expired is not None and expired(path, now):
+                    path.unlink(missing_ok=True)
+                    continue
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+        budget = _budgets.setdefault(os.path.abspath(directory), _Budget())
+        budget.pending = 0
+        budget.scanned_at = time.monotonic()
+        if total <= max_bytes:
+            return total
+        entries.sort()
+        for _mtime, size, path in entries:
+            if total <= max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+        logger.debug(f"Evicted {directory} down to {total} bytes")
+        return total
+
+
+def added(directory, size, max_bytes, pattern="*/*", expired=None):
+    """Record `size` new bytes in `directory` and evict if a scan is due."""
+    with _lock:
+        budget = _budgets.setdefault(os.path.abspath(directory), _Budget())
+        budget.pending += size
+        due = (
+            budget.scanned_at is None
+            or budget.pending >= max_bytes * SCAN_FRACTION
+            or time.monotonic() - budget.scanned_at >= SCAN_INTERVAL
+        )
+    if due:
+        evict(directory, max_bytes, pattern, expired)
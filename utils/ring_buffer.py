@@ -0,0 +1,51 @@
+import threading
+from collections import deque
+
+
+class RingBuffer:
+    """
+    Keep only the last `capacity` characters of a text stream.
+
+    Writers append from a reader thread while the UI calls getvalue(), so both
+    sides take the same lock.
+    """
+
+    def __init__(self, capacity=64 * 1024):
+        self.capacity = capacity
+        self.total = 0
+        self._chunks = deque()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def append(self, text):
+        if not text:
+            return
+        with self._lock:
+            self.total += len(text)
+            if len(text) >= self.capacity:
+                self._chunks.clear()
+                self._chunks.append(text[-self.capacity:])
+                self._size = self.capacity
+                return
+            self._chunks.append(text)
+            self._size += len(text)
+            while self._size > self.capacity:
+                excess = self._size - self.capacity
+                first = self._chunks[0]
+                if len(first) <= excess:
+                    self._chunks.popleft()
+                    self._size -= len(first)
+                else:
+                    self._chunks[0] = first[excess:]
+                    self._size -= excess
+
+    def getvalue(self):
+        with self._lock:
+            return "".join(self._chunks)
+
+    @property
+    def truncated(self):
+        return self.total > self._size
+
+    def __len__(self):
+        return self._size
@@ -1,19 +1,127 @@
+import codecs
 import logging
+import re
 
 logger = logging.getLogger(__name__)
 
-def decode_output(byte_string, encodings=['utf-8', 'cp1252', 'latin-1']):
+DEFAULT_ENCODINGS = ['utf-8', 'cp1252', 'latin-1']
+DECODE_CHUNK = 64 * 1024
+# UTF-32 BOMs start with the UTF-16 ones, so they are checked first
+BOMS = [
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+]
+DETECT_BYTES = 4
+
+
+def detect_encoding(head):
+    """
+    Guess the encoding from the first bytes of a stream: a BOM, or the NUL pattern
+    of BOM-less UTF-16 (e.g. Windows tools writing "h\\0i\\0"). None if nothing stands out.
+    """
+    for bom, encoding in BOMS:
+        if head.startswith(bom):
+            return encoding
+    if len(head) >= 4:
+        if head[1] == 0 and head[3] == 0 and head[0] != 0 and head[2] != 0:
+            return 'utf-16-le'
+        if head[0] == 0 and head[2] == 0 and head[1] != 0 and head[3] != 0:
+            return 'utf-16-be'
+    return None
+
+
+_error_handlers = set()
+# A complete, valid UTF-8 multi-byte sequence, and the cheap test that finds candidates for it
+UTF8_SEQUENCE = re.compile(
+    rb"[\xc2-\xdf][\x80-\xbf]|\xe0[\xa0-\xbf][\x80-\xbf]|[\xe1-\xec\xee\xef][\x80-\xbf]{2}|\xed[\x80-\x9f][\x80-\xbf]"
+    rb"|\xf0[\x90-\xbf][\x80-\xbf]{2}|[\xf1-\xf3][\x80-\xbf]{3}|\xf4[\x80-\x8f][\x80-\xbf]{2}"
+)
+UTF8_LEAD = re.compile(rb"[\xc2-\xf4][\x80-\xbf]")
+UTF8_PARTIAL_TAIL = re.compile(rb"(?:[\xc2-\xf4]|[\xe0-\xf4][\x80-\xbf]|[\xf0-\xf4][\x80-\xbf]{2})\Z")
+
+
+def _utf8_run_end(data, start):
+    """End of the run of bytes from `start` to hand to the fallback: the next valid
+    multi-byte sequence, or a trailing partial one that the next chunk may complete."""
+    lead = UTF8_LEAD.search(data, start)
+    while lead is not None:
+        if UTF8_SEQUENCE.match(data, lead.start()):
+            return lead.start()
+        lead = UTF8_LEAD.search(data, lead.start() + 1)
+    partial = UTF8_PARTIAL_TAIL.search(data, start)
+    return partial.start() if partial is not None else len(data)
+
+
+def fallback_errors(encodings, main='utf-8'):
+    """
+    Name of a codecs error handler that decodes only the bytes the `main` codec rejects
+    with the next of `encodings` (whose own rejects go on down the list, ending with
+    latin-1), then lets the main codec carry on.
+
+    For UTF-8 the handler takes the whole run up to the next valid multi-byte sequence
+    (ASCII reads the same in both), so mostly-cp1252 output is not decoded byte by byte.
+    """
+    name = f"aigentflow-fallback:{main}:" + ",".join(encodings)
+    if name not in _error_handlers:
+        utf8 = codecs.lookup(main).name == 'utf-8'
+        encodings = list(encodings)
+
+        def handler(error):
+            if not isinstance(error, UnicodeDecodeError):
+                raise error
+            end = _utf8_run_end(error.object, error.end) if utf8 else error.end
+            rejected = error.object[error.start:end]
+            if not encodings:
+                return rejected.decode('latin-1'), end
+            return rejected.decode(encodings[0], fallback_errors(encodings[1:], encodings[0])), end
+
+        codecs.register_error(name, handler)
+        _error_handlers.add(name)
+    return name
+
+
+class StreamDecoder:
+    """
+    Decodes output chunk by chunk as it arrives.
+
+    The encoding comes from the first bytes when they carry a BOM (or look like
+    UTF-16), otherwise the first of `encodings` is used. Bytes it cannot decode are
+    decoded one invalid sequence at a time with the next encoding that accepts them
+    (e.g. a stray cp1252 quote in UTF-8 output), so the text around them is not
+    affected. Only an incomplete multi-byte sequence is carried over between chunks.
+    """
+
+    def __init__(self, encodings=DEFAULT_ENCODINGS, detect=True):
+        self.encodings = list(encodings)
+        self.detect = detect
+        self.encoding = None
+        self._decoder = None
+        self._head = b""
+
+    def decode(self, data, final=False):
+        if self._decoder is None:
+            self._head += data
+            if len(self._head) < DETECT_BYTES and not final:
+                return ""
+            data, self._head = self._head, b""
+            self.encoding = (self.detect and detect_encoding(data)) or self.encodings[0]
+            self._decoder = codecs.getincrementaldecoder(self.encoding)(errors=fallback_errors(self.encodings[1:], self.encoding))
+        return self._decoder.decode(data, final)
+
+
+def decode_output(byte_string, encodings=DEFAULT_ENCODINGS):
     """
     Attempt to decode a byte string using multiple encodings
     """
     if not byte_string:
         return ""
-        
-    for encoding in encodings:
-        try:
-            return byte_string.decode(encoding)
-        except UnicodeDecodeError:
-            logger.debug(f"Failed to decode with {encoding}")
-            continue
-            
-    return byte_string.decode('latin-1')
+    view = memoryview(byte_string)
+    if detect_encoding(bytes(view[:DETECT_BYTES])) is None:
+        return str(view, encodings[0], fallback_errors(encodings[1:], encodings[0]))
+    decoder = StreamDecoder(encodings)
+    parts = [decoder.decode(view[start:start + DECODE_CHUNK]) for start in range(0, len(view), DECODE_CHUNK)]
+    parts.append(decoder.decode(b"", final=True))
+    return "".join(parts)